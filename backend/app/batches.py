@@ -0,0 +1,334 @@
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+import uuid
+
+from . import metrics
+from .providers.batch_api import (
+    MAX_BATCH_REQUESTS, BatchBackend, LocalBatch, make_backend, provider_batch_available,
+)
+from .utils.errors import to_http
+from .utils.schema import validate_output_against_schema
+
+# Bulk invocations submitted via POST /llm/batches.
+# BATCHES[batch_id] = { "id", "status": running|completed|cancelled, "mode",
+#                       "created_at"/"finished_at"/"expires_at": epoch seconds,
+#                       "total", "counts": {queued, running, succeeded, failed, cancelled},
+#                       "parts": [{ "backend", "provider", "size", "remote_id", "status", ... }],
+#                       "items": {custom_id: item}, "order": [custom_id, ...] }
+# Items take one of two routes:
+#   - "provider": tool-free requests to a provider with a batch API are grouped
+#     into provider batches (or the LocalBatch stand-in) and polled until done
+#   - "concurrent": everything else runs the /llm/invoke pipeline on a
+#     throttled executor
+BATCHES: Dict[str, Dict[str, Any]] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+_done: Dict[str, asyncio.Event] = {}
+# Shared by all batches so several nightly runs cannot multiply the load
+_slots: Optional[asyncio.Semaphore] = None
+
+PUBLIC_KEYS = ("id", "status", "mode", "created_at", "finished_at", "expires_at", "total", "counts", "parts")
+ITEM_KEYS = ("custom_id", "route", "status", "result", "error")
+MODES = ("auto", "local", "concurrent")
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def ttl_seconds() -> int:
+    """How long batch records are kept after they finish (env LLM_BATCH_TTL_S)."""
+    return _env_int("LLM_BATCH_TTL_S", 86400)
+
+
+def max_items() -> int:
+    return _env_int("LLM_BATCH_MAX_ITEMS", 50000)
+
+
+def concurrency() -> int:
+    """Concurrent-route calls in flight across all batches (env LLM_BATCH_CONCURRENCY)."""
+    return max(1, _env_int("LLM_BATCH_CONCURRENCY", 4))
+
+
+def poll_seconds() -> float:
+    try:
+        return max(0.05, float(os.getenv("LLM_BATCH_POLL_S", "30")))
+    except ValueError:
+        return 30.0
+
+
+def chunk_size(provider: str) -> int:
+    return max(1, min(_env_int("LLM_BATCH_CHUNK", 10000), MAX_BATCH_REQUESTS.get(provider, 10000)))
+
+
+def _global_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(concurrency())
+    return _slots
+
+
+def public(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: rec.get(k) for k in PUBLIC_KEYS if k in rec}
+
+
+def public_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: item.get(k) for k in ITEM_KEYS if k in item}
+
+
+def _sweep() -> None:
+    now = time.time()
+    for batch_id in [k for k, r in BATCHES.items() if r["status"] != "running" and r["expires_at"] < now]:
+        BATCHES.pop(batch_id, None)
+
+
+def _route(item: Dict[str, Any], mode: str) -> Tuple[str, Optional[str]]:
+    """(route, backend) for a valid item."""
+    payload = item["payload"]
+    if mode == "concurrent" or not item.get("eligible"):
+        return "concurrent", None
+    if mode == "local" or os.getenv("LLM_BATCH_BACKEND", "").strip().lower() == "local":
+        return "provider", "local"
+    if provider_batch_available(payload["provider"], payload.get("api_key")):
+        return "provider", payload["provider"]
+    return "concurrent", None
+
+
+def _set_status(rec: Dict[str, Any], item: Dict[str, Any], status: str) -> None:
+    rec["counts"][item["status"]] -= 1
+    rec["counts"][status] += 1
+    item["status"] = status
+
+
+def _settle(rec: Dict[str, Any], item: Dict[str, Any], *, result: Any = None,
+            error: Optional[Dict[str, Any]] = None) -> None:
+    if item["status"] in ("succeeded", "failed", "cancelled"):
+        return
+    if error is not None:
+        item["error"] = error
+        status = "cancelled" if error.get("code") in ("batch_cancelled", "job_cancelled") else "failed"
+    else:
+        item["result"] = result
+        status = "succeeded"
+    _set_status(rec, item, status)
+    metrics.inc("batch_items_total", route=item["route"], status=status)
+
+
+def _error_from(exc: Exception) -> Dict[str, Any]:
+    status, code, message, details = to_http(exc)
+    return {"code": code, "message": message, "details": details, "status": status}
+
+
+def _project(result: Dict[str, Any], projection: Optional[List[str]], keys: List[str]) -> Dict[str, Any]:
+    full = {k: result.get(k) for k in keys}
+    return {k: full[k] for k in (projection or keys)}
+
+
+async def submit(
+    items: List[Dict[str, Any]],
+    *,
+    mode: str = "auto",
+    max_concurrency: Optional[int] = None,
+    projection: Optional[List[str]] = None,
+    response_keys: List[str],
+) -> Dict[str, Any]:
+    """Start a batch; returns its record.
+
+    Each item is {"custom_id", "payload"?, "eligible", "response_schema"?,
+    "run"?: () -> awaitable projected response, "error"?}. Items carrying an
+    `error` failed validation and are recorded as failed right away.
+    """
+    _sweep()
+    now = time.time()
+    rec: Dict[str, Any] = {
+        "id": f"batch-{uuid.uuid4().hex}",
+        "status": "running",
+        "mode": mode,
+        "created_at": now,
+        "finished_at": None,
+        "expires_at": now + ttl_seconds(),
+        "total": len(items),
+        "counts": {"queued": len(items), "running": 0, "succeeded": 0, "failed": 0, "cancelled": 0},
+        "parts": [],
+        "items": {},
+        "order": [],
+    }
+    groups: Dict[Tuple[str, Optional[str]], List[Dict[str, Any]]] = {}
+    concurrent: List[Dict[str, Any]] = []
+    for spec in items:
+        item = {"custom_id": spec["custom_id"], "status": "queued", "route": None}
+        rec["items"][item["custom_id"]] = item
+        rec["order"].append(item["custom_id"])
+        if spec.get("error") is not None:
+            item["route"] = "rejected"
+            _settle(rec, item, error=spec["error"])
+            continue
+        route, backend = _route(spec, mode)
+        item["route"] = route
+        if route == "provider":
+            # One provider batch per backend and credential
+            groups.setdefault((backend, spec["payload"].get("api_key")), []).append(spec)
+        else:
+            concurrent.append(spec)
+
+    BATCHES[rec["id"]] = rec
+    _done[rec["id"]] = asyncio.Event()
+    runs: List[Awaitable[None]] = []
+    for (backend, api_key), specs in groups.items():
+        size = chunk_size(specs[0]["payload"]["provider"] if backend == "local" else backend)
+        for i in range(0, len(specs), size):
+            chunk = specs[i:i + size]
+            part: Dict[str, Any] = {
+                "backend": backend,
+                "provider": chunk[0]["payload"]["provider"],
+                "size": len(chunk),
+                "remote_id": None,
+                "status": "pending",
+                "counts": None,
+            }
+            rec["parts"].append(part)
+            runs.append(_run_part(rec, part, backend, api_key, chunk, projection, response_keys))
+    if concurrent:
+        limit = min(max_concurrency or concurrency(), concurrency())
+        runs.append(_run_concurrent(rec, concurrent, limit))
+    _tasks[rec["id"]] = asyncio.ensure_future(_run(rec, runs))
+    return rec
+
+
+async def _run(rec: Dict[str, Any], runs: List[Awaitable[None]]) -> None:
+    try:
+        await asyncio.gather(*runs)
+        rec["status"] = "completed"
+    except asyncio.CancelledError:
+        rec["status"] = "cancelled"
+        for item in rec["items"].values():
+            _settle(rec, item, error={"code": "batch_cancelled", "message": "Batch was cancelled", "details": None, "status": 499})
+    finally:
+        rec["finished_at"] = time.time()
+        rec["expires_at"] = rec["finished_at"] + ttl_seconds()
+        _tasks.pop(rec["id"], None)
+        done = _done.pop(rec["id"], None)
+        if done is not None:
+            done.set()
+
+
+async def _run_part(
+    rec: Dict[str, Any],
+    part: Dict[str, Any],
+    kind: str,
+    api_key: Optional[str],
+    specs: List[Dict[str, Any]],
+    projection: Optional[List[str]],
+    response_keys: List[str],
+) -> None:
+    backend: Optional[BatchBackend] = None
+    try:
+        backend = make_backend(kind, api_key, concurrency())
+        part["remote_id"] = await backend.create([{"custom_id": s["custom_id"], "payload": s["payload"]} for s in specs])
+        part["status"] = "submitted"
+        for s in specs:
+            _set_status(rec, rec["items"][s["custom_id"]], "running")
+        # The stand-in finishes in seconds; provider batches take minutes to hours
+        interval = min(poll_seconds(), 0.2) if isinstance(backend, LocalBatch) else poll_seconds()
+        while True:
+            info = await backend.retrieve(part["remote_id"])
+            part["status"] = info.get("status")
+            part["counts"] = info.get("counts")
+            if info.get("done"):
+                break
+            await asyncio.sleep(interval)
+        results = await backend.results(part["remote_id"])
+    except asyncio.CancelledError:
+        if backend is not None and part.get("remote_id"):
+            try:
+                # Stop billing for work nobody will read
+                await asyncio.shield(backend.cancel(part["remote_id"]))
+                part["status"] = "cancelling"
+            except Exception:
+                pass
+        raise
+    except Exception as e:
+        part["status"] = "failed"
+        part["error"] = _error_from(e)
+        for s in specs:
+            _settle(rec, rec["items"][s["custom_id"]], error=part["error"])
+        return
+    finally:
+        if backend is not None:
+            try:
+                await backend.close()
+            except Exception:
+                pass
+    for s in specs:
+        item = rec["items"][s["custom_id"]]
+        res = results.get(s["custom_id"])
+        if res is None:
+            _settle(rec, item, error={"code": "batch_result_missing", "message": "Provider returned no result for this request", "details": None, "status": 502})
+        elif not res.get("ok"):
+            _settle(rec, item, error=dict(res["error"], status=res.get("status", 500)))
+        else:
+            result = res["result"]
+            schema = s.get("response_schema")
+            if schema is not None:
+                try:
+                    validate_output_against_schema(result.get("output"), schema)
+                except Exception as e:
+                    _settle(rec, item, error=_error_from(e))
+                    continue
+            _settle(rec, item, result=_project(result, projection, response_keys))
+
+
+async def _run_concurrent(rec: Dict[str, Any], specs: List[Dict[str, Any]], limit: int) -> None:
+    pending = list(reversed(specs))
+    slots = _global_slots()
+
+    async def worker() -> None:
+        while pending:
+            spec = pending.pop()
+            item = rec["items"][spec["custom_id"]]
+            async with slots:
+                _set_status(rec, item, "running")
+                try:
+                    result = await spec["run"]()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    _settle(rec, item, error=_error_from(e))
+                else:
+                    _settle(rec, item, result=result)
+
+    await asyncio.gather(*(worker() for _ in range(min(limit, len(specs)))))
+
+
+def running() -> int:
+    return len(_tasks)
+
+
+def get(batch_id: str) -> Optional[Dict[str, Any]]:
+    _sweep()
+    return BATCHES.get(batch_id)
+
+
+def results(rec: Dict[str, Any], offset: int = 0, limit: int = 100, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    order = rec["order"]
+    if status is not None:
+        order = [cid for cid in order if rec["items"][cid]["status"] == status]
+    return [public_item(rec["items"][cid]) for cid in order[offset:offset + limit]]
+
+
+async def cancel(batch_id: str) -> Optional[Dict[str, Any]]:
+    rec = BATCHES.get(batch_id)
+    if rec is None or rec["status"] != "running":
+        return rec
+    task = _tasks.get(batch_id)
+    if task is not None:
+        task.cancel()
+        try:
+            await asyncio.wait_for(_done[batch_id].wait(), timeout=5.0)
+        except (asyncio.TimeoutError, KeyError):
+            pass
+    return rec
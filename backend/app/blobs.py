@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import metrics
+from .utils.blocking import run_blocking
+
+# Content-addressed store for large, reusable message text (POST /blobs).
+#
+# A blob is UTF-8 text stored once under LLM_BLOB_DIR as <hex[:2]>/<hex>, where
+# hex is its SHA-256. Messages reference it with `{"blob": "sha256:<hex>"}`
+# instead of repeating the text in every request; it is resolved at invoke
+# time by decoding straight from a read-only memory map. Decoded text is kept in
+# a small LRU so concurrent nodes referencing the same document share one string.
+#
+# On disk the store is bounded by LLM_BLOB_MAX_BYTES, evicting least recently
+# used blobs; clients re-upload when a reference reports `blob_missing`.
+_HASH = re.compile(r"^(?:sha256:)?([0-9a-f]{64})$")
+
+_lock = threading.Lock()
+# hex -> size on disk, least recently used first; None until the directory is scanned
+_index: Optional["OrderedDict[str, int]"] = None
+_index_bytes = 0
+_texts: "OrderedDict[str, str]" = OrderedDict()
+_texts_bytes = 0
+
+
+class BlobMissing(KeyError):
+    def __init__(self, ref: str) -> None:
+        super().__init__(ref)
+        self.ref = ref
+
+
+class BlobTooLarge(ValueError):
+    pass
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def blob_dir() -> Path:
+    return Path(os.getenv("LLM_BLOB_DIR") or Path(tempfile.gettempdir()) / "llm-blobs")
+
+
+def max_blob_bytes() -> int:
+    """Largest single upload (env LLM_BLOB_MAX_SIZE)."""
+    return max(1, _env_int("LLM_BLOB_MAX_SIZE", 32 * 1024 * 1024))
+
+
+def max_store_bytes() -> int:
+    return max(1, _env_int("LLM_BLOB_MAX_BYTES", 1024 * 1024 * 1024))
+
+
+def max_cache_bytes() -> int:
+    return max(0, _env_int("LLM_BLOB_CACHE_BYTES", 64 * 1024 * 1024))
+
+
+def parse_ref(ref: str) -> Optional[str]:
+    """Hex digest of a `sha256:<hex>` (or bare hex) reference, None if malformed."""
+    m = _HASH.match(ref.strip().lower()) if isinstance(ref, str) else None
+    return m.group(1) if m else None
+
+
+def _path(hex_digest: str) -> Path:
+    return blob_dir() / hex_digest[:2] / hex_digest
+
+
+def _load_index() -> "OrderedDict[str, int]":
+    global _index, _index_bytes
+    if _index is None:
+        found = []
+        base = blob_dir()
+        if base.is_dir():
+            for p in base.glob("??/*"):
+                if _HASH.match(p.name):
+                    st = p.stat()
+                    found.append((st.st_atime, p.name, st.st_size))
+        _index = OrderedDict((name, size) for _, name, size in sorted(found))
+        _index_bytes = sum(_index.values())
+    return _index
+
+
+def _evict_locked(keep: str) -> None:
+    global _index_bytes
+    index = _load_index()
+    limit = max_store_bytes()
+    while _index_bytes > limit and len(index) > 1:
+        victim = next(iter(index))
+        if victim == keep:
+            index.move_to_end(victim)
+            continue
+        size = index.pop(victim)
+        _index_bytes -= size
+        _drop_text(victim)
+        try:
+            _path(victim).unlink()
+        except OSError:
+            pass
+        metrics.inc("blob_evicted_total")
+
+
+def _put(data: bytes) -> Dict[str, Any]:
+    global _index_bytes
+    hex_digest = hashlib.sha256(data).hexdigest()
+    path = _path(hex_digest)
+    with _lock:
+        index = _load_index()
+        created = hex_digest not in index or not path.exists()
+        if created:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{hex_digest}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+            _index_bytes += len(data) - index.get(hex_digest, 0)
+            index[hex_digest] = len(data)
+        index.move_to_end(hex_digest)
+        _evict_locked(hex_digest)
+    metrics.inc("blob_uploads_total", created=str(created).lower())
+    return {"hash": f"sha256:{hex_digest}", "size": len(data), "created": created}
+
+
+async def put(data: bytes) -> Dict[str, Any]:
+    """Store UTF-8 text; returns {hash, size, created}. Raises BlobTooLarge / UnicodeDecodeError."""
+    if len(data) > max_blob_bytes():
+        raise BlobTooLarge(f"Blob exceeds {max_blob_bytes()} bytes")
+    # Blobs become message text, so reject undecodable uploads up front
+    data.decode("utf-8")
+    return await run_blocking("blob", _put, data)
+
+
+def _stat(hex_digest: str) -> Optional[int]:
+    with _lock:
+        index = _load_index()
+        size = index.get(hex_digest)
+        if size is not None and not _path(hex_digest).exists():
+            # Removed behind our back
+            _forget_locked(hex_digest)
+            return None
+        return size
+
+
+async def stat(ref: str) -> Optional[int]:
+    hex_digest = parse_ref(ref)
+    if hex_digest is None:
+        return None
+    return await run_blocking("blob", _stat, hex_digest)
+
+
+def path_of(ref: str) -> Optional[Path]:
+    hex_digest = parse_ref(ref)
+    return _path(hex_digest) if hex_digest else None
+
+
+def _forget_locked(hex_digest: str) -> None:
+    global _index_bytes
+    index = _load_index()
+    size = index.pop(hex_digest, None)
+    if size is not None:
+        _index_bytes -= size
+    _drop_text(hex_digest)
+
+
+def _drop_text(hex_digest: str) -> None:
+    global _texts_bytes
+    text = _texts.pop(hex_digest, None)
+    if text is not None:
+        _texts_bytes -= len(text)
+
+
+def _read_text(hex_digest: str) -> str:
+    global _texts_bytes
+    with _lock:
+        text = _texts.get(hex_digest)
+        if text is not None:
+            _texts.move_to_end(hex_digest)
+            index = _load_index()
+            if hex_digest in index:
+                index.move_to_end(hex_digest)
+            return text
+    path = _path(hex_digest)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                text = ""
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Decodes from the mapping; no intermediate bytes copy
+                    text = str(mm, "utf-8")
+    except FileNotFoundError:
+        with _lock:
+            _forget_locked(hex_digest)
+        raise BlobMissing(f"sha256:{hex_digest}")
+    with _lock:
+        index = _load_index()
+        if hex_digest in index:
+            index.move_to_end(hex_digest)
+        limit = max_cache_bytes()
+        if len(text) <= limit // 4:
+            _texts[hex_digest] = text
+            _texts_bytes += len(text)
+            while _texts_bytes > limit and _texts:
+                _, old = _texts.popitem(last=False)
+                _texts_bytes -= len(old)
+    return text
+
+
+async def read_text(ref: str) -> str:
+    hex_digest = parse_ref(ref)
+    if hex_digest is None:
+        raise BlobMissing(str(ref))
+    with _lock:
+        cached = _texts.get(hex_digest)
+    if cached is not None:
+        # Hot path: no thread hop for documents already decoded
+        return _read_text(hex_digest)
+    return await run_blocking("blob", _read_text, hex_digest)
+
+
+async def resolve_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace blob references in message `content` with the stored text.
+
+    `content` may be a string, `{"blob": ref}`, or a list of strings and
+    `{"blob": ref}` parts that are concatenated. Raises BlobMissing.
+    """
+    out = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, str):
+            out.append(m)
+            continue
+        parts = content if isinstance(content, list) else [content]
+        texts = []
+        for part in parts:
+            if isinstance(part, str):
+                texts.append(part)
+            elif isinstance(part, dict) and "blob" in part:
+                texts.append(await read_text(part["blob"]))
+                metrics.inc("blob_refs_resolved_total")
+        out.append(dict(m, content=texts[0] if len(texts) == 1 else "".join(texts)))
+    return out
+
+
+def has_refs(messages: List[Dict[str, Any]]) -> bool:
+    return any(not isinstance(m.get("content"), str) for m in messages)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        count = len(_index) if _index is not None else None
+        return {"blobs": count, "bytes": _index_bytes, "cached_texts": len(_texts), "cached_bytes": _texts_bytes}
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import time
+import weakref
+from typing import Any, Dict
+
+from . import logs, metrics
+
+# Graceful drain on shutdown (driven by app.serve).
+#
+# Once draining starts, new invocations, jobs, batches and WebSocket
+# connections are refused with 503 / close code 1013 and /health reports
+# "draining" so load balancers stop routing here. Requests already in flight,
+# their pending WebSocket RPCs, running jobs and batches get up to LLM_DRAIN_TIMEOUT_S
+# to finish before the server closes connections and long-lived clients.
+_draining = False
+_inflight = 0
+# Objects with close()/aclose() to release at shutdown (provider SDK clients)
+_closers: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def drain_timeout() -> float:
+    try:
+        return max(0.0, float(os.getenv("LLM_DRAIN_TIMEOUT_S", "30")))
+    except ValueError:
+        return 30.0
+
+
+def draining() -> bool:
+    return _draining
+
+
+def start() -> None:
+    global _draining
+    if not _draining:
+        _draining = True
+        logs.log("server", "drain_started", level="warning", **inflight())
+
+
+def enter() -> None:
+    global _inflight
+    _inflight += 1
+
+
+def leave() -> None:
+    global _inflight
+    _inflight -= 1
+
+
+def inflight() -> Dict[str, int]:
+    from . import batches, jobs
+    from .ws_registry import pending_rpcs
+
+    return {"requests": _inflight, "ws_rpcs": pending_rpcs(), "jobs": jobs.running(), "batches": batches.running()}
+
+
+async def wait_idle(timeout: float) -> bool:
+    """Wait until nothing is in flight; False if `timeout` passed first."""
+    deadline = time.monotonic() + timeout
+    while True:
+        counts = inflight()
+        if not any(counts.values()):
+            return True
+        if time.monotonic() >= deadline:
+            metrics.inc("drain_timeouts_total")
+            logs.log("server", "drain_timeout", level="warning", **counts)
+            return False
+        await asyncio.sleep(0.05)
+
+
+def register_client(client: Any) -> Any:
+    """Close `client` at shutdown if it is still alive; returns it for chaining."""
+    try:
+        _closers.add(client)
+    except TypeError:
+        pass
+    return client
+
+
+async def close_clients() -> None:
+    for client in list(_closers):
+        try:
+            close = getattr(client, "aclose", None) or getattr(client, "close", None)
+            if close is None:
+                continue
+            res = close()
+            if inspect.isawaitable(res):
+                await asyncio.wait_for(res, timeout=5.0)
+        except Exception as e:
+            logs.log("server", "client_close_failed", level="warning", client=type(client).__name__, error=str(e))
+    _closers.clear()
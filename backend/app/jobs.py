@@ -0,0 +1,252 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from . import drain, logs, metrics
+from .utils.blocking import run_blocking
+from .ws_registry import get_ws, send_to
+
+# Background invocations submitted via POST /llm/jobs.
+# JOBS[job_id] = { "id", "status": queued|running|succeeded|failed|cancelled,
+#                  "created_at"/"started_at"/"finished_at": epoch seconds,
+#                  "expires_at": epoch seconds, "result"?, "error"?, "ws_conn_id"? }
+# Records live in memory until their TTL passes; with LLM_JOB_DB set they are
+# also written to SQLite so results survive a restart.
+JOBS: Dict[str, Dict[str, Any]] = {}
+_runners: Dict[str, Callable[[], Awaitable[Dict[str, Any]]]] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+_done: Dict[str, asyncio.Event] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_db: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
+PUBLIC_KEYS = ("id", "status", "created_at", "started_at", "finished_at", "expires_at", "result", "error")
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def ttl_seconds() -> int:
+    """How long finished (and queued) jobs are kept (env LLM_JOB_TTL_S)."""
+    return _env_int("LLM_JOB_TTL_S", 3600)
+
+
+def _db_conn() -> Optional[sqlite3.Connection]:
+    global _db
+    path = os.getenv("LLM_JOB_DB")
+    if not path:
+        return None
+    if _db is None:
+        _db = sqlite3.connect(path, check_same_thread=False)
+        _db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, record TEXT NOT NULL, expires_at REAL NOT NULL)")
+        _db.commit()
+    return _db
+
+
+def _db_save(rec: Dict[str, Any]) -> None:
+    with _db_lock:
+        db = _db_conn()
+        if db is None:
+            return
+        db.execute(
+            "INSERT OR REPLACE INTO jobs (id, record, expires_at) VALUES (?, ?, ?)",
+            (rec["id"], json.dumps(public(rec), default=str), rec["expires_at"]),
+        )
+        db.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+        db.commit()
+
+
+def _db_load(job_id: str) -> Optional[Dict[str, Any]]:
+    with _db_lock:
+        db = _db_conn()
+        if db is None:
+            return None
+        row = db.execute("SELECT record FROM jobs WHERE id = ? AND expires_at >= ?", (job_id, time.time())).fetchone()
+    if not row:
+        return None
+    rec = json.loads(row[0])
+    if rec.get("status") in ("queued", "running"):
+        # Persisted by a process that is gone: it will never finish
+        rec["status"] = "failed"
+        rec["error"] = {"code": "job_interrupted", "message": "Server restarted before the job finished", "details": None}
+    return rec
+
+
+async def _persist(rec: Dict[str, Any]) -> None:
+    if not os.getenv("LLM_JOB_DB"):
+        return
+    try:
+        await run_blocking("job_db", _db_save, rec)
+    except Exception as e:
+        logs.log("jobs", "persist_failed", level="error", job_id=rec.get("id"), error=str(e))
+
+
+def running() -> int:
+    return len(_tasks)
+
+
+def public(rec: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: rec.get(k) for k in PUBLIC_KEYS if k in rec}
+
+
+def _sweep() -> None:
+    now = time.time()
+    for job_id in [k for k, r in JOBS.items() if r["expires_at"] < now and r["status"] not in ("queued", "running")]:
+        JOBS.pop(job_id, None)
+
+
+def _ensure_workers() -> asyncio.Queue:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=max(1, _env_int("LLM_JOB_QUEUE_MAX", 100)))
+    alive = [w for w in _workers if not w.done()]
+    _workers[:] = alive
+    for _ in range(max(1, _env_int("LLM_JOB_WORKERS", 4)) - len(alive)):
+        _workers.append(asyncio.create_task(_worker(_queue)))
+    return _queue
+
+
+async def submit(run: Callable[[], Awaitable[Dict[str, Any]]], ws_conn_id: Optional[str] = None) -> Dict[str, Any]:
+    """Queue `run` for a worker; returns the new job record. Raises JobQueueFull."""
+    _sweep()
+    queue = _ensure_workers()
+    now = time.time()
+    rec: Dict[str, Any] = {
+        "id": f"job-{uuid.uuid4().hex}",
+        "status": "queued",
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "expires_at": now + ttl_seconds(),
+        "ws_conn_id": ws_conn_id,
+    }
+    try:
+        queue.put_nowait(rec["id"])
+    except asyncio.QueueFull:
+        raise JobQueueFull(f"job queue is full ({queue.maxsize} waiting)")
+    JOBS[rec["id"]] = rec
+    _runners[rec["id"]] = run
+    _done[rec["id"]] = asyncio.Event()
+    metrics.inc("jobs_total", status="queued")
+    await _persist(rec)
+    return rec
+
+
+async def get(job_id: str) -> Optional[Dict[str, Any]]:
+    _sweep()
+    rec = JOBS.get(job_id)
+    if rec is not None:
+        return rec
+    return await run_blocking("job_db", _db_load, job_id) if os.getenv("LLM_JOB_DB") else None
+
+
+async def cancel(job_id: str) -> Optional[Dict[str, Any]]:
+    rec = JOBS.get(job_id)
+    if rec is None or rec["status"] not in ("queued", "running"):
+        return rec
+    task = _tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+        # Report the final state once the worker has recorded it
+        try:
+            await asyncio.wait_for(_done[job_id].wait(), timeout=2.0)
+        except (asyncio.TimeoutError, KeyError):
+            pass
+    else:
+        # Still queued: the worker skips it when dequeued
+        _runners.pop(job_id, None)
+        await _finish(rec, "cancelled", error={"code": "job_cancelled", "message": "Cancelled by client", "details": None})
+    return rec
+
+
+async def _finish(rec: Dict[str, Any], status: str, *, result: Any = None, error: Optional[Dict[str, Any]] = None) -> None:
+    rec["status"] = status
+    rec["finished_at"] = time.time()
+    rec["expires_at"] = rec["finished_at"] + ttl_seconds()
+    if result is not None:
+        rec["result"] = result
+    if error is not None:
+        rec["error"] = error
+    metrics.inc("jobs_total", status=status)
+    done = _done.pop(rec["id"], None)
+    if done is not None:
+        done.set()
+    await _persist(rec)
+    await _notify(rec)
+
+
+async def _notify(rec: Dict[str, Any]) -> None:
+    """Push the finished job to the submitting browser tab, if it is still connected."""
+    conn_id = rec.get("ws_conn_id")
+    if not conn_id or not get_ws(conn_id):
+        return
+    try:
+        await send_to(conn_id, {"type": "job", **public(rec)})
+    except Exception:
+        pass
+
+
+async def _worker(queue: asyncio.Queue) -> None:
+    while True:
+        job_id = await queue.get()
+        try:
+            rec = JOBS.get(job_id)
+            run = _runners.pop(job_id, None)
+            if rec is None or run is None or rec["status"] != "queued":
+                continue
+            if drain.draining():
+                # Shutting down: don't start work that would be cut off
+                await _finish(rec, "failed", error={"code": "server_draining", "message": "Server shut down before the job started", "details": None})
+                continue
+            rec["status"] = "running"
+            rec["started_at"] = time.time()
+            metrics.observe("job_queue_wait_ms", (rec["started_at"] - rec["created_at"]) * 1000.0)
+            await _persist(rec)
+            task = asyncio.ensure_future(run())
+            _tasks[job_id] = task
+            try:
+                try:
+                    # wait() instead of awaiting the task: tells the worker's own cancellation apart from cancel()
+                    await asyncio.wait({task})
+                except asyncio.CancelledError:
+                    # The worker itself is being cancelled (shutdown): don't orphan the run
+                    task.cancel()
+                    await _finish(rec, "cancelled", error={"code": "job_cancelled", "message": "Server shut down while the job was running", "details": None})
+                    raise
+                result = task.result()
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+                await _finish(rec, "cancelled", error={"code": "job_cancelled", "message": "Job was cancelled", "details": None})
+            except Exception as e:
+                detail = getattr(e, "detail", None)
+                error = detail["error"] if isinstance(detail, dict) and "error" in detail else {
+                    "code": "job_failed", "message": str(e), "details": {"type": e.__class__.__name__},
+                }
+                error = dict(error, status=getattr(e, "status_code", 500))
+                # FS-backed jobs end with their browser tab: that is a cancellation, not a failure
+                await _finish(rec, "cancelled" if error.get("code") == "ws_disconnected" else "failed", error=error)
+            else:
+                await _finish(rec, "succeeded", result=result)
+            finally:
+                _tasks.pop(job_id, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logs.log("jobs", "worker_error", level="error", job_id=job_id, error=str(e), type=e.__class__.__name__)
+        finally:
+            queue.task_done()
@@ -0,0 +1,144 @@
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+# Live per-(provider, model) statistics, fed by every /llm/invoke call:
+# - recent successful latencies in ms (hedge delays, routing scores)
+# - recent outcomes (True = success) for the error rate
+# - rate-limit cooldown after 429s and the number of calls in flight
+_WINDOW = 200
+_OUTCOME_WINDOW = 50
+_samples: Dict[Tuple[str, str], Deque[float]] = {}
+_outcomes: Dict[Tuple[str, str], Deque[bool]] = {}
+_rate_limits: Dict[Tuple[str, str], Dict[str, float]] = {}
+_in_flight: Dict[Tuple[str, str], int] = {}
+# Models by last use; provider/model strings come from clients, so the least
+# recently used idle model is forgotten past max_models()
+_recent: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def min_samples() -> int:
+    """Fewer observations than this are not trusted for percentiles (env LLM_LATENCY_MIN_SAMPLES)."""
+    try:
+        return int(os.getenv("LLM_LATENCY_MIN_SAMPLES", "20"))
+    except ValueError:
+        return 20
+
+
+def max_models() -> int:
+    """Distinct (provider, model) pairs tracked at once (env LLM_LATENCY_MAX_MODELS)."""
+    try:
+        return max(1, int(os.getenv("LLM_LATENCY_MAX_MODELS", "256")))
+    except ValueError:
+        return 256
+
+
+def _touch(key: Tuple[str, str]) -> None:
+    # Callers hold _lock
+    _recent[key] = None
+    _recent.move_to_end(key)
+    limit = max_models()
+    if len(_recent) <= limit:
+        return
+    for old in list(_recent):
+        if len(_recent) <= limit:
+            break
+        if _in_flight.get(old):
+            continue
+        del _recent[old]
+        for store in (_samples, _outcomes, _rate_limits, _in_flight):
+            store.pop(old, None)
+
+
+def observe(provider: str, model: str, ms: float) -> None:
+    key = (provider, model)
+    with _lock:
+        _touch(key)
+        buf = _samples.get(key)
+        if buf is None:
+            buf = _samples[key] = deque(maxlen=_WINDOW)
+        buf.append(float(ms))
+
+
+def record_outcome(provider: str, model: str, ok: bool, status: Optional[int] = None) -> None:
+    """Count a finished call; a 429 also starts (and on repeats doubles) a cooldown."""
+    key = (provider, model)
+    now = time.monotonic()
+    with _lock:
+        _touch(key)
+        buf = _outcomes.get(key)
+        if buf is None:
+            buf = _outcomes[key] = deque(maxlen=_OUTCOME_WINDOW)
+        buf.append(bool(ok))
+        rl = _rate_limits.setdefault(key, {"count": 0, "streak": 0, "until": 0.0})
+        if status == 429:
+            rl["count"] += 1
+            rl["streak"] += 1
+            rl["until"] = now + min(60.0, 2.0 ** rl["streak"])
+        elif ok:
+            rl["streak"] = 0
+
+
+def is_provider_failure(status: int) -> bool:
+    """Whether a failed call's status reflects on the model: rate limits and 5xx/transport errors.
+
+    Other 4xx (bad requests, schema mismatches, client-imposed limits) say nothing
+    about the model's health and are not counted.
+    """
+    return status == 429 or status >= 500
+
+
+def begin(provider: str, model: str) -> None:
+    with _lock:
+        _touch((provider, model))
+        _in_flight[(provider, model)] = _in_flight.get((provider, model), 0) + 1
+
+
+def end(provider: str, model: str) -> None:
+    with _lock:
+        if (provider, model) in _in_flight:
+            _in_flight[(provider, model)] = max(0, _in_flight[(provider, model)] - 1)
+
+
+def health(provider: str, model: str) -> Dict[str, Any]:
+    """Current view of one model: samples, p50, error rate, cooldown and load."""
+    key = (provider, model)
+    with _lock:
+        data = sorted(_samples.get(key, ()))
+        outcomes = list(_outcomes.get(key, ()))
+        rl = dict(_rate_limits.get(key) or {})
+        in_flight = _in_flight.get(key, 0)
+    return {
+        "calls": len(outcomes),
+        "samples": len(data),
+        "p50_ms": round(_rank(data, 50), 1) if data else None,
+        "p95_ms": round(_rank(data, 95), 1) if data else None,
+        "error_rate": round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+        "rate_limited": int(rl.get("count", 0)),
+        "cooldown_s": round(max(0.0, rl.get("until", 0.0) - time.monotonic()), 2),
+        "in_flight": in_flight,
+    }
+
+
+def _rank(data: List[float], q: float) -> float:
+    # Nearest-rank percentile over sorted data
+    idx = min(len(data) - 1, max(0, int(round(q / 100.0 * len(data))) - 1))
+    return data[idx]
+
+
+def percentile(provider: str, model: str, q: float) -> Optional[float]:
+    """Percentile (q in 0-100) of the recent window; None until min_samples() are recorded."""
+    with _lock:
+        data = sorted(_samples.get((provider, model), ()))
+    if not data or len(data) < min_samples():
+        return None
+    return _rank(data, q)
+
+
+def snapshot() -> List[Dict[str, Any]]:
+    with _lock:
+        keys = sorted(set(_samples) | set(_outcomes))
+    return [{"provider": p, "model": m, **health(p, m)} for p, m in keys]
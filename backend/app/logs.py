@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, TextIO
+
+from . import metrics
+
+# Structured JSON-lines logging that never blocks the caller.
+#
+# log(category, event, level=..., **fields) checks the level and the category's
+# sample rate, then drops the record on a bounded queue. A writer thread
+# redacts, truncates, serializes and writes it to stdout (or LLM_LOG_FILE).
+# When the queue is full the record is dropped and `log_dropped_total` counts it.
+#
+# Settings (environment, read when first used):
+#   LLM_LOG_LEVEL        debug|info|warning|error (default info)
+#   LLM_LOG_SAMPLE       per-category sample rates, e.g. "fs-ws=0.1,access=1";
+#                        warnings and errors are always kept
+#   LLM_LOG_MAX_FIELD    longest string kept per field (default 512 chars)
+#   LLM_LOG_PAYLOADS     1 to keep file contents / message bodies (still truncated)
+#   LLM_LOG_QUEUE_MAX    queued records before dropping (default 10000)
+#   LLM_LOG_FILE         append to this file instead of stdout
+# Values are redacted/truncated on the writer thread, so callers must not
+# mutate what they pass after logging it.
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# Keys whose values are never written
+_SECRET = re.compile(r"(api[_-]?key|authorization|(^|[_-])token$|secret|password|cookie)", re.IGNORECASE)
+# Bulky payload keys reduced to their size unless LLM_LOG_PAYLOADS=1
+_PAYLOAD_KEYS = {"content", "entries", "messages", "prompts", "output", "files"}
+_MAX_DEPTH = 6
+_STOP = object()
+
+_queue: Optional[queue.Queue] = None
+_writer: Optional[threading.Thread] = None
+_lock = threading.Lock()
+_settings: Optional[Dict[str, Any]] = None
+
+
+def _load_settings() -> Dict[str, Any]:
+    rates: Dict[str, float] = {}
+    for part in os.getenv("LLM_LOG_SAMPLE", "").split(","):
+        name, _, rate = part.partition("=")
+        try:
+            if name.strip():
+                rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            pass
+    try:
+        max_field = max(16, int(os.getenv("LLM_LOG_MAX_FIELD", "512")))
+    except ValueError:
+        max_field = 512
+    return {
+        "level": LEVELS.get(os.getenv("LLM_LOG_LEVEL", "info").strip().lower(), LEVELS["info"]),
+        "rates": rates,
+        "max_field": max_field,
+        "payloads": os.getenv("LLM_LOG_PAYLOADS", "0").strip().lower() in ("1", "true", "yes"),
+    }
+
+
+def settings() -> Dict[str, Any]:
+    global _settings
+    if _settings is None:
+        _settings = _load_settings()
+    return _settings
+
+
+def reconfigure() -> None:
+    """Re-read the LLM_LOG_* settings (the writer keeps running)."""
+    global _settings
+    _settings = None
+
+
+def enabled(category: str, level: str = "info") -> bool:
+    """Whether a record would be kept; use it to skip building expensive fields."""
+    cfg = settings()
+    lv = LEVELS.get(level, LEVELS["info"])
+    if lv < cfg["level"]:
+        return False
+    rate = cfg["rates"].get(category)
+    if rate is None or lv >= LEVELS["warning"]:
+        return True
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def _ensure_writer() -> queue.Queue:
+    global _queue, _writer
+    if _writer is not None and _writer.is_alive():
+        return _queue  # type: ignore[return-value]
+    with _lock:
+        if _writer is None or not _writer.is_alive():
+            try:
+                size = max(1, int(os.getenv("LLM_LOG_QUEUE_MAX", "10000")))
+            except ValueError:
+                size = 10000
+            _queue = queue.Queue(maxsize=size)
+            _writer = threading.Thread(target=_write_loop, args=(_queue,), name="llm-log-writer", daemon=True)
+            _writer.start()
+    return _queue  # type: ignore[return-value]
+
+
+def log(category: str, event: str, level: str = "info", **fields: Any) -> None:
+    if not enabled(category, level):
+        return
+    record = {"ts": time.time(), "level": level, "cat": category, "event": event, **fields}
+    try:
+        _ensure_writer().put_nowait(record)
+    except queue.Full:
+        metrics.inc("log_dropped_total", category=category)
+
+
+def redact(value: Any, cfg: Dict[str, Any], key: str = "", depth: int = 0) -> Any:
+    if key and _SECRET.search(key):
+        return "[redacted]"
+    if key in _PAYLOAD_KEYS and not cfg["payloads"]:
+        if isinstance(value, (str, bytes)):
+            return f"[{len(value)} chars]"
+        if isinstance(value, (list, tuple, dict)):
+            return f"[{len(value)} items]"
+    if isinstance(value, str):
+        limit = cfg["max_field"]
+        return value if len(value) <= limit else f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if depth >= _MAX_DEPTH:
+        return "[...]"
+    if isinstance(value, dict):
+        return {str(k): redact(v, cfg, str(k), depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        limit = 50
+        items = [redact(v, cfg, "", depth + 1) for v in value[:limit]]
+        if len(value) > limit:
+            items.append(f"...(+{len(value) - limit} items)")
+        return items
+    return redact(str(value), cfg, "", depth + 1)
+
+
+def _open_sink() -> TextIO:
+    path = os.getenv("LLM_LOG_FILE")
+    if path:
+        return open(path, "a", encoding="utf-8", buffering=1 << 16)
+    return sys.stdout
+
+
+def _write_loop(q: queue.Queue) -> None:
+    sink = _open_sink()
+    while True:
+        record = q.get()
+        stop = record is _STOP
+        # Drain whatever else is queued before one flush
+        batch = [] if stop else [record]
+        while not stop:
+            try:
+                record = q.get_nowait()
+            except queue.Empty:
+                break
+            if record is _STOP:
+                stop = True
+            else:
+                batch.append(record)
+        cfg = settings()
+        lines = []
+        for rec in batch:
+            try:
+                lines.append(json.dumps(redact(rec, cfg), ensure_ascii=False, default=str))
+            except Exception as e:
+                lines.append(json.dumps({"ts": rec.get("ts"), "level": "error", "cat": "log", "event": "unserializable", "error": str(e)}))
+        try:
+            if lines:
+                sink.write("\n".join(lines) + "\n")
+                sink.flush()
+        except Exception:
+            pass
+        if stop:
+            if sink is not sys.stdout:
+                sink.close()
+            return
+
+
+def close(timeout: float = 2.0) -> None:
+    """Flush queued records and stop the writer (used on shutdown)."""
+    global _writer
+    writer, q = _writer, _queue
+    if writer is None or q is None or not writer.is_alive():
+        return
+    try:
+        q.put(_STOP, timeout=timeout)
+    except queue.Full:
+        return
+    writer.join(timeout)
+    _writer = None
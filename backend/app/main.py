@@ -1,23 +1,50 @@
 from __future__ import annotations
 
+import asyncio
 import time
-from typing import Any, Dict, List, Optional, Literal
+import uuid
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Literal, Type, Union
 
 from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect, Query
+from fastapi.exceptions import ResponseValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field, ValidationError, create_model
 
 from .providers import REGISTRY, list_providers, provider_capabilities
 from .utils.schema import validate_output_against_schema
 from .utils.errors import to_http
-from .providers.adapter import provider_catalog
+from .utils.responses import FastJSONResponse, json_response, parse_fields
+from .utils.budget import Budget, BudgetExceeded, current_budget
+from .utils.deadline import Deadline, DeadlineExceeded, current_deadline, parse_deadline_ms
+from .utils.blocking import run_blocking, shutdown as shutdown_blocking_pool
+from .utils import loop_monitor
+from .utils.profiling import Profile, ProfileRejected, check_request, find_profile, profile_id
+from .providers.adapter import _to_lc_messages, provider_catalog
 from pathlib import Path
 import json
 
 
+class BlobRef(BaseModel):
+    # Hash returned by POST /blobs
+    blob: str = Field(pattern=r"^(sha256:)?[0-9a-f]{64}$")
+
+
 class ChatMessage(BaseModel):
     role: Literal["system", "user", "assistant"]
-    content: str
+    # Text, a stored blob, or text and blobs concatenated in order
+    content: Union[str, BlobRef, List[Union[str, BlobRef]]]
+
+
+class PoolMember(BaseModel):
+    provider: str = Field(min_length=1)
+    model: str = Field(min_length=1)
+
+
+class ModelPool(BaseModel):
+    # Stats are kept per pool name; defaults to the member list
+    name: Optional[str] = None
+    members: List[PoolMember] = Field(min_length=1)
 
 
 class InvokeRequest(BaseModel):
@@ -34,6 +61,14 @@ class InvokeRequest(BaseModel):
     fs: Optional[Dict[str, Any]] = None  # { nodes: [{id}] }
     # Frontend WebSocket connection id for fs tools routing
     ws_conn_id: Optional[str] = None
+    # Equivalent models to route between by live latency/error/rate-limit stats;
+    # `provider`/`model` are always a member
+    pool: Optional[ModelPool] = None
+    # Server-side history (POST /llm/sessions): `messages` then holds only this turn's new messages
+    session_id: Optional[str] = None
+    # Caps on upstream model calls / tokens across all phases, retries and hedges
+    max_model_calls: Optional[int] = Field(default=None, ge=1)
+    max_total_tokens: Optional[int] = Field(default=None, ge=1)
 
 
 class ErrorBody(BaseModel):
@@ -54,17 +89,124 @@ class InvokeResponse(BaseModel):
     usage: Optional[Dict[str, Any]] = None
     raw: Optional[Dict[str, Any]] = None
     logs: Optional[List[Dict[str, Any]]] = None
+    # Set to the phase that ran out when a deadline cut the tool loop short
+    partial: Optional[str] = None
+    # Upstream calls and tokens per phase; `exhausted` names the phase refused by the budget
+    accounting: Optional[Dict[str, Any]] = None
+
+
+# InvokeResponse restricted to a projection, by field set
+_projected_models: Dict[FrozenSet[str], Type[BaseModel]] = {}
+
+
+def _validate_response(content: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate projected `/llm/invoke` content like `response_model` would, keeping its field order."""
+    keys = frozenset(content)
+    model = _projected_models.get(keys)
+    if model is None:
+        fields = InvokeResponse.model_fields
+        model = _projected_models[keys] = create_model(
+            "InvokeResponse", **{k: (fields[k].annotation, fields[k]) for k in keys})
+    try:
+        data = model.model_validate(content).model_dump()
+    except ValidationError as e:
+        raise ResponseValidationError(errors=e.errors(), body=content)
+    return {k: data[k] for k in content}
+
+
+class BlobInfo(BaseModel):
+    hash: str
+    size: int
+    # False when the blob was already stored
+    created: bool
+
+
+class SessionCreate(BaseModel):
+    # Optional seed history, typically the node's fixed system prompt
+    messages: List[ChatMessage] = Field(default_factory=list)
+
+
+class SessionStatus(BaseModel):
+    id: str
+    turns: int
+    messages: int
+    # Approximate characters of stored message text
+    bytes: int
+    created_at: float
+    last_used: float
+    expires_at: float
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    created_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+    # InvokeResponse fields (after projection) once succeeded
+    result: Optional[Dict[str, Any]] = None
+    # Error envelope body plus the HTTP `status` /llm/invoke would have returned
+    error: Optional[Dict[str, Any]] = None
+
+
+class BatchItem(InvokeRequest):
+    # Caller's key for matching results; defaults to `item-<index>`
+    custom_id: Optional[str] = Field(default=None, pattern=r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(min_length=1)
+    # auto: provider batch APIs where available, else concurrent;
+    # local: offline stand-in for the provider route; concurrent: never batch
+    mode: Literal["auto", "local", "concurrent"] = "auto"
+    # Concurrent-route calls in flight for this batch (capped by LLM_BATCH_CONCURRENCY)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=256)
+
+
+class BatchStatus(BaseModel):
+    id: str
+    status: Literal["running", "completed", "cancelled"]
+    mode: str
+    created_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+    total: int
+    # Items per state: queued, running, succeeded, failed, cancelled
+    counts: Dict[str, int]
+    # Provider batches (or local stand-in runs) backing the "provider" route
+    parts: List[Dict[str, Any]]
+
+
+class BatchResults(BaseModel):
+    id: str
+    status: str
+    offset: int
+    # Each: { custom_id, route: provider|concurrent|rejected, status, result?, error? }
+    items: List[Dict[str, Any]]
 
 
 app = FastAPI(
     title="llm-flow backend",
+    default_response_class=FastJSONResponse,
     version="0.1.0",
     docs_url="/docs",            # Swagger UI
     redoc_url=None,               # Disable ReDoc to keep surface minimal
     openapi_url="/openapi.json", # OpenAPI schema
 )
 
-from .ws_registry import set_ws, pop_ws, resolve_pending, get_ws, register_pending, list_connections
+from .ws_registry import (
+    set_ws, pop_ws, resolve_pending, get_ws, register_pending, list_connections, bind_task, unbind_task,
+    set_peer_features, touch, heartbeat, connection_stats,
+)
+from .utils.wsframe import FrameTooLarge, binary_enabled, decode_message
+from . import batches, blobs, drain, jobs, latency, logs, metrics, sessions
+from .providers.hedge import hedge_settings, invoke_hedged
+from .providers.router import choose, pool_name, pool_stats
+from .providers.batch_api import batch_eligible
+from .providers.tool_cache import invalidate_fs_path
+from .providers.fs_mirror import get_mirror, mirror_enabled
+from .providers.mock import check_mock_settings
 
 # CORS: local dev defaults; tighten in prod/deploy
 app.add_middleware(
@@ -79,20 +221,66 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def _on_startup() -> None:
+    loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def _on_shutdown() -> None:
+    loop_monitor.stop()
+    await drain.close_clients()
+    shutdown_blocking_pool()
+    logs.close()
+
+
 @app.middleware("http")
 async def request_id_middleware(request: Request, call_next):
     req_id = request.headers.get("X-Request-Id")
     start = time.perf_counter()
-    response = await call_next(request)
+    if drain.draining() and request.method == "POST" and request.url.path.startswith(_DRAIN_REFUSED):
+        response = FastJSONResponse(status_code=503, headers={"Retry-After": "1"}, content={
+            "error": {"code": "server_draining", "message": "Server is shutting down; retry on another instance", "details": None}
+        })
+        _access_log(request, 503, start, req_id)
+        return response
+    drain.enter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        _access_log(request, 500, start, req_id)
+        raise
+    finally:
+        drain.leave()
     if req_id:
         response.headers["X-Request-Id"] = req_id
-    duration_ms = int((time.perf_counter() - start) * 1000)
+    duration_ms = _access_log(request, response.status_code, start, req_id)
     response.headers["X-Duration-Ms"] = str(duration_ms)
     return response
 
 
+# New work refused while draining; reads (job/batch status, results) keep working
+_DRAIN_REFUSED = ("/llm/invoke", "/llm/jobs", "/llm/batches", "/llm/sessions", "/blobs")
+
+
+def _access_log(request: Request, status: int, start: float, req_id: Optional[str]) -> int:
+    duration_ms = int((time.perf_counter() - start) * 1000)
+    # Handlers that call a model leave provider/model on request.state
+    access = getattr(request.state, "access", None) or {}
+    logs.log(
+        "access", "request", level="warning" if status >= 500 else "info",
+        method=request.method, path=request.url.path, status=status,
+        provider=access.get("provider"), model=access.get("model"),
+        duration_ms=duration_ms, request_id=req_id,
+    )
+    return duration_ms
+
+
 @app.get("/health")
 async def health():
+    if drain.draining():
+        # Lets load balancers take this instance out of rotation
+        return FastJSONResponse(status_code=503, content={"status": "draining"})
     return {"status": "ok"}
 
 
@@ -103,26 +291,64 @@ async def root():
 
 @app.websocket("/ws/{conn_id}")
 async def websocket_endpoint(ws: WebSocket, conn_id: str):
+    if drain.draining():
+        # 1013 Try Again Later: the client reconnects to another instance
+        await ws.close(code=1013)
+        return
     await ws.accept()
     set_ws(conn_id, ws)
+    hb = asyncio.create_task(heartbeat(conn_id, ws))
     try:
-        try:
-            print(f"[fs-ws] open {conn_id}")
-        except Exception:
-            pass
+        # Feature negotiation: the browser only sends a VFS snapshot when mirroring is on
+        await ws.send_text(json.dumps({"type": "hello", "features": {
+            "fs_mirror": mirror_enabled(),
+            "binary": binary_enabled(),
+            "gzip": binary_enabled(),
+        }}))
+        logs.log("fs-ws", "open", conn_id=conn_id)
         while True:
-            # Receive responses from frontend and dispatch to pending futures
-            data = await ws.receive_text()
+            # Receive responses from frontend (JSON text or negotiated binary frames) and dispatch
+            message = await ws.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            touch(conn_id)
             try:
-                obj = json.loads(data)
-                if isinstance(obj, dict) and obj.get("type") == "ping":
+                obj = decode_message(message)
+                if isinstance(obj, dict) and obj.get("type") == "hello":
+                    # Browser's half of the negotiation; binary only if both sides agree
+                    feats = obj.get("features") or {}
+                    if isinstance(feats, dict):
+                        set_peer_features(conn_id, {
+                            "binary": binary_enabled() and bool(feats.get("binary")),
+                            "gzip": bool(feats.get("gzip")),
+                        })
+                    continue
+                if isinstance(obj, dict) and obj.get("type") in ("ping", "pong"):
                     continue
                 if isinstance(obj, dict) and obj.get("type") == "connected":
                     continue
+                if isinstance(obj, dict) and obj.get("type") == "fs_snapshot":
+                    if mirror_enabled():
+                        get_mirror(conn_id, create=True).load_snapshot(obj.get("entries"))
+                    continue
+                if isinstance(obj, dict) and obj.get("type") == "fs_changed":
+                    # VFS edited in the browser: drop memoized reads/lists and update the mirror
+                    invalidate_fs_path(conn_id, obj.get("path"))
+                    if obj.get("to"):
+                        invalidate_fs_path(conn_id, obj.get("to"))
+                    mirror = get_mirror(conn_id)
+                    if mirror is not None:
+                        mirror.apply_change(obj)
+                    continue
                 if isinstance(obj, dict) and obj.get("type") == "res":
                     cid = obj.get("id")
                     if isinstance(cid, str) and cid:
                         resolve_pending(conn_id, cid, obj)
+            except FrameTooLarge as e:
+                # 1009 Message Too Big: inflating it would be unbounded
+                logs.log("fs-ws", "frame_too_large", level="warning", conn_id=conn_id, error=str(e))
+                await ws.close(code=1009)
+                break
             except Exception:
                 # Ignore malformed
                 pass
@@ -131,11 +357,11 @@ async def websocket_endpoint(ws: WebSocket, conn_id: str):
     except Exception:
         pass
     finally:
-        pop_ws(conn_id)
-        try:
-            print(f"[fs-ws] close {conn_id}")
-        except Exception:
-            pass
+        hb.cancel()
+        cancelled = pop_ws(conn_id, ws)
+        if cancelled:
+            metrics.inc("invoke_cancelled_total", cancelled, reason="ws_disconnect")
+        logs.log("fs-ws", "close", conn_id=conn_id, cancelled=cancelled)
 
 
 @app.get("/ws/test")
@@ -145,12 +371,11 @@ async def ws_test(conn_id: str = Query(...), path: str = Query("/")):
         raise HTTPException(status_code=400, detail={
             "error": {"code": "ws_not_connected", "message": f"No websocket for {conn_id}", "details": {"active": list_connections()} }
         })
-    call_id = f"test-{int(time.time()*1000)}"
+    call_id = f"test-{uuid.uuid4().hex[:12]}"
     fut = register_pending(conn_id, call_id)
     msg = {"type": "req", "id": call_id, "action": "fs_list", "path": path}
     try:
         await ws.send_text(json.dumps(msg))
-        import asyncio
         res = await asyncio.wait_for(fut, timeout=5.0)
         return res
     except Exception as e:
@@ -159,9 +384,37 @@ async def ws_test(conn_id: str = Query(...), path: str = Query("/")):
         })
 
 
+@app.get("/metrics")
+async def get_metrics():
+    return {**metrics.snapshot(), "latency": latency.snapshot(), "sessions": sessions.stats(), "blobs": blobs.stats()}
+
+
+@app.get("/llm/pools")
+async def llm_pools():
+    return {"pools": pool_stats()}
+
+
+@app.get("/debug/profiles/{profile_id}", responses={404: {"model": ErrorEnvelope}})
+async def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(default=None, convert_underscores=True)):
+    """Download a profile written for a request sent with `X-Profile`."""
+    try:
+        check_request("sample", x_profile_token)
+    except ProfileRejected as e:
+        raise HTTPException(status_code=403, detail={
+            "error": {"code": "profile_forbidden", "message": str(e), "details": None}
+        })
+    path = find_profile(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"code": "profile_not_found", "message": f"No profile '{profile_id}'", "details": None}
+        })
+    media = "text/plain" if path.suffix == ".collapsed" else "application/octet-stream"
+    return FileResponse(path, media_type=media, filename=path.name)
+
+
 @app.get("/ws/list")
 async def ws_list():
-    return {"connections": list_connections()}
+    return {"connections": list_connections(), "details": connection_stats()}
 
 
 @app.get("/providers")
@@ -184,7 +437,7 @@ async def get_models(provider: str):
 
     base = Path(__file__).parent / "model_catalog"
     path = base / f"{provider}.json"
-    if not path.exists():
+    if not await run_blocking("catalog", path.exists):
         raise HTTPException(status_code=404, detail={
             "error": {
                 "code": "catalog_not_found",
@@ -193,7 +446,7 @@ async def get_models(provider: str):
             }
         })
     try:
-        data = json.loads(path.read_text())
+        data = await run_blocking("catalog", lambda: json.loads(path.read_text()))
         models = data.get("models", []) if isinstance(data, dict) else []
     except Exception as e:
         raise HTTPException(status_code=500, detail={
@@ -206,20 +459,56 @@ async def get_models(provider: str):
     return {"provider": provider, "models": models}
 
 
-@app.post("/llm/invoke", response_model=InvokeResponse, responses={
-    400: {"model": ErrorEnvelope},
-    401: {"model": ErrorEnvelope},
-    429: {"model": ErrorEnvelope},
-    500: {"model": ErrorEnvelope},
-    501: {"model": ErrorEnvelope},
-})
-async def llm_invoke(
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body is already consumed, so the next ASGI message is the disconnect
+    while True:
+        message = await request.receive()
+        if message.get("type") == "http.disconnect":
+            return
+
+
+async def _invoke_cancellable(request: Request, coro: Any, ws_conn_id: Optional[str]) -> Any:
+    """Run an adapter invocation, cancelling it if the HTTP client goes away.
+
+    The task is also bound to the frontend WebSocket (when given) so closing the
+    tab cancels in-flight model calls, tool calls and pending FS RPCs.
+    """
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    if ws_conn_id:
+        bind_task(ws_conn_id, task)
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        # The server is cancelling this request (e.g. shutdown)
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+        if ws_conn_id:
+            unbind_task(ws_conn_id, task)
+    if task in done:
+        if task.cancelled():
+            # Cancelled by the registry because the bound socket closed
+            raise HTTPException(status_code=499, detail={
+                "error": {"code": "ws_disconnected", "message": "Frontend websocket closed during invocation", "details": None}
+            })
+        return task.result()
+    task.cancel()
+    metrics.inc("invoke_cancelled_total", reason="client_disconnect")
+    raise HTTPException(status_code=499, detail={
+        "error": {"code": "client_disconnected", "message": "Client closed the request", "details": None}
+    })
+
+
+def _prepare_invocation(
     body: InvokeRequest,
-    x_provider_api_key: Optional[str] = Header(default=None, convert_underscores=True),
-    x_tavily_api_key: Optional[str] = Header(default=None, convert_underscores=True),
-):
-    entry = REGISTRY.get(body.provider)
-    if not entry:
+    projection: Optional[List[str]],
+    x_provider_api_key: Optional[str],
+    x_tavily_api_key: Optional[str],
+) -> Dict[str, Any]:
+    """Validate an InvokeRequest and build the adapter payload (raises HTTPException)."""
+    if body.provider not in REGISTRY:
         raise HTTPException(status_code=501, detail={
             "error": {
                 "code": "provider_unsupported",
@@ -228,11 +517,39 @@ async def llm_invoke(
             }
         })
 
+    try:
+        hedge = hedge_settings(body.extra)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "hedge_invalid", "message": str(e), "details": None}
+        })
+
+    try:
+        check_mock_settings(body.extra)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "mock_invalid", "message": str(e), "details": None}
+        })
+
+    members: List[tuple] = []
+    if body.pool is not None:
+        members = [(body.provider, body.model)]
+        for m in body.pool.members:
+            if (m.provider, m.model) not in members:
+                members.append((m.provider, m.model))
+        unknown = sorted({p for p, _ in members if p not in REGISTRY})
+        if unknown:
+            raise HTTPException(status_code=400, detail={
+                "error": {"code": "pool_invalid", "message": f"Unsupported providers in pool: {', '.join(unknown)}", "details": None}
+            })
+    route = pool_name(body.pool.name if body.pool else None, members) if members else None
+
     # Compose normalized payload for adapter
-    payload: Dict[str, Any] = body.model_dump()
+    payload: Dict[str, Any] = body.model_dump(exclude={"pool", "session_id", "max_model_calls", "max_total_tokens"})
     # Attach api key for adapters that need it
     if x_provider_api_key:
         payload["api_key"] = x_provider_api_key
+    payload["include_logs"] = projection is None or "logs" in projection
 
     # Optional Tavily web search tool support
     try:
@@ -253,36 +570,97 @@ async def llm_invoke(
         # Ignore malformed extras silently — feature is opt-in
         pass
 
+    return {"payload": payload, "hedge": hedge, "members": members, "route": route}
+
+
+async def _resolve_blobs(prep: Dict[str, Any]) -> None:
+    """Swap blob references in the payload messages for their text (raises HTTPException)."""
+    payload = prep["payload"]
+    if not blobs.has_refs(payload.get("messages", [])):
+        return
+    try:
+        payload["messages"] = await blobs.resolve_messages(payload["messages"])
+    except blobs.BlobMissing as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "blob_missing", "message": f"Blob {e.ref} is not stored (upload it again via POST /blobs)", "details": {"blob": e.ref}}
+        })
+
+
+async def _run_invocation(
+    body: InvokeRequest,
+    prep: Dict[str, Any],
+    deadline: Optional[Deadline],
+    projection: Optional[List[str]],
+    run: Callable[[Any], Awaitable[Any]],
+) -> Dict[str, Any]:
+    """Attempt loop shared by /llm/invoke and /llm/jobs; returns the projected response fields.
+
+    `run` awaits one adapter invocation coroutine (e.g. cancelling it on disconnect).
+    """
+    payload, hedge, members, route = prep["payload"], prep["hedge"], prep["members"], prep["route"]
     attempts = (body.retries or 0) + 1
     last_exc: Optional[Exception] = None
     combined_logs: List[Dict[str, Any]] = []
+    budget = Budget(body.max_model_calls, body.max_total_tokens)
     for _ in range(attempts):
+        if deadline is not None and deadline.expired():
+            last_exc = DeadlineExceeded("retry", deadline.budget_ms)
+            break
+        if budget.exceeded():
+            budget.exhausted = budget.exhausted or "retry"
+            last_exc = BudgetExceeded("retry", budget.snapshot())
+            break
+        budget.attempts += 1
+        attempt_payload = payload
+        if route is not None:
+            # Re-route every attempt: a member that just failed now scores worse
+            provider, model = choose(route, members)
+            attempt_payload = dict(payload, provider=provider, model=model)
+            if provider != body.provider:
+                # The header key belongs to the requested provider; others use their env keys
+                attempt_payload.pop("api_key", None)
+        # Tasks copy the current context, so the adapter and its tools see the deadline and budget
+        token = current_deadline.set(deadline)
+        budget_token = current_budget.set(budget)
         try:
-            result = await entry["invoke"](payload)
+            result = await run(invoke_hedged(attempt_payload, hedge))
             # Aggregate logs if provided by adapter
             if isinstance(result, dict) and "logs" in result and isinstance(result["logs"], list):
                 combined_logs.extend(result["logs"]) 
             # If structured output is supported and a response_schema is present, validate output shape
-            caps = provider_capabilities(body.provider)
+            caps = provider_capabilities(attempt_payload["provider"])
             if body.response_schema is not None:
                 if caps.get("structured_output", False):
-                    validate_output_against_schema(result.get("output"), body.response_schema)
+                    try:
+                        validate_output_against_schema(result.get("output"), body.response_schema)
+                    except Exception:
+                        # Not a provider/transport failure: the live model stats are left alone
+                        if deadline is not None and deadline.partial:
+                            # A cut-short run that could not be finalized: report the timeout, don't retry
+                            raise DeadlineExceeded(deadline.partial, deadline.budget_ms)
+                        if budget.exhausted:
+                            raise BudgetExceeded(budget.exhausted, budget.snapshot())
+                        raise
                 else:
                     combined_logs.append({
                         "event": "schema_validation_skipped",
                         "reason": "provider_does_not_support_structured_output",
-                        "provider": body.provider,
+                        "provider": attempt_payload["provider"],
                     })
-            # Success
-            return InvokeResponse(
-                id=result.get("id"),
-                output=result.get("output"),
-                provider=result.get("provider", body.provider),
-                model=result.get("model", body.model),
-                usage=result.get("usage"),
-                raw=result.get("raw"),
-                logs=combined_logs or result.get("logs"),
-            )
+            # Success: build only the projected fields
+            values = {
+                "id": lambda: result.get("id"),
+                "output": lambda: result.get("output"),
+                "provider": lambda: result.get("provider", attempt_payload["provider"]),
+                "model": lambda: result.get("model", attempt_payload["model"]),
+                "usage": lambda: result.get("usage"),
+                "raw": lambda: result.get("raw"),
+                "logs": lambda: combined_logs or result.get("logs"),
+                "partial": lambda: deadline.partial if deadline is not None else None,
+                "accounting": budget.snapshot,
+            }
+            keys = projection or list(InvokeResponse.model_fields.keys())
+            return {k: values[k]() for k in keys}
         except HTTPException as http_exc:
             # Do not retry on 4xx unless 429 (rate limit)
             status = http_exc.status_code
@@ -290,6 +668,10 @@ async def llm_invoke(
                 last_exc = http_exc
                 continue
             raise
+        except (DeadlineExceeded, BudgetExceeded) as exc:
+            # Retrying cannot help once the budget is spent
+            last_exc = exc
+            break
         except Exception as exc:
             # MCP adapter missing: surface clear 501
             msg = str(exc)
@@ -313,12 +695,397 @@ async def llm_invoke(
             # Retry on upstream errors
             last_exc = exc
             continue
+        finally:
+            current_budget.reset(budget_token)
+            current_deadline.reset(token)
 
     # If we got here, retries exhausted; normalize and raise
     status, code, message, details = to_http(last_exc)
     raise HTTPException(status_code=status, detail={"error": {"code": code, "message": message, "details": details}})
 
 
+def _session_or_404(session_id: str) -> Dict[str, Any]:
+    rec = sessions.get(session_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"code": "session_not_found", "message": f"No session '{session_id}' (unknown, expired or evicted)", "details": None}
+        })
+    return rec
+
+
+def _reject_session(body: InvokeRequest, where: str) -> None:
+    if body.session_id is not None:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "session_unsupported", "message": f"session_id is only supported by /llm/invoke, not {where}", "details": None}
+        })
+
+
+async def _run_in_session(
+    body: InvokeRequest,
+    prep: Dict[str, Any],
+    deadline: Optional[Deadline],
+    projection: Optional[List[str]],
+    run: Callable[[Any], Awaitable[Any]],
+) -> Dict[str, Any]:
+    """One turn of a server-side session: stored history + this request's messages.
+
+    Turns of the same session run one at a time; the new messages and the reply
+    are only stored when the call succeeds.
+    """
+    rec = _session_or_404(body.session_id)
+    payload = prep["payload"]
+    # This turn's messages, blob references already resolved
+    new = payload["messages"]
+    async with rec["lock"]:
+        payload["messages"] = sessions.history(rec, new)
+        lc = sessions.lc_history(rec, new, _to_lc_messages)
+        if lc is not None:
+            payload["lc_messages"] = lc
+        # The reply is needed for the history even when the caller projected it away
+        wanted = projection if projection is None or "output" in projection else projection + ["output"]
+        content = await _run_invocation(body, prep, deadline, wanted, run)
+        sessions.commit(rec, new, content.get("output"), _to_lc_messages)
+    if wanted is not projection:
+        content.pop("output", None)
+    return content
+
+
+@app.post("/blobs", status_code=201, response_model=BlobInfo, responses={
+    400: {"model": ErrorEnvelope},
+    413: {"model": ErrorEnvelope},
+})
+async def blobs_upload(request: Request):
+    """Store a UTF-8 document once (raw request body); reference it from messages as `{"blob": hash}`."""
+    limit = blobs.max_blob_bytes()
+    too_large = HTTPException(status_code=413, detail={
+        "error": {"code": "blob_too_large", "message": f"Blob exceeds {limit} bytes", "details": {"max_bytes": limit}}
+    })
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise too_large
+    data = bytearray()
+    async for chunk in request.stream():
+        data += chunk
+        if len(data) > limit:
+            raise too_large
+    try:
+        return await blobs.put(bytes(data))
+    except blobs.BlobTooLarge:
+        raise too_large
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "blob_invalid", "message": f"Blob must be UTF-8 text: {e}", "details": None}
+        })
+
+
+@app.api_route("/blobs/{ref}", methods=["GET", "HEAD"], responses={404: {"model": ErrorEnvelope}})
+async def blobs_get(ref: str):
+    """Blob text; HEAD checks whether a hash is stored before uploading."""
+    size = await blobs.stat(ref)
+    path = blobs.path_of(ref)
+    if size is None or path is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"code": "blob_not_found", "message": f"No blob '{ref}'", "details": None}
+        })
+    return FileResponse(path, media_type="text/plain; charset=utf-8")
+
+
+@app.post("/llm/sessions", status_code=201, response_model=SessionStatus)
+async def llm_sessions_create(body: Optional[SessionCreate] = None):
+    """Start a server-side conversation; pass its id as `session_id` to /llm/invoke."""
+    seed = [m.model_dump() for m in (body.messages if body else [])]
+    prep = {"payload": {"messages": seed}}
+    await _resolve_blobs(prep)
+    rec = sessions.create(prep["payload"]["messages"])
+    return sessions.public(rec)
+
+
+@app.get("/llm/sessions/{session_id}", response_model=SessionStatus, responses={404: {"model": ErrorEnvelope}})
+async def llm_sessions_get(session_id: str):
+    return sessions.public(_session_or_404(session_id))
+
+
+@app.delete("/llm/sessions/{session_id}", response_model=SessionStatus, responses={404: {"model": ErrorEnvelope}})
+async def llm_sessions_delete(session_id: str):
+    rec = _session_or_404(session_id)
+    sessions.delete(session_id)
+    return sessions.public(rec)
+
+
+@app.post("/llm/invoke", response_model=InvokeResponse, responses={
+    400: {"model": ErrorEnvelope},
+    401: {"model": ErrorEnvelope},
+    429: {"model": ErrorEnvelope},
+    500: {"model": ErrorEnvelope},
+    501: {"model": ErrorEnvelope},
+})
+async def llm_invoke(
+    body: InvokeRequest,
+    request: Request,
+    fields: Optional[str] = Query(default=None, description="Comma-separated response fields to return, e.g. `output,usage`"),
+    x_provider_api_key: Optional[str] = Header(default=None, convert_underscores=True),
+    x_tavily_api_key: Optional[str] = Header(default=None, convert_underscores=True),
+    x_response_fields: Optional[str] = Header(default=None, convert_underscores=True),
+    x_deadline_ms: Optional[str] = Header(default=None, convert_underscores=True),
+    x_profile: Optional[str] = Header(default=None, convert_underscores=True),
+    x_profile_token: Optional[str] = Header(default=None, convert_underscores=True),
+):
+    # Response projection: query takes precedence over the header
+    try:
+        projection = parse_fields(fields if fields is not None else x_response_fields, InvokeResponse.model_fields.keys())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "fields_invalid", "message": str(e), "details": {"allowed": list(InvokeResponse.model_fields.keys())}}
+        })
+
+    try:
+        budget_ms = parse_deadline_ms(x_deadline_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "deadline_invalid", "message": str(e), "details": None}
+        })
+
+    request.state.access = {"provider": body.provider, "model": body.model}
+    profile: Optional[Profile] = None
+    profile_busy = False
+    if x_profile is not None:
+        try:
+            mode = check_request(x_profile, x_profile_token)
+        except ProfileRejected as e:
+            raise HTTPException(status_code=403, detail={
+                "error": {"code": "profile_forbidden", "message": str(e), "details": None}
+            })
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={
+                "error": {"code": "profile_invalid", "message": str(e), "details": None}
+            })
+        profile = Profile(mode, profile_id(request.headers.get("X-Request-Id")))
+        if not profile.start():
+            profile, profile_busy = None, True
+
+    try:
+        prep = _prepare_invocation(body, projection, x_provider_api_key, x_tavily_api_key)
+        await _resolve_blobs(prep)
+        deadline = Deadline(budget_ms) if budget_ms else None
+        run = lambda coro: _invoke_cancellable(request, coro, body.ws_conn_id)  # noqa: E731
+        if body.session_id is not None:
+            content = await _run_in_session(body, prep, deadline, projection, run)
+        else:
+            content = await _run_invocation(body, prep, deadline, projection, run)
+        # Pools may have routed elsewhere
+        request.state.access = {"provider": content.get("provider", body.provider), "model": content.get("model", body.model)}
+        # Validated against the projected fields, then serialized once
+        response = json_response(_validate_response(content), accept_encoding=request.headers.get("accept-encoding"))
+    finally:
+        if profile is not None:
+            # Failed requests are saved too: fetch them by id from /debug/profiles
+            profile.stop()
+            await profile.save()
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile.id
+    elif profile_busy:
+        response.headers["X-Profile"] = "busy"
+    return response
+
+
+async def _run_bound(coro: Any, ws_conn_id: str) -> Any:
+    """Run a job's invocation tied to the frontend socket that serves its FS tools."""
+    task = asyncio.ensure_future(coro)
+    bind_task(ws_conn_id, task)
+    try:
+        # wait() instead of awaiting the task: tells a socket-close cancellation apart from our own
+        await asyncio.wait({task})
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        unbind_task(ws_conn_id, task)
+    if task.cancelled():
+        raise HTTPException(status_code=499, detail={
+            "error": {"code": "ws_disconnected", "message": "Frontend websocket closed during invocation", "details": None}
+        })
+    return task.result()
+
+
+@app.post("/llm/jobs", status_code=202, response_model=JobStatus, responses={
+    400: {"model": ErrorEnvelope},
+    429: {"model": ErrorEnvelope},
+    501: {"model": ErrorEnvelope},
+})
+async def llm_jobs_submit(
+    body: InvokeRequest,
+    request: Request,
+    fields: Optional[str] = Query(default=None, description="Comma-separated response fields to keep in the job result"),
+    x_provider_api_key: Optional[str] = Header(default=None, convert_underscores=True),
+    x_tavily_api_key: Optional[str] = Header(default=None, convert_underscores=True),
+    x_response_fields: Optional[str] = Header(default=None, convert_underscores=True),
+    x_deadline_ms: Optional[str] = Header(default=None, convert_underscores=True),
+):
+    """Run the /llm/invoke pipeline in the background; poll GET /llm/jobs/{id} or
+    listen for a `{type:"job"}` message on the `ws_conn_id` socket."""
+    request.state.access = {"provider": body.provider, "model": body.model}
+    _reject_session(body, "/llm/jobs")
+    try:
+        projection = parse_fields(fields if fields is not None else x_response_fields, InvokeResponse.model_fields.keys())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "fields_invalid", "message": str(e), "details": {"allowed": list(InvokeResponse.model_fields.keys())}}
+        })
+    try:
+        budget_ms = parse_deadline_ms(x_deadline_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "deadline_invalid", "message": str(e), "details": None}
+        })
+    prep = _prepare_invocation(body, projection, x_provider_api_key, x_tavily_api_key)
+    # Resolved now so a missing blob fails the submission, not the job
+    await _resolve_blobs(prep)
+    # FS tools need the submitting tab; other jobs outlive it and can still be polled
+    fs_conn = body.ws_conn_id if (body.fs or {}).get("nodes") and body.ws_conn_id else None
+
+    async def run() -> Dict[str, Any]:
+        # The deadline covers execution, not time spent queued
+        deadline = Deadline(budget_ms) if budget_ms else None
+        return await _run_invocation(
+            body, prep, deadline, projection,
+            (lambda coro: _run_bound(coro, fs_conn)) if fs_conn else (lambda coro: coro),
+        )
+
+    try:
+        rec = await jobs.submit(run, ws_conn_id=body.ws_conn_id)
+    except jobs.JobQueueFull as e:
+        raise HTTPException(status_code=429, detail={
+            "error": {"code": "job_queue_full", "message": str(e), "details": None}
+        })
+    return jobs.public(rec)
+
+
+@app.get("/llm/jobs/{job_id}", response_model=JobStatus, responses={404: {"model": ErrorEnvelope}})
+async def llm_jobs_get(job_id: str):
+    rec = await jobs.get(job_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"code": "job_not_found", "message": f"No job '{job_id}' (unknown or expired)", "details": None}
+        })
+    return jobs.public(rec)
+
+
+@app.delete("/llm/jobs/{job_id}", response_model=JobStatus, responses={404: {"model": ErrorEnvelope}})
+async def llm_jobs_cancel(job_id: str):
+    rec = await jobs.cancel(job_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"code": "job_not_found", "message": f"No job '{job_id}' (unknown or expired)", "details": None}
+        })
+    return jobs.public(rec)
+
+
+@app.post("/llm/batches", status_code=202, response_model=BatchStatus, responses={
+    400: {"model": ErrorEnvelope},
+})
+async def llm_batches_submit(
+    body: BatchRequest,
+    fields: Optional[str] = Query(default=None, description="Comma-separated response fields to keep in each result"),
+    x_provider_api_key: Optional[str] = Header(default=None, convert_underscores=True),
+    x_tavily_api_key: Optional[str] = Header(default=None, convert_underscores=True),
+    x_response_fields: Optional[str] = Header(default=None, convert_underscores=True),
+    x_deadline_ms: Optional[str] = Header(default=None, convert_underscores=True),
+):
+    """Bulk submission for throughput-oriented runs: tool-free requests go to the
+    provider's asynchronous batch API, the rest to a throttled executor.
+    Poll GET /llm/batches/{id} and page through GET /llm/batches/{id}/results."""
+    try:
+        projection = parse_fields(fields if fields is not None else x_response_fields, InvokeResponse.model_fields.keys())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "fields_invalid", "message": str(e), "details": {"allowed": list(InvokeResponse.model_fields.keys())}}
+        })
+    try:
+        budget_ms = parse_deadline_ms(x_deadline_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "deadline_invalid", "message": str(e), "details": None}
+        })
+    if len(body.requests) > batches.max_items():
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "batch_too_large", "message": f"At most {batches.max_items()} requests per batch", "details": None}
+        })
+    ids = [r.custom_id or f"item-{i}" for i, r in enumerate(body.requests)]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail={
+            "error": {"code": "batch_invalid", "message": "custom_id values must be unique", "details": None}
+        })
+
+    items: List[Dict[str, Any]] = []
+    for custom_id, req in zip(ids, body.requests):
+        inv = InvokeRequest.model_validate(req.model_dump(exclude={"custom_id"}))
+        try:
+            _reject_session(inv, "/llm/batches")
+            prep = _prepare_invocation(inv, projection, x_provider_api_key, x_tavily_api_key)
+            await _resolve_blobs(prep)
+        except HTTPException as e:
+            status, code, message, details = to_http(e)
+            items.append({"custom_id": custom_id, "error": {"code": code, "message": message, "details": details, "status": status}})
+            continue
+        # Nobody reads per-item logs in bulk mode
+        prep["payload"]["include_logs"] = projection is not None and "logs" in projection
+        fs_conn = inv.ws_conn_id if (inv.fs or {}).get("nodes") and inv.ws_conn_id else None
+
+        def run(inv: InvokeRequest = inv, prep: Dict[str, Any] = prep, fs_conn: Optional[str] = fs_conn):
+            # The deadline covers one item's execution, not its wait for a slot
+            deadline = Deadline(budget_ms) if budget_ms else None
+            return _run_invocation(
+                inv, prep, deadline, projection,
+                (lambda coro: _run_bound(coro, fs_conn)) if fs_conn else (lambda coro: coro),
+            )
+
+        items.append({
+            "custom_id": custom_id,
+            "payload": prep["payload"],
+            "eligible": inv.pool is None and batch_eligible(prep["payload"]),
+            "response_schema": inv.response_schema,
+            "run": run,
+        })
+
+    rec = await batches.submit(
+        items, mode=body.mode, max_concurrency=body.concurrency,
+        projection=projection, response_keys=list(InvokeResponse.model_fields.keys()),
+    )
+    return batches.public(rec)
+
+
+def _batch_or_404(batch_id: str) -> Dict[str, Any]:
+    rec = batches.get(batch_id)
+    if rec is None:
+        raise HTTPException(status_code=404, detail={
+            "error": {"code": "batch_not_found", "message": f"No batch '{batch_id}' (unknown or expired)", "details": None}
+        })
+    return rec
+
+
+@app.get("/llm/batches/{batch_id}", response_model=BatchStatus, responses={404: {"model": ErrorEnvelope}})
+async def llm_batches_get(batch_id: str):
+    return batches.public(_batch_or_404(batch_id))
+
+
+@app.get("/llm/batches/{batch_id}/results", response_model=BatchResults, responses={404: {"model": ErrorEnvelope}})
+async def llm_batches_results(
+    batch_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    status: Optional[Literal["queued", "running", "succeeded", "failed", "cancelled"]] = Query(default=None),
+):
+    rec = _batch_or_404(batch_id)
+    return {"id": rec["id"], "status": rec["status"], "offset": offset, "items": batches.results(rec, offset, limit, status)}
+
+
+@app.delete("/llm/batches/{batch_id}", response_model=BatchStatus, responses={404: {"model": ErrorEnvelope}})
+async def llm_batches_cancel(batch_id: str):
+    _batch_or_404(batch_id)
+    rec = await batches.cancel(batch_id)
+    return batches.public(rec)
+
+
 if __name__ == "__main__":
     import uvicorn
 
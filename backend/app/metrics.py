@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Tuple
+import threading
+
+# Process-local metrics exposed at GET /metrics.
+# COUNTERS["name{label=value,...}"] = int
+# SUMMARIES["name{...}"] = {"count": int, "sum": float, "max": float}
+COUNTERS: Dict[str, float] = {}
+SUMMARIES: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    parts: List[Tuple[str, Any]] = sorted(labels.items())
+    return name + "{" + ",".join(f"{k}={v}" for k, v in parts) + "}"
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        COUNTERS[key] = COUNTERS.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        s = SUMMARIES.get(key)
+        if s is None:
+            s = SUMMARIES[key] = {"count": 0, "sum": 0.0, "max": 0.0}
+        s["count"] += 1
+        s["sum"] += value
+        s["max"] = max(s["max"], value)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(COUNTERS),
+            "summaries": {k: dict(v) for k, v in SUMMARIES.items()},
+        }
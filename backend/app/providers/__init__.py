@@ -6,6 +6,7 @@ REGISTRY = {
     "anthropic": {"invoke": lc_invoke_generic},
     "deepseek": {"invoke": lc_invoke_generic},
     "google": {"invoke": lc_invoke_generic},
+    "mock": {"invoke": lc_invoke_generic},
 }
 
 
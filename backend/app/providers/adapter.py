@@ -1,18 +1,35 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 import json
+import time
 
 from .logging import BufferingHandler
 from ..utils.schema import (
+    StrictSchemaUnsupported,
+    drop_null_optionals,
     enforce_no_additional_properties,
     enforce_no_additional_properties_deep,
     enforce_required_all_properties_deep,
+    to_openai_strict,
+    validate_output_against_schema,
 )
 from .mcp import abuild_mcp_tools
 from .web_tools import maybe_build_tavily_tool
 from .fs_tools import build_fs_tools
+from .mock import create_mock_model, _is_mock_available
+from .cassette import Cassette, cassette_mode, open_cassette
+from ..utils.budget import BudgetExceeded, current_budget
+from ..utils.deadline import DeadlineExceeded, mark_partial, within
+from .tool_results import PAGE_TOOL_NAME, ToolResultPager
+from .tool_cache import ToolMemo
+from .. import latency, metrics
+from ..utils.errors import to_http
+from ..utils.json_extract import NotFound, extract_json
+from ..utils.blocking import run_blocking
 
 
 def provider_catalog() -> Dict[str, Dict[str, Any]]:
@@ -21,6 +38,7 @@ def provider_catalog() -> Dict[str, Dict[str, Any]]:
         "anthropic": {"name": "Anthropic Claude"},
         "deepseek": {"name": "DeepSeek"},
         "google": {"name": "Google Gemini"},
+        "mock": {"name": "Mock (offline benchmark provider)"},
     }
 
 
@@ -40,10 +58,119 @@ def provider_capabilities(provider_id: str) -> Dict[str, Any]:
         caps["available"] = _is_google_available()
         caps["json_mode"] = True
         caps["structured_output"] = True
+    if provider_id == "mock":
+        caps["available"] = _is_mock_available()
     return caps
 
 
 async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Record/replay is opt-in via LLM_CASSETTE_MODE; None means pass-through
+    cassette = await run_blocking("cassette", open_cassette, payload) if cassette_mode() != "off" else None
+    try:
+        result = await _invoke(payload, cassette)
+    except Exception:
+        # Failed runs are recorded too so replay reproduces the error response
+        if cassette is not None:
+            await run_blocking("cassette", cassette.save)
+        raise
+    if cassette is not None:
+        await run_blocking("cassette", cassette.save)
+    return result
+
+
+# OpenAI function-tool specs by (name, description, schema); MCP tools are
+# rebuilt per request, so the cache is keyed on the definition, not the object
+_OPENAI_TOOL_SPECS: "OrderedDict[str, Tuple[Dict[str, Any], bool]]" = OrderedDict()
+_OPENAI_TOOL_SPECS_MAX = 512
+
+
+def _tool_parameters(tool_obj: Any) -> Optional[Dict[str, Any]]:
+    """JSON Schema of a tool's arguments (args_schema / MCP input schema)."""
+    params = getattr(tool_obj, "parameters", None)  # cassette ReplayTool
+    if isinstance(params, dict):
+        return params
+    try:
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        params = convert_to_openai_tool(tool_obj)["function"].get("parameters")
+    except Exception:
+        return None
+    return params if isinstance(params, dict) else None
+
+
+def _openai_tool_spec(name: str, desc: str, params: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+    """(function tool spec, strict) for OpenAI; non-strict when strict mode can't express the schema."""
+    key = json.dumps([name, desc, params], sort_keys=True, default=str)
+    hit = _OPENAI_TOOL_SPECS.get(key)
+    if hit is not None:
+        _OPENAI_TOOL_SPECS.move_to_end(key)
+        return hit
+    strict = False
+    parameters: Dict[str, Any] = params or {"type": "object", "properties": {}}
+    if params is not None:
+        try:
+            parameters = to_openai_strict(params)
+            strict = True
+        except StrictSchemaUnsupported:
+            pass
+    metrics.inc("tool_schema_converted_total", strict=str(strict).lower())
+    spec = {
+        "type": "function",
+        "function": {"name": name, "description": desc, "parameters": parameters, "strict": strict},
+    }
+    _OPENAI_TOOL_SPECS[key] = (spec, strict)
+    while len(_OPENAI_TOOL_SPECS) > _OPENAI_TOOL_SPECS_MAX:
+        _OPENAI_TOOL_SPECS.popitem(last=False)
+    return spec, strict
+
+
+async def _call_model(phase: str, provider: str, model: str, aw: Any) -> Any:
+    """One upstream model call in budget `phase` (see utils.budget), under the request deadline.
+
+    Feeds the live per-model stats (latency, outcome) used for hedging and routing;
+    only provider/transport failures count as errors.
+    """
+    budget = current_budget.get()
+    if budget is not None:
+        try:
+            budget.reserve(phase)
+        except BudgetExceeded:
+            # Close the coroutine we will never await
+            aw.close()
+            raise
+    t0 = time.perf_counter()
+    try:
+        res = await within("finalize" if phase in ("finalize", "json_convert") else "model", aw)
+    except DeadlineExceeded:
+        # Our own time limit, not the provider's
+        raise
+    except Exception as exc:
+        status = to_http(exc)[0]
+        if latency.is_provider_failure(status):
+            latency.record_outcome(provider, model, False, status)
+        raise
+    latency.observe(provider, model, (time.perf_counter() - t0) * 1000.0)
+    latency.record_outcome(provider, model, True)
+    if budget is not None:
+        budget.record(phase, getattr(res, "usage_metadata", None) or _extract_usage(getattr(res, "response_metadata", None)))
+    return res
+
+
+async def _call_tool(tool_obj: Any, args: Any, cassette: Optional[Cassette], memo: Optional[ToolMemo] = None) -> Any:
+    async def _run() -> Any:
+        if cassette is not None:
+            return await cassette.call_tool(tool_obj, args)
+        if hasattr(tool_obj, "ainvoke"):
+            return await tool_obj.ainvoke(args)
+        # Sync-only tool: keep it off the event loop
+        return await run_blocking("tool", tool_obj.invoke, args)
+
+    if memo is not None:
+        return await memo.call(tool_obj, args, _run)
+    return await _run()
+
+
+async def _invoke(payload: Dict[str, Any], cassette: Optional[Cassette]) -> Dict[str, Any]:
     provider = payload.get("provider")
     model = payload.get("model")
     api_key = payload.get("api_key")
@@ -56,18 +183,28 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
     mcp_cfg = payload.get("mcp") or {}
     tools_planned = bool(mcp_cfg.get("servers")) or bool(extra.get("web_search"))
 
-    lc, meta_provider = _create_chat_model(
-        provider,
-        model,
-        api_key,
-        temperature,
-        max_tokens,
-        response_schema,
-        tools_planned,
-    )
-
-    cb = BufferingHandler()
-    messages = _to_lc_messages(payload.get("messages", []))
+    if cassette is not None and cassette.mode == "replay":
+        # Served from the recording: no provider SDK or credentials needed
+        lc, meta_provider = None, provider
+    else:
+        lc, meta_provider = _create_chat_model(
+            provider,
+            model,
+            api_key,
+            temperature,
+            max_tokens,
+            response_schema,
+            tools_planned,
+            extra,
+        )
+    if cassette is not None:
+        lc = cassette.wrap_model(lc)
+
+    # Skip building heavy log payloads when the caller projected `logs` away
+    cb = BufferingHandler(verbose=bool(payload.get("include_logs", True)))
+    # Sessions pass their cached LangChain history; copy so nothing here can extend it
+    lc_messages = payload.get("lc_messages")
+    messages = list(lc_messages) if lc_messages is not None else _to_lc_messages(payload.get("messages", []))
 
     # Emulate JSON modes for providers lacking native support
     emulate_json_only = bool(extra.get("json_mode"))
@@ -95,23 +232,38 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
                 )}
             ]) + messages
 
-    # Bind MCP tools if provided
-    tools = await abuild_mcp_tools(payload.get("mcp"))
-    # Add frontend FS tools if configured
-    try:
-        fs_tools = await build_fs_tools(payload)
-        if fs_tools:
-            tools = (tools or []) + fs_tools
-    except Exception:
-        pass
-    # Optionally add Tavily search tool when requested
-    try:
-        t_tool = await maybe_build_tavily_tool(payload)
-        if t_tool:
-            tools = (tools or []) + t_tool
-    except RuntimeError as e:
-        # Bubble up to main for nicer HTTP mapping
-        raise e
+    if cassette is not None and cassette.mode == "replay":
+        tools = cassette.replay_tools()
+    else:
+        # Bind MCP tools if provided
+        tools = await within("discovery", abuild_mcp_tools(payload.get("mcp")))
+        # Add frontend FS tools if configured
+        try:
+            fs_tools = await build_fs_tools(payload)
+            if fs_tools:
+                tools = (tools or []) + fs_tools
+        except Exception:
+            pass
+        # Optionally add Tavily search tool when requested
+        try:
+            t_tool = await maybe_build_tavily_tool(payload)
+            if t_tool:
+                tools = (tools or []) + t_tool
+        except RuntimeError as e:
+            # Bubble up to main for nicer HTTP mapping
+            raise e
+    # Repeated idempotent tool calls (FS reads/lists, Tavily, opted-in MCP tools) are memoized
+    memo = ToolMemo(payload.get("ws_conn_id"), (mcp_cfg.get("options") or {}).get("idempotent_tools"))
+    # Over-budget tool results are paged; the model fetches the rest via PAGE_TOOL_NAME
+    pager = ToolResultPager(extra.get("tool_result_budgets"))
+    if tools and not any(getattr(t, "name", None) == PAGE_TOOL_NAME for t in tools):
+        page_tool = pager.tool()
+        if page_tool is not None:
+            tools = tools + [page_tool]
+    if cassette is not None:
+        cassette.record_tools(tools)
+    # Original schemas of tools bound in OpenAI strict mode, by name
+    strict_params: Dict[str, Dict[str, Any]] = {}
     if tools:
         try:
             if provider == "openai":
@@ -145,6 +297,16 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
                             "required": ["path"],
                             "additionalProperties": False,
                         }
+                    if name == PAGE_TOOL_NAME:
+                        return {
+                            "type": "object",
+                            "properties": {
+                                "handle": {"type": "string", "description": "Continuation handle"},
+                                "page": {"type": "integer", "description": "Zero-based page number"},
+                            },
+                            "required": ["handle", "page"],
+                            "additionalProperties": False,
+                        }
                     return None
 
                 openai_tools: List[Dict[str, Any]] = []
@@ -152,13 +314,19 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
                     name = str(getattr(t, "name", None) or "tool")
                     desc = str(getattr(t, "description", ""))
                     schema = _fs_schema(name)
-                    if schema is None:
-                        # fallback minimal strict schema
-                        schema = {"type": "object", "properties": {}, "required": [], "additionalProperties": False}
-                    openai_tools.append({
-                        "type": "function",
-                        "function": {"name": name, "description": desc, "parameters": schema, "strict": True},
-                    })
+                    if schema is not None:
+                        openai_tools.append({
+                            "type": "function",
+                            "function": {"name": name, "description": desc, "parameters": schema, "strict": True},
+                        })
+                        continue
+                    # MCP / Tavily: the tool's own argument schema, made strict when possible
+                    params = _tool_parameters(t)
+                    spec, strict = _openai_tool_spec(name, desc, params)
+                    if strict:
+                        # Optional arguments became nullable; strip the nulls before calling
+                        strict_params[name] = params
+                    openai_tools.append(spec)
                 lc = lc.bind(tools=openai_tools)
             else:
                 lc = lc.bind_tools(tools)
@@ -179,10 +347,7 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
         if fs_list is not None:
             try:
                 cb.logs.append({"event": "fs_probe_start"})
-                if hasattr(fs_list, "ainvoke"):
-                    await fs_list.ainvoke({"path": "/"})
-                else:
-                    fs_list.invoke({"path": "/"})  # type: ignore[attr-defined]
+                await within("tool", _call_tool(fs_list, {"path": "/"}, cassette, memo))
                 cb.logs.append({"event": "fs_probe_ok"})
             except Exception as e:
                 cb.logs.append({"event": "fs_probe_error", "error": str(e)})
@@ -191,7 +356,7 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     # Anthropic structured outputs via tool binding
     # If MCP is configured, do NOT force the synthetic output tool — let the model plan tools first.
-    has_any_tools = bool(payload.get("mcp", {}).get("servers")) or bool(extra.get("web_search"))
+    has_any_tools = bool(mcp_cfg.get("servers")) or bool(extra.get("web_search"))
     if provider == "anthropic" and response_schema and not has_any_tools:
         try:
             schema_obj = enforce_no_additional_properties(response_schema)
@@ -201,7 +366,7 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
                 "input_schema": schema_obj,
             }
             bound = lc.bind(tools=[tool], tool_choice={"type": "tool", "name": "output"})
-            res = await bound.ainvoke(messages, config={"callbacks": [cb]})
+            res = await _call_model("forced_tool", provider, model, bound.ainvoke(messages, config={"callbacks": [cb]}))
             tool_calls = getattr(res, "tool_calls", None) or []
             if tool_calls:
                 args = tool_calls[0].get("args")
@@ -210,7 +375,9 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
             pass
 
     # Default invoke (may be followed by tool-exec loop)
-    res = await lc.ainvoke(messages, config={"callbacks": [cb]})
+    res = await _call_model("model", provider, model, lc.ainvoke(messages, config={"callbacks": [cb]}))
+    # Conversation the finalization passes continue from
+    history = None
 
     # Log any model-declared tool calls (useful for Anthropic/OpenAI tool plans)
     try:
@@ -230,7 +397,6 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
     if tools:
         from langchain_core.messages import ToolMessage
 
-        import time
         for _ in range(3):
             tool_calls = getattr(res, "tool_calls", None) or []
             if not tool_calls:
@@ -239,6 +405,8 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
             for tc in tool_calls:
                 name = tc.get("name")
                 args = tc.get("args", {})
+                if name in strict_params:
+                    args = drop_null_optionals(args, strict_params[name])
                 call_id = tc.get("id", name or "tool")
                 tool_obj = next((t for t in tools if getattr(t, "name", None) == name), None)
                 if not tool_obj:
@@ -248,22 +416,34 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
                         server = getattr(tool_obj, "_mcp_server", None)
                         start = time.perf_counter()
                         cb.logs.append({"event": "tool_execution_started", "name": name, "server": server, "args": args})
-                        if hasattr(tool_obj, "ainvoke"):
-                            result = await tool_obj.ainvoke(args)
-                        else:
-                            result = tool_obj.invoke(args)
-                        content = str(result)
+                        result = await within("tool", _call_tool(tool_obj, args, cassette, memo))
+                        content, size_info = pager.shape(str(name), str(result))
                         duration_ms = int((time.perf_counter() - start) * 1000)
-                        cb.logs.append({"event": "tool_execution_finished", "name": name, "server": server, "duration_ms": duration_ms, "result": content[:2000]})
+                        metrics.observe("tool_result_tokens", size_info["tokens"], server=server or "unknown")
+                        cb.logs.append({"event": "tool_execution_finished", "name": name, "server": server, "duration_ms": duration_ms, "result": content[:2000], **size_info})
                     except Exception as e:
                         content = f"Tool '{name}' failed: {e}"
                         cb.logs.append({"event": "tool_execution_error", "name": name, "server": server, "error": str(e)})
                 tool_msgs.append(ToolMessage(tool_call_id=call_id, content=content))
             messages = messages + [res] + tool_msgs
-            res = await lc.ainvoke(messages, config={"callbacks": [cb]})
+            try:
+                res = await _call_model("tool_loop", provider, model, lc.ainvoke(messages, config={"callbacks": [cb]}))
+            except DeadlineExceeded as e:
+                # Out of time mid-loop: finalize from the tool results gathered so far
+                cb.logs.append({"event": "deadline_exceeded", "phase": e.phase, "partial": True})
+                mark_partial(e.phase)
+                history = messages
+                break
+            except BudgetExceeded as e:
+                # Out of calls/tokens: any finalization below is refused too, so the last reply stands
+                cb.logs.append({"event": "budget_exceeded", "phase": e.phase, "partial": True})
+                history = messages
+                break
+    if history is None:
+        history = messages + [res]
 
     # Finalize into structured output when requested (post-tool phase)
-    if provider in ("anthropic", "openai", "google") and response_schema:
+    if provider in ("anthropic", "openai", "google", "mock") and response_schema:
         try:
             schema_obj = enforce_no_additional_properties(response_schema)
             tool = {
@@ -274,11 +454,18 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
             # Let the model emit a final structured result, using all prior context
             bound = lc.bind(tools=[tool], tool_choice={"type": "tool", "name": "output"})
             cb.logs.append({"event": "structured_output_requested", "provider": provider})
-            res2 = await bound.ainvoke(messages + [res], config={"callbacks": [cb]})
+            res2 = await _call_model("finalize", provider, model, bound.ainvoke(history, config={"callbacks": [cb]}))
             tool_calls = getattr(res2, "tool_calls", None) or []
             if tool_calls:
                 args = tool_calls[0].get("args")
                 return _normalize_response(res2, meta_provider, model, args, logs=cb.logs)
+        except BudgetExceeded:
+            # No calls left: surface budget_exceeded instead of a schema mismatch
+            raise
+        except DeadlineExceeded as e:
+            # Out of time: fall back to a local parse; a mismatch is then reported as the timeout
+            cb.logs.append({"event": "deadline_exceeded", "phase": e.phase, "partial": True})
+            mark_partial(e.phase)
         except Exception:
             # If finalization fails, fall back to best-effort parse below
             pass
@@ -287,11 +474,14 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
     if response_schema:
         try:
             import json as _json
-            # Try to parse existing content first
-            txt0 = getattr(res, "content", "")
-            if isinstance(txt0, str):
+            # Local extraction/repair first; the conversion call is only needed when
+            # nothing schema-valid can be recovered from the content itself
+            candidate = _extract_json(getattr(res, "content", ""))
+            if candidate is not None:
                 try:
-                    candidate = _json.loads(txt0.strip().strip("`"))
+                    validate_output_against_schema(candidate, response_schema)
+                    metrics.inc("json_conversion_total", result="local")
+                    cb.logs.append({"event": "json_extracted_locally", "provider": provider})
                     return _normalize_response(res, meta_provider, model, candidate, logs=cb.logs)
                 except Exception:
                     pass
@@ -303,10 +493,25 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
                 "Return ONLY the JSON with no commentary or code fences.\n\nSchema: "
                 + _json.dumps(schema_obj)
             )
-            res3 = await lc.ainvoke(messages + [res, HumanMessage(prompt)])
-            txt = getattr(res3, "content", "")
-            candidate = _json.loads(str(txt).strip().strip("`"))
+            try:
+                res3 = await _call_model("json_convert", provider, model, lc.ainvoke(history + [HumanMessage(prompt)]))
+            except (BudgetExceeded, DeadlineExceeded):
+                metrics.inc("json_conversion_total", result="refused")
+                raise
+            except Exception:
+                metrics.inc("json_conversion_total", result="failed")
+                raise
+            candidate = _extract_json(getattr(res3, "content", ""))
+            if candidate is None:
+                metrics.inc("json_conversion_total", result="failed")
+                raise ValueError("conversion reply contained no JSON")
+            metrics.inc("json_conversion_total", result="model")
             return _normalize_response(res3, meta_provider, model, candidate, logs=cb.logs)
+        except BudgetExceeded:
+            raise
+        except DeadlineExceeded as e:
+            cb.logs.append({"event": "deadline_exceeded", "phase": e.phase, "partial": True})
+            mark_partial(e.phase)
         except Exception:
             # Let the caller validate and raise if mismatched
             pass
@@ -315,24 +520,7 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
     parsed: Any = content
     if response_schema or (provider == "deepseek" and emulate_json_only):
         try:
-            import json
-            # common model behaviors: fenced blocks or leading prose
-            txt = content.strip()
-            if txt.startswith("```"):
-                # try to strip fences ```json ... ```
-                txt = txt.strip('`')
-                # fallback: find first and last brace
-            def try_parse(s: str):
-                try:
-                    return json.loads(s)
-                except Exception:
-                    return None
-            candidate = try_parse(txt)
-            if candidate is None:
-                import re
-                m = re.search(r"\{[\s\S]*\}\s*\Z", content)
-                if m:
-                    candidate = try_parse(m.group(0))
+            candidate = _extract_json(content)
             parsed = candidate if candidate is not None else content
         except Exception:
             parsed = content
@@ -340,6 +528,14 @@ async def lc_invoke_generic(payload: Dict[str, Any]) -> Dict[str, Any]:
     return _normalize_response(res, meta_provider, model, parsed, logs=cb.logs)
 
 
+def _extract_json(content: Any) -> Any:
+    """Best-effort parse of a model reply as JSON; returns None when nothing parses."""
+    try:
+        return extract_json(content)
+    except NotFound:
+        return None
+
+
 def _extract_usage(meta: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not isinstance(meta, dict):
         return None
@@ -405,6 +601,7 @@ def _create_chat_model(
     max_tokens: Optional[int],
     response_schema: Optional[Dict[str, Any]],
     tools_planned: bool,
+    extra: Optional[Dict[str, Any]] = None,
 ):
     params: Dict[str, Any] = {"model": model}
     # Only include temperature if the model supports it
@@ -457,30 +654,39 @@ def _create_chat_model(
         from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(**params), "google"
 
-    raise RuntimeError(f"Unsupported provider: {provider}")
+    if provider == "mock":
+        # Offline simulator; latency/errors/tool rounds come from `extra.mock`
+        return create_mock_model(model, extra), "mock"
 
+    raise RuntimeError(f"Unsupported provider: {provider}")
 
-def _model_supports_temperature(provider: str, model_id: str) -> bool:
-    """Lookup support from the provider model catalog JSON. Defaults to True.
 
-    The catalog lives in backend/app/model_catalog/<provider>.json and each model
-    entry may include `supports_temperature: boolean`.
-    """
+@lru_cache(maxsize=None)
+def _catalog_models(provider: str) -> tuple:
+    """Model entries of backend/app/model_catalog/<provider>.json, read once per process."""
     try:
         # provider catalogs live under app/model_catalog; from providers/, go up one
         base = Path(__file__).parent.parent / "model_catalog"
-        path = base / f"{provider}.json"
-        data = json.loads(path.read_text())
+        data = json.loads((base / f"{provider}.json").read_text())
         models = data.get("models", []) if isinstance(data, dict) else []
-        for m in models:
-            if str(m.get("id")) == str(model_id):
-                val = m.get("supports_temperature")
-                if isinstance(val, bool):
-                    return val
-                break
+        return tuple(m for m in models if isinstance(m, dict))
     except Exception:
-        # On any error (missing file or bad JSON), assume supported
-        pass
+        return ()
+
+
+def _model_supports_temperature(provider: str, model_id: str) -> bool:
+    """Lookup support from the provider model catalog JSON. Defaults to True.
+
+    The catalog lives in backend/app/model_catalog/<provider>.json and each model
+    entry may include `supports_temperature: boolean`. On any error (missing
+    file or bad JSON), assume supported.
+    """
+    for m in _catalog_models(provider):
+        if str(m.get("id")) == str(model_id):
+            val = m.get("supports_temperature")
+            if isinstance(val, bool):
+                return val
+            break
     return True
 
 
@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from ..utils.schema import (
+    enforce_no_additional_properties,
+    enforce_no_additional_properties_deep,
+    enforce_required_all_properties_deep,
+)
+from .. import drain
+from .adapter import _extract_json, _extract_usage, _model_supports_temperature
+
+# Asynchronous provider batch APIs used by POST /llm/batches.
+#
+# Every backend has the same lifecycle:
+#   create(items) -> remote id      items: [{"custom_id", "payload"}]
+#   retrieve(id)  -> {"status", "done", "counts"}
+#   results(id)   -> {custom_id: {"ok": True, "result": InvokeResponse fields}
+#                     | {"ok": False, "status", "error": {code, message, details}}}
+#   cancel(id)
+# Only tool-free requests qualify: a batch line is one model call, so there is
+# no tool loop and no structured-output finalization round.
+
+# Anthropic requires max_tokens; same default as langchain-anthropic
+ANTHROPIC_DEFAULT_MAX_TOKENS = 1024
+# Per-provider ceilings on requests in one batch
+MAX_BATCH_REQUESTS = {"openai": 50000, "anthropic": 100000}
+
+_ENV_KEYS = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY"}
+
+
+def _sdk_available(provider: str) -> bool:
+    try:
+        if provider == "openai":
+            import openai  # noqa: F401
+        elif provider == "anthropic":
+            import anthropic  # noqa: F401
+        else:
+            return False
+        return True
+    except Exception:
+        return False
+
+
+def _wants_json(payload: Dict[str, Any]) -> bool:
+    return bool(payload.get("response_schema")) or bool((payload.get("extra") or {}).get("json_mode"))
+
+
+def _error(status: int, code: str, message: str, details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {"ok": False, "status": status, "error": {"code": code, "message": message, "details": details}}
+
+
+def batch_eligible(payload: Dict[str, Any]) -> bool:
+    """True when a prepared invoke payload is a single model call (no tools, hedging or pool)."""
+    extra = payload.get("extra") or {}
+    if (payload.get("mcp") or {}).get("servers") or (payload.get("fs") or {}).get("nodes"):
+        return False
+    if extra.get("web_search") or extra.get("hedge"):
+        return False
+    return True
+
+
+def provider_batch_available(provider: str, api_key: Optional[str]) -> bool:
+    """The provider has a batch API, its SDK is installed and a key is at hand."""
+    if provider not in _ENV_KEYS or not _sdk_available(provider):
+        return False
+    return bool(api_key or os.getenv(_ENV_KEYS[provider]))
+
+
+class BatchBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def create(self, items: List[Dict[str, Any]]) -> str:
+        """Submit `items` ({custom_id, payload}); returns the backend's batch id."""
+
+    @abstractmethod
+    async def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        """Current state: {status, done, counts}."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """Per-item outcomes by custom_id, once `retrieve` reports done."""
+
+    @abstractmethod
+    async def cancel(self, batch_id: str) -> None:
+        """Stop the batch; items not yet run are not billed."""
+
+    async def close(self) -> None:
+        client = getattr(self, "client", None)
+        if client is not None:
+            await client.close()
+
+
+class OpenAIBatch(BatchBackend):
+    """OpenAI Batch API: JSONL upload to /v1/chat/completions, 24h completion window."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None) -> None:
+        from openai import AsyncOpenAI
+
+        self.client = drain.register_client(AsyncOpenAI(api_key=api_key) if api_key else AsyncOpenAI())
+        # custom_id -> payload, for normalizing results
+        self.payloads: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def request_body(payload: Dict[str, Any]) -> Dict[str, Any]:
+        model = payload["model"]
+        body: Dict[str, Any] = {"model": model, "messages": payload.get("messages", [])}
+        if payload.get("temperature") is not None and _model_supports_temperature("openai", model):
+            body["temperature"] = payload["temperature"]
+        if payload.get("max_tokens") is not None:
+            body["max_completion_tokens"] = payload["max_tokens"]
+        schema = payload.get("response_schema")
+        if schema:
+            # Same strict normalization as the interactive path
+            strict_schema = enforce_required_all_properties_deep(enforce_no_additional_properties_deep(schema))
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "llm_flow_schema", "schema": strict_schema, "strict": True},
+            }
+        elif (payload.get("extra") or {}).get("json_mode"):
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    async def create(self, items: List[Dict[str, Any]]) -> str:
+        lines = []
+        for item in items:
+            self.payloads[item["custom_id"]] = item["payload"]
+            lines.append(json.dumps({
+                "custom_id": item["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self.request_body(item["payload"]),
+            }))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        uploaded = await self.client.files.create(file=(f"llm-batch-{uuid.uuid4().hex}.jsonl", data), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window="24h",
+        )
+        return batch.id
+
+    async def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        batch = await self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "done": batch.status in ("completed", "failed", "expired", "cancelled"),
+            "counts": {"total": counts.total, "completed": counts.completed, "failed": counts.failed} if counts else None,
+        }
+
+    async def _lines(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        if not file_id:
+            return []
+        content = await self.client.files.content(file_id)
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    async def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        batch = await self.client.batches.retrieve(batch_id)
+        out: Dict[str, Dict[str, Any]] = {}
+        for line in await self._lines(batch.output_file_id) + await self._lines(batch.error_file_id):
+            out[line.get("custom_id")] = self.parse_line(line)
+        return out
+
+    def parse_line(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        payload = self.payloads.get(line.get("custom_id"), {})
+        err = line.get("error")
+        resp = line.get("response") or {}
+        status = int(resp.get("status_code") or (500 if err else 200))
+        body = resp.get("body") or {}
+        if err and err.get("code") == "batch_expired":
+            return _error(504, "batch_expired", "Batch expired before the request ran")
+        if err or status >= 400:
+            e = err or body.get("error") or {}
+            return _error(status, "provider_bad_request" if 400 <= status < 500 else "upstream_error",
+                          str(e.get("message") or "Batch request failed"), {"type": e.get("code") or e.get("type")})
+        choices = body.get("choices") or [{}]
+        content = (choices[0].get("message") or {}).get("content")
+        output: Any = content
+        if _wants_json(payload):
+            parsed = _extract_json(content)
+            output = parsed if parsed is not None else content
+        return {"ok": True, "result": {
+            "id": body.get("id"),
+            "output": output,
+            "provider": "openai",
+            "model": body.get("model") or payload.get("model"),
+            "usage": _extract_usage({"usage": body.get("usage")}),
+            "raw": {"batch_request_id": line.get("id"), "finish_reason": choices[0].get("finish_reason")},
+        }}
+
+    async def cancel(self, batch_id: str) -> None:
+        await self.client.batches.cancel(batch_id)
+
+
+class AnthropicBatch(BatchBackend):
+    """Anthropic Message Batches API; structured output via a forced `output` tool."""
+
+    name = "anthropic"
+
+    def __init__(self, api_key: Optional[str] = None) -> None:
+        from anthropic import AsyncAnthropic
+
+        self.client = drain.register_client(AsyncAnthropic(api_key=api_key) if api_key else AsyncAnthropic())
+        self.payloads: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def request_params(payload: Dict[str, Any]) -> Dict[str, Any]:
+        model = payload["model"]
+        system = [m["content"] for m in payload.get("messages", []) if m.get("role") == "system"]
+        params: Dict[str, Any] = {
+            "model": model,
+            "max_tokens": payload.get("max_tokens") or ANTHROPIC_DEFAULT_MAX_TOKENS,
+            "messages": [
+                {"role": m["role"], "content": m["content"]}
+                for m in payload.get("messages", []) if m.get("role") != "system"
+            ],
+        }
+        if system:
+            params["system"] = "\n\n".join(system)
+        if payload.get("temperature") is not None and _model_supports_temperature("anthropic", model):
+            # Anthropic caps temperature at 1.0
+            params["temperature"] = min(1.0, float(payload["temperature"]))
+        schema = payload.get("response_schema")
+        if schema:
+            params["tools"] = [{
+                "name": "output",
+                "description": "Return the structured result matching the schema.",
+                "input_schema": enforce_no_additional_properties(schema),
+            }]
+            params["tool_choice"] = {"type": "tool", "name": "output"}
+        return params
+
+    async def create(self, items: List[Dict[str, Any]]) -> str:
+        requests = []
+        for item in items:
+            self.payloads[item["custom_id"]] = item["payload"]
+            requests.append({"custom_id": item["custom_id"], "params": self.request_params(item["payload"])})
+        batch = await self.client.messages.batches.create(requests=requests)
+        return batch.id
+
+    async def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        c = batch.request_counts
+        return {
+            "status": batch.processing_status,
+            "done": batch.processing_status == "ended",
+            "counts": {
+                "processing": c.processing, "succeeded": c.succeeded, "errored": c.errored,
+                "canceled": c.canceled, "expired": c.expired,
+            } if c else None,
+        }
+
+    async def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        stream = await self.client.messages.batches.results(batch_id)
+        async for entry in stream:
+            out[entry.custom_id] = self.parse_entry(entry.custom_id, entry.result.model_dump())
+        return out
+
+    def parse_entry(self, custom_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        payload = self.payloads.get(custom_id, {})
+        kind = result.get("type")
+        if kind == "canceled":
+            return _error(499, "batch_cancelled", "Request was cancelled before it ran")
+        if kind == "expired":
+            return _error(504, "batch_expired", "Batch expired before the request ran")
+        if kind != "succeeded":
+            e = (result.get("error") or {}).get("error") or {}
+            status = 400 if e.get("type") == "invalid_request_error" else 500
+            return _error(status, "provider_bad_request" if status == 400 else "upstream_error",
+                          str(e.get("message") or "Batch request failed"), {"type": e.get("type")})
+        msg = result.get("message") or {}
+        blocks = msg.get("content") or []
+        output: Any = None
+        if payload.get("response_schema"):
+            output = next((b.get("input") for b in blocks if b.get("type") == "tool_use" and b.get("name") == "output"), None)
+        if output is None:
+            text = "".join(b.get("text", "") for b in blocks if b.get("type") == "text")
+            output = text
+            if _wants_json(payload):
+                parsed = _extract_json(text)
+                output = parsed if parsed is not None else text
+        return {"ok": True, "result": {
+            "id": msg.get("id"),
+            "output": output,
+            "provider": "anthropic",
+            "model": msg.get("model") or payload.get("model"),
+            "usage": _extract_usage({"usage": msg.get("usage")}),
+            "raw": {"stop_reason": msg.get("stop_reason")},
+        }}
+
+    async def cancel(self, batch_id: str) -> None:
+        await self.client.messages.batches.cancel(batch_id)
+
+
+class LocalBatch(BatchBackend):
+    """Offline stand-in with the provider lifecycle: items run in the background
+    through the regular adapter (e.g. the mock provider), results are collected
+    once every item has finished."""
+
+    name = "local"
+
+    def __init__(self, concurrency: int = 4) -> None:
+        self.concurrency = max(1, concurrency)
+        # Batches still held by this backend; dropped once collected or cancelled
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    async def create(self, items: List[Dict[str, Any]]) -> str:
+        from . import REGISTRY
+
+        batch_id = f"localbatch-{uuid.uuid4().hex}"
+        state: Dict[str, Any] = {"total": len(items), "results": {}, "task": None}
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(item: Dict[str, Any]) -> None:
+            payload = dict(item["payload"], include_logs=False)
+            async with sem:
+                try:
+                    res = await REGISTRY[payload["provider"]]["invoke"](payload)
+                    result = {k: res.get(k) for k in ("id", "output", "provider", "model", "usage", "raw")}
+                    state["results"][item["custom_id"]] = {"ok": True, "result": result}
+                except Exception as e:
+                    from ..utils.errors import to_http
+
+                    status, code, message, details = to_http(e)
+                    state["results"][item["custom_id"]] = _error(status, code, message, details)
+
+        async def run_all() -> None:
+            await asyncio.gather(*(one(item) for item in items))
+
+        state["task"] = asyncio.ensure_future(run_all())
+        self._batches[batch_id] = state
+        return batch_id
+
+    async def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        state = self._batches[batch_id]
+        task = state["task"]
+        done = task.done()
+        status = ("cancelled" if task.cancelled() else "ended") if done else "in_progress"
+        return {"status": status, "done": done, "counts": {"total": state["total"], "completed": len(state["results"])}}
+
+    async def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        state = self._batches.pop(batch_id, None)
+        return dict(state["results"]) if state else {}
+
+    async def cancel(self, batch_id: str) -> None:
+        state = self._batches.pop(batch_id, None)
+        if state is not None:
+            state["task"].cancel()
+
+    async def close(self) -> None:
+        # Batches never collected (e.g. polling failed) must not keep running
+        for state in self._batches.values():
+            state["task"].cancel()
+        self._batches.clear()
+
+
+def make_backend(kind: str, api_key: Optional[str] = None, concurrency: int = 4) -> BatchBackend:
+    if kind == "openai":
+        return OpenAIBatch(api_key)
+    if kind == "anthropic":
+        return AnthropicBatch(api_key)
+    return LocalBatch(concurrency)
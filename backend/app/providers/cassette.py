@@ -0,0 +1,240 @@
+"""Record/replay of model calls and tool executions for reproducible runs.
+
+Enabled process-wide via environment variables:
+
+- `LLM_CASSETTE_MODE`: `off` (default) | `record` | `replay`
+- `LLM_CASSETTE_DIR`: directory holding `<request-hash>.json.gz` cassettes
+- `LLM_CASSETTE_REPLAY_LATENCY`: `1` to sleep the recorded durations on replay
+
+A cassette is keyed by the request (provider, model, messages, schema, tool
+config — never API keys or connection ids) and stores the ordered model and
+tool interactions with their timings. Replay needs no network and no provider
+SDK credentials, which isolates the backend's own orchestration overhead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..utils.blocking import run_blocking
+from ..utils.errors import RecordedError, to_http
+
+
+_EXCLUDED_KEYS = ("api_key", "tavily_api_key", "ws_conn_id", "retries", "include_logs", "lc_messages")
+
+
+class CassetteMissError(RuntimeError):
+    """Replay requested but no matching recording exists."""
+
+    status_code = 501
+
+
+def cassette_mode() -> str:
+    mode = (os.getenv("LLM_CASSETTE_MODE") or "off").strip().lower()
+    return mode if mode in ("record", "replay") else "off"
+
+
+def _canonical(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(_canonical(obj).encode("utf-8")).hexdigest()[:24]
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    return _digest({k: v for k, v in payload.items() if k not in _EXCLUDED_KEYS})
+
+
+def _error(e: Exception) -> Dict[str, Any]:
+    # Enough to raise an equivalent exception on replay (see `_raise_recorded`)
+    status, code, message, details = to_http(e)
+    return {"error": str(e), "status": status, "code": code, "message": message, "details": details}
+
+
+def _raise_recorded(item: Dict[str, Any]) -> None:
+    # Cassettes recorded before status/code were kept replay as plain 500s
+    raise RecordedError(str(item["error"]), status_code=int(item.get("status") or 500),
+                        code=item.get("code") or "upstream_error", message=item.get("message"),
+                        details=item.get("details"))
+
+
+def _messages_key(messages: Any, bound: Dict[str, Any]) -> str:
+    items = []
+    for m in messages or []:
+        items.append([getattr(m, "type", None), getattr(m, "content", m), getattr(m, "tool_calls", None)])
+    return _digest({"messages": items, "bound": sorted(bound.keys())})
+
+
+class Cassette:
+    """Per-invocation recorder/player; `None` is used instead when mode is off."""
+
+    def __init__(self, mode: str, path: Path, key: str, payload: Dict[str, Any]):
+        self.mode = mode
+        self.path = path
+        self.key = key
+        self.replay_latency = os.getenv("LLM_CASSETTE_REPLAY_LATENCY", "0") == "1"
+        self.interactions: List[Dict[str, Any]] = []
+        self.tools: List[Dict[str, Any]] = []
+        self._request = {k: v for k, v in payload.items() if k not in _EXCLUDED_KEYS}
+        self._cursor = {"model": 0, "tool": 0}
+        if mode == "replay":
+            if not path.exists():
+                raise CassetteMissError(f"cassette: no recording for request {key}")
+            data = json.loads(gzip.decompress(path.read_bytes()).decode("utf-8"))
+            self.interactions = data.get("interactions") or []
+            self.tools = data.get("tools") or []
+
+    # ---- model calls -------------------------------------------------------
+    def wrap_model(self, lc: Any) -> "CassetteModel":
+        return CassetteModel(self, lc, {})
+
+    def _next(self, kind: str, match: str) -> Dict[str, Any]:
+        items = [i for i in self.interactions if i.get("kind") == kind]
+        # Prefer an exact match at or after the cursor, else fall back to order
+        for idx in range(self._cursor[kind], len(items)):
+            if items[idx].get("key") == match:
+                self._cursor[kind] = idx + 1
+                return items[idx]
+        if self._cursor[kind] < len(items):
+            item = items[self._cursor[kind]]
+            self._cursor[kind] += 1
+            return item
+        raise CassetteMissError(f"cassette: no recorded {kind} interaction left for request {self.key}")
+
+    async def _delay(self, item: Dict[str, Any]) -> None:
+        if self.replay_latency and item.get("ms"):
+            await asyncio.sleep(float(item["ms"]) / 1000.0)
+
+    # ---- tools -------------------------------------------------------------
+    def record_tools(self, tools: List[Any]) -> None:
+        if self.mode != "record":
+            return
+        specs = []
+        for t in tools or []:
+            schema: Any = None
+            try:
+                from langchain_core.utils.function_calling import convert_to_openai_tool
+                schema = convert_to_openai_tool(t)["function"].get("parameters")
+            except Exception:
+                schema = None
+            specs.append({
+                "name": str(getattr(t, "name", "tool")),
+                "description": str(getattr(t, "description", "")),
+                "parameters": schema,
+                "server": getattr(t, "_mcp_server", None),
+            })
+        self.tools = specs
+
+    def replay_tools(self) -> List[Any]:
+        return [ReplayTool(self, spec) for spec in self.tools]
+
+    async def call_tool(self, tool_obj: Any, args: Any) -> Any:
+        name = str(getattr(tool_obj, "name", "tool"))
+        match = _digest({"name": name, "args": args})
+        if self.mode == "replay":
+            item = self._next("tool", match)
+            await self._delay(item)
+            if item.get("error") is not None:
+                _raise_recorded(item)
+            return item.get("result")
+        start = time.perf_counter()
+        try:
+            if hasattr(tool_obj, "ainvoke"):
+                result = await tool_obj.ainvoke(args)
+            else:
+                result = await run_blocking("tool", tool_obj.invoke, args)
+        except Exception as e:
+            self.interactions.append({"kind": "tool", "key": match, "name": name, "args": args, **_error(e),
+                                      "ms": round((time.perf_counter() - start) * 1000, 3)})
+            raise
+        self.interactions.append({"kind": "tool", "key": match, "name": name, "args": args, "result": str(result),
+                                  "ms": round((time.perf_counter() - start) * 1000, 3)})
+        return result
+
+    def save(self) -> None:
+        if self.mode != "record":
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        doc = {"version": 1, "key": self.key, "request": self._request, "tools": self.tools,
+               "interactions": self.interactions}
+        data = gzip.compress(_canonical(doc).encode("utf-8"))
+        # Unique temp file per write: identical requests (hedges, load runs) save concurrently
+        with tempfile.NamedTemporaryFile(dir=self.path.parent, prefix=f".{self.key}.", suffix=".tmp", delete=False) as f:
+            f.write(data)
+        try:
+            os.replace(f.name, self.path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+
+
+class CassetteModel:
+    """Minimal stand-in for a bound chat model: supports bind/bind_tools/ainvoke."""
+
+    def __init__(self, cassette: Cassette, inner: Any, bound: Dict[str, Any]):
+        self._cassette = cassette
+        self._inner = inner
+        self._bound = bound
+
+    def bind(self, **kwargs: Any) -> "CassetteModel":
+        inner = self._inner.bind(**kwargs) if self._inner is not None else None
+        return CassetteModel(self._cassette, inner, {**self._bound, **kwargs})
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "CassetteModel":
+        inner = self._inner.bind_tools(tools, **kwargs) if self._inner is not None else None
+        return CassetteModel(self._cassette, inner, {**self._bound, "tools": tools, **kwargs})
+
+    async def ainvoke(self, messages: Any, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        from langchain_core.messages import message_to_dict, messages_from_dict
+
+        c = self._cassette
+        match = _messages_key(messages, self._bound)
+        if c.mode == "replay":
+            item = c._next("model", match)
+            await c._delay(item)
+            if item.get("error") is not None:
+                _raise_recorded(item)
+            return messages_from_dict([item["response"]])[0]
+        start = time.perf_counter()
+        try:
+            res = await self._inner.ainvoke(messages, config=config, **kwargs)
+        except Exception as e:
+            c.interactions.append({"kind": "model", "key": match, "n_messages": len(messages or []), **_error(e),
+                                   "ms": round((time.perf_counter() - start) * 1000, 3)})
+            raise
+        c.interactions.append({"kind": "model", "key": match, "n_messages": len(messages or []),
+                               "response": message_to_dict(res),
+                               "ms": round((time.perf_counter() - start) * 1000, 3)})
+        return res
+
+
+class ReplayTool:
+    """Tool placeholder rebuilt from a cassette; results come from the recording."""
+
+    def __init__(self, cassette: Cassette, spec: Dict[str, Any]):
+        self._cassette = cassette
+        self.name = spec.get("name") or "tool"
+        self.description = spec.get("description") or ""
+        self.parameters = spec.get("parameters") or {"type": "object", "properties": {}}
+        self._mcp_server = spec.get("server")
+
+    async def ainvoke(self, args: Any) -> Any:
+        return await self._cassette.call_tool(self, args)
+
+
+def open_cassette(payload: Dict[str, Any]) -> Optional[Cassette]:
+    mode = cassette_mode()
+    if mode == "off":
+        return None
+    base = Path(os.getenv("LLM_CASSETTE_DIR") or "cassettes")
+    key = request_key(payload)
+    return Cassette(mode, base / f"{key}.json.gz", key, payload)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..ws_registry import get_state
+from .tool_cache import normalize_path
+
+
+def mirror_enabled() -> bool:
+    """Server-side switch (LLM_FS_MIRROR=1); announced to the browser in the `hello` frame."""
+    return os.getenv("LLM_FS_MIRROR", "0").strip().lower() in ("1", "true", "yes")
+
+
+def mirror_max_bytes() -> int:
+    try:
+        return int(os.getenv("LLM_FS_MIRROR_MAX_BYTES", str(64 * 1024 * 1024)))
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+class FsMirror:
+    """Backend copy of one browser's VFS (`fs_entries` table), kept in sync by events.
+
+    Listing semantics match `VFS.listDirectory` in `frontend/src/fs/vfs.ts`.
+    """
+
+    def __init__(self) -> None:
+        # path -> (type, content); content is None for directories
+        self.entries: Dict[str, Tuple[str, Optional[str]]] = {}
+        self.ready = False
+        self.bytes = 0
+
+    def _put(self, path: str, type_: str, content: Optional[str]) -> None:
+        old = self.entries.get(path)
+        if old and old[1]:
+            self.bytes -= len(old[1])
+        self.entries[path] = (type_, content)
+        if content:
+            self.bytes += len(content)
+
+    def _drop(self, path: str) -> None:
+        old = self.entries.pop(path, None)
+        if old and old[1]:
+            self.bytes -= len(old[1])
+
+    def load_snapshot(self, items: Any) -> bool:
+        """Replace contents with a snapshot; returns False (and stays unready) if too large."""
+        self.entries.clear()
+        self.bytes = 0
+        limit = mirror_max_bytes()
+        for it in items or []:
+            if not isinstance(it, dict) or not it.get("path"):
+                continue
+            type_ = "dir" if it.get("type") == "dir" else "file"
+            content = it.get("content") if type_ == "file" else None
+            self._put(normalize_path(it["path"]), type_, None if content is None else str(content))
+            if self.bytes > limit:
+                self.entries.clear()
+                self.bytes = 0
+                self.ready = False
+                return False
+        self.ready = True
+        return True
+
+    def write(self, path: Any, content: str) -> None:
+        p = normalize_path(path)
+        parts = [x for x in p.split("/") if x]
+        acc = ""
+        for part in parts[:-1]:
+            acc += "/" + part
+            if acc not in self.entries:
+                self._put(acc, "dir", None)
+        self._put(p, "file", content)
+        if self.bytes > mirror_max_bytes():
+            # Grew past the cap: fall back to RPC for this connection
+            self.ready = False
+
+    def delete(self, path: Any) -> None:
+        p = normalize_path(path)
+        if self.entries.get(p, ("", None))[0] == "file":
+            self._drop(p)
+
+    def rename(self, src: Any, dst: Any) -> None:
+        s, d = normalize_path(src), normalize_path(dst)
+        entry = self.entries.get(s)
+        if s == d or not entry or entry[0] != "file":
+            return
+        self._drop(s)
+        self.write(d, entry[1] or "")
+
+    def apply_change(self, msg: Dict[str, Any]) -> None:
+        op = msg.get("op")
+        if op == "write" and "content" in msg:
+            self.write(msg.get("path"), str(msg.get("content") or ""))
+        elif op == "delete":
+            self.delete(msg.get("path"))
+        elif op == "rename":
+            self.rename(msg.get("path"), msg.get("to"))
+        else:
+            # Change without payload (older frontend): we can no longer trust the copy
+            self.ready = False
+
+    def read(self, path: Any) -> str:
+        entry = self.entries.get(normalize_path(path))
+        if not entry or entry[0] != "file":
+            raise RuntimeError("File not found")
+        return entry[1] or ""
+
+    def list(self, path: Any) -> List[Dict[str, Any]]:
+        norm = normalize_path(path)
+        prefix = "/" if norm == "/" else norm + "/"
+        children: Dict[str, Dict[str, Any]] = {}
+        for p, (t, c) in self.entries.items():
+            if not p.startswith(prefix):
+                continue
+            rest = p[len(prefix):]
+            if not rest:
+                continue
+            first = rest.split("/")[0]
+            child = prefix + first
+            if child in children:
+                continue
+            nested = "/" in rest
+            entry: Dict[str, Any] = {"path": child, "type": "dir" if nested else t}
+            if t == "file" and not nested and isinstance(c, str):
+                entry["size"] = len(c)
+            children[child] = entry
+        return [children[k] for k in sorted(children)]
+
+
+def get_mirror(conn_id: Optional[str], *, create: bool = False) -> Optional[FsMirror]:
+    if not conn_id:
+        return None
+    st = get_state(conn_id)
+    if st is None:
+        return None
+    mirror = st.get("fs_mirror")
+    if mirror is None and create:
+        mirror = st["fs_mirror"] = FsMirror()
+    return mirror
+
+
+def ready_mirror(conn_id: Optional[str]) -> Optional[FsMirror]:
+    m = get_mirror(conn_id)
+    return m if m is not None and m.ready else None
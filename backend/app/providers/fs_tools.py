@@ -3,9 +3,14 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 import json
 import asyncio
+import time
+import uuid
 
 from fastapi import WebSocket
-from ..ws_registry import get_ws, register_pending
+from ..ws_registry import get_ws, register_pending, discard_pending, send_to, acquire_rpc_slot, release_rpc_slot, record_rpc
+from ..utils.deadline import current_deadline
+from .. import logs
+from .fs_mirror import ready_mirror
 from pydantic import BaseModel, Field
 try:
     from langchain_core.tools import StructuredTool  # type: ignore
@@ -26,27 +31,38 @@ class _WsFsToolBase:
         return ws
 
     async def _rpc(self, payload: Dict[str, Any]) -> Any:
-        ws = self._get_ws()
-        call_id = f"{self.name}-{int(asyncio.get_event_loop().time()*1000)}"
-        fut = register_pending(self._conn_id, call_id)
-        msg = dict(payload)
-        msg["id"] = call_id
-        msg["type"] = "req"
+        self._get_ws()
+        timeout = 10.0
+        dl = current_deadline.get()
+        if dl is not None:
+            timeout = dl.cap(timeout)
+        t0 = time.perf_counter()
+        # Bounded per connection so one slow tab can't accumulate unbounded futures
+        slots = await acquire_rpc_slot(self._conn_id, timeout)
+        ok = False
+        # Unique per call: concurrent tool calls in the same millisecond must not share a future
+        call_id = f"{self.name}-{uuid.uuid4().hex[:12]}"
         try:
-            print(f"[fs-ws] send {self._conn_id} {self.name} -> {msg}")
-        except Exception:
-            pass
-        await ws.send_text(json.dumps(msg))
-        try:
-            res = await asyncio.wait_for(fut, timeout=10.0)
-        except asyncio.TimeoutError:
-            raise RuntimeError("filesystem rpc timeout")
-        if not res or not res.get("ok"):
+            fut = register_pending(self._conn_id, call_id)
+            msg = dict(payload)
+            msg["id"] = call_id
+            msg["type"] = "req"
+            logs.log("fs-ws", "rpc_send", level="debug", conn_id=self._conn_id, tool=self.name, frame=dict(msg))
+            await send_to(self._conn_id, msg)
+            remaining = max(0.0, timeout - (time.perf_counter() - t0))
+            try:
+                res = await asyncio.wait_for(fut, timeout=remaining)
+            except asyncio.TimeoutError:
+                raise RuntimeError("filesystem rpc timeout")
+            ok = bool(res and res.get("ok"))
+        finally:
+            # No-op once resolved; on timeout/cancellation don't leave the future behind
+            discard_pending(self._conn_id, call_id)
+            release_rpc_slot(slots)
+            record_rpc(self._conn_id, (time.perf_counter() - t0) * 1000.0, ok)
+        if not ok:
             raise RuntimeError(str(res))
-        try:
-            print(f"[fs-ws] recv {self._conn_id} {self.name} <- {res}")
-        except Exception:
-            pass
+        logs.log("fs-ws", "rpc_recv", level="debug", conn_id=self._conn_id, tool=self.name, frame=res)
         return res
 
 
@@ -56,6 +72,9 @@ class FsReadFile(_WsFsToolBase):
         super().__init__(f"fs_read_file_{label}", conn_id)
     async def ainvoke(self, args: Dict[str, Any]):
         path = str(args.get("path") or "/")
+        mirror = ready_mirror(self._conn_id)
+        if mirror is not None:
+            return mirror.read(path)
         res = await self._rpc({"action": "fs_read", "path": path})
         return res.get("content", "")
 
@@ -68,6 +87,10 @@ class FsWriteFile(_WsFsToolBase):
         path = str(args.get("path") or "/")
         content = str(args.get("content") or "")
         await self._rpc({"action": "fs_write", "path": path, "content": content})
+        # Write-through: the browser is the source of truth, the mirror follows immediately
+        mirror = ready_mirror(self._conn_id)
+        if mirror is not None:
+            mirror.write(path, content)
         return "ok"
 
 
@@ -77,6 +100,9 @@ class FsListDir(_WsFsToolBase):
         super().__init__(f"fs_list_directory_{label}", conn_id)
     async def ainvoke(self, args: Dict[str, Any]):
         path = str(args.get("path") or "/")
+        mirror = ready_mirror(self._conn_id)
+        if mirror is not None:
+            return json.dumps(mirror.list(path))
         res = await self._rpc({"action": "fs_list", "path": path})
         return json.dumps(res.get("entries", []))
 
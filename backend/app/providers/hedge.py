@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .. import latency, metrics
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def hedge_settings(extra: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Parse `extra.hedge` (opt-in); None when hedging is off.
+
+    `extra.hedge` may be `true` or an object:
+      - `percentile` (default LLM_HEDGE_PERCENTILE, 95): fire the duplicate once the
+        primary has run longer than this percentile of recent latency for its provider/model
+      - `delay_ms`: delay to use until enough latency samples exist (no hedge otherwise)
+      - `min_delay_ms` (default 50): lower bound for the computed delay
+      - `fallback`: `{provider, model}` to send the duplicate to (default: same model)
+    Raises ValueError on malformed settings.
+    """
+    raw = (extra or {}).get("hedge")
+    if raw is None or raw is False:
+        return None
+    if raw is True:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise ValueError("extra.hedge must be a boolean or an object")
+    if raw.get("enabled") is False:
+        return None
+    try:
+        settings: Dict[str, Any] = {
+            "percentile": float(raw.get("percentile", _env_float("LLM_HEDGE_PERCENTILE", 95.0))),
+            "delay_ms": float(raw["delay_ms"]) if raw.get("delay_ms") is not None else None,
+            "min_delay_ms": float(raw.get("min_delay_ms", 50.0)),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("extra.hedge percentile/delay_ms/min_delay_ms must be numbers")
+    if not 0 < settings["percentile"] <= 100:
+        raise ValueError("extra.hedge.percentile must be in (0, 100]")
+    fb = raw.get("fallback")
+    if fb is not None:
+        if not isinstance(fb, dict) or not fb.get("provider") or not fb.get("model"):
+            raise ValueError("extra.hedge.fallback needs provider and model")
+        from . import REGISTRY
+        if fb["provider"] not in REGISTRY:
+            raise ValueError(f"extra.hedge.fallback provider '{fb['provider']}' not supported")
+        settings["fallback"] = {"provider": str(fb["provider"]), "model": str(fb["model"])}
+    return settings
+
+
+def hedge_blocker(payload: Dict[str, Any]) -> Optional[str]:
+    """Reason a call must not be duplicated, if any.
+
+    FS tools can write to the browser VFS and MCP tools may have arbitrary
+    side effects, so calls that bind either are never hedged. Web search is
+    read-only and allowed.
+    """
+    fs_cfg = payload.get("fs") or {}
+    if fs_cfg.get("nodes") and payload.get("ws_conn_id"):
+        return "fs_tools"
+    mcp = payload.get("mcp") or {}
+    if mcp.get("servers") or mcp.get("tools"):
+        return "mcp_tools"
+    return None
+
+
+def hedge_delay_ms(settings: Dict[str, Any], provider: str, model: str) -> Optional[float]:
+    observed = latency.percentile(provider, model, settings["percentile"])
+    delay = observed if observed is not None else settings.get("delay_ms")
+    if delay is None:
+        return None
+    return max(settings["min_delay_ms"], float(delay))
+
+
+async def _timed(provider: str, model: str, aw: Awaitable[Any]) -> Any:
+    """Await one invocation pipeline, counting it as in flight for its provider/model.
+
+    Latency and outcomes are recorded per model call by the adapter
+    (`adapter._call_model`), not here: the pipeline also spans tool calls and
+    finalization, and fails for reasons that are not the provider's
+    (deadlines, call budgets, bad requests).
+    """
+    latency.begin(provider, model)
+    try:
+        return await aw
+    finally:
+        latency.end(provider, model)
+
+
+async def race(primary: Callable[[], Awaitable[Any]], secondary: Callable[[], Awaitable[Any]], delay_s: float) -> Tuple[Any, str]:
+    """Start `primary`; if it is still running after `delay_s`, also start `secondary`.
+
+    The first success wins and the other call is cancelled. A failure only
+    surfaces once both calls have failed (or the primary fails before the
+    hedge fires). Returns (result, "primary" | "hedge" | "primary_only").
+    """
+    first = asyncio.ensure_future(primary())
+    labels = {first: "primary"}
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay_s)
+        if first in done:
+            return first.result(), "primary_only"
+        second = asyncio.ensure_future(secondary())
+        labels[second] = "hedge"
+        pending = set(labels)
+        last_exc: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in sorted(done, key=lambda t: labels[t] != "primary"):
+                if t.cancelled():
+                    continue
+                exc = t.exception()
+                if exc is None:
+                    return t.result(), labels[t]
+                last_exc = exc
+        raise last_exc or asyncio.CancelledError()
+    finally:
+        for t in labels:
+            if not t.done():
+                t.cancel()
+
+
+async def invoke_hedged(payload: Dict[str, Any], settings: Optional[Dict[str, Any]]) -> Any:
+    """Invoke the provider for `payload`, hedging per `settings` when allowed.
+
+    Model calls inside feed the live per-model stats used for hedge delays and routing.
+    """
+    from . import REGISTRY
+
+    provider, model = payload["provider"], payload["model"]
+
+    def primary() -> Awaitable[Any]:
+        return _timed(provider, model, REGISTRY[provider]["invoke"](payload))
+
+    if settings is None:
+        return await primary()
+    event: Dict[str, Any] = {"event": "hedge"}
+    blocker = hedge_blocker(payload)
+    delay_ms = None if blocker else hedge_delay_ms(settings, provider, model)
+    if blocker or delay_ms is None:
+        reason = blocker or "no_latency_samples"
+        metrics.inc("hedge_total", outcome="skipped", reason=reason)
+        result = await primary()
+        event.update({"fired": False, "skipped": reason})
+    else:
+        fb = settings.get("fallback") or {"provider": provider, "model": model}
+        hedge_payload = dict(payload, provider=fb["provider"], model=fb["model"])
+        if fb["provider"] != provider:
+            # The header key belongs to the primary provider; the fallback uses its env key
+            hedge_payload.pop("api_key", None)
+
+        def secondary() -> Awaitable[Any]:
+            return _timed(fb["provider"], fb["model"], REGISTRY[fb["provider"]]["invoke"](hedge_payload))
+
+        result, winner = await race(primary, secondary, delay_ms / 1000.0)
+        metrics.inc("hedge_total", outcome=winner)
+        event.update({"fired": winner != "primary_only", "winner": winner, "delay_ms": round(delay_ms, 1),
+                      "fallback": fb if winner == "hedge" else None})
+    if isinstance(result, dict) and isinstance(result.get("logs"), list):
+        result["logs"].append(event)
+    return result
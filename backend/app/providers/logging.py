@@ -13,28 +13,41 @@ except Exception:
 
 
 class BufferingHandler(BaseCallbackHandler):
-    """Collect LangChain callback events into an in-memory list for return."""
+    """Collect LangChain callback events into an in-memory list for return.
 
-    def __init__(self) -> None:
+    With `verbose=False` only event names are kept; the stringified prompts and
+    responses (the expensive part) are never built.
+    """
+
+    def __init__(self, verbose: bool = True) -> None:
         self.logs: List[Dict[str, Any]] = []
+        self.verbose = verbose
 
     def _append(self, event: str, **payload: Any) -> None:
         self.logs.append({"event": event, **payload})
 
     # Sync callbacks
     def on_llm_start(self, serialized, prompts, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("model_request_started")
         self._append("model_request_started", serialized=serialized, prompts=prompts)
 
     def on_llm_end(self, response, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("model_response_received")
         self._append("model_response_received", response=str(response))
 
     def on_llm_error(self, error, **kwargs):  # type: ignore[override]
         self._append("model_request_error", error=str(error))
 
     def on_chat_model_start(self, serialized, messages, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("model_request_started", kind="chat")
         self._append("model_request_started", serialized=serialized, messages=str(messages), kind="chat")
 
     def on_chat_model_end(self, response, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("model_response_received", kind="chat")
         self._append("model_response_received", response=str(response), kind="chat")
 
     def on_chat_model_error(self, error, **kwargs):  # type: ignore[override]
@@ -42,6 +55,8 @@ class BufferingHandler(BaseCallbackHandler):
 
     # Async variants for newer LangChain
     async def ahandle_event(self, *args, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("event")
         self._append("event", args=str(args), kwargs=str(kwargs))
 
     async def aon_llm_start(self, serialized, prompts, **kwargs):  # type: ignore[override]
@@ -64,9 +79,13 @@ class BufferingHandler(BaseCallbackHandler):
 
     # Tool callback hooks (LangChain tools)
     def on_tool_start(self, serialized, input_str, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("tool_execution_started")
         self._append("tool_execution_started", serialized=serialized, input=input_str)
 
     def on_tool_end(self, output, **kwargs):  # type: ignore[override]
+        if not self.verbose:
+            return self._append("tool_execution_finished")
         self._append("tool_execution_finished", output=str(output))
 
     def on_tool_error(self, error, **kwargs):  # type: ignore[override]
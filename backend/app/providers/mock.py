@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional, Union
+
+try:
+    from langchain_core.language_models.chat_models import BaseChatModel  # type: ignore
+    from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage  # type: ignore
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # type: ignore
+    from langchain_core.utils.function_calling import convert_to_openai_tool  # type: ignore
+except Exception:  # pragma: no cover
+    BaseChatModel = None  # type: ignore
+
+
+# Defaults for the simulated upstream; every key can be overridden per request
+# via `extra.mock` or process-wide via MOCK_<KEY> environment variables.
+MOCK_DEFAULTS: Dict[str, Any] = {
+    "latency_ms": 200,        # time to first token
+    "jitter_ms": 50,          # uniform +/- jitter applied to latency_ms
+    "token_ms": 5,            # delay per streamed output token
+    "output_tokens": 64,      # length of the generated text reply
+    "tool_rounds": 0,         # how many rounds of tool calls to request when tools are bound
+    "tool_name": None,        # restrict simulated tool calls to this tool (default: first bound tool)
+    "error_429_rate": 0.0,    # probability of a simulated rate-limit error
+    "error_5xx_rate": 0.0,    # probability of a simulated upstream 5xx error
+    "seed": None,             # seed for reproducible error/jitter sequences
+}
+
+
+_RNG = random.Random()
+# Generators by seed, least recently used first; seeds come from clients
+_SEEDED_RNGS: "OrderedDict[Union[int, str], random.Random]" = OrderedDict()
+_MAX_SEEDED_RNGS = 256
+
+
+def normalize_seed(seed: Any) -> Optional[Union[int, str]]:
+    """A seed as int or str (None when unset). Raises ValueError for anything else."""
+    if seed is None or isinstance(seed, (int, str)):
+        return seed
+    if isinstance(seed, float) and seed.is_integer():
+        return int(seed)
+    raise ValueError("extra.mock.seed must be an integer or a string")
+
+
+def check_mock_settings(extra: Optional[Dict[str, Any]]) -> None:
+    """Validate request-supplied seeds (`extra.mock.seed`, `extra.mock.models.<model>.seed`).
+
+    Raises ValueError on malformed settings.
+    """
+    overrides = extra.get("mock") if isinstance(extra, dict) else None
+    if not isinstance(overrides, dict):
+        return
+    normalize_seed(overrides.get("seed"))
+    models = overrides.get("models")
+    for per_model in (models.values() if isinstance(models, dict) else ()):
+        if isinstance(per_model, dict):
+            normalize_seed(per_model.get("seed"))
+
+
+class MockUpstreamError(RuntimeError):
+    """Simulated provider error; carries `status_code` so `to_http` maps it."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def mock_settings(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge defaults, MOCK_* environment variables and per-request overrides."""
+    cfg = dict(MOCK_DEFAULTS)
+    for key, default in MOCK_DEFAULTS.items():
+        env = os.getenv(f"MOCK_{key.upper()}")
+        if env is None:
+            continue
+        try:
+            if isinstance(default, float):
+                cfg[key] = float(env)
+            elif isinstance(default, int):
+                cfg[key] = int(env)
+            else:
+                cfg[key] = env
+        except ValueError:
+            pass
+    if isinstance(overrides, dict):
+        for k, v in overrides.items():
+            if k in MOCK_DEFAULTS:
+                cfg[k] = v
+    return cfg
+
+
+def sample_from_schema(schema: Any, depth: int = 0) -> Any:
+    """Produce a minimal value conforming to a (simple) JSON Schema."""
+    if not isinstance(schema, dict) or depth > 16:
+        return None
+    if "const" in schema:
+        return schema["const"]
+    if isinstance(schema.get("enum"), list) and schema["enum"]:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf"):
+        opts = schema.get(key)
+        if isinstance(opts, list) and opts:
+            return sample_from_schema(opts[0], depth + 1)
+    t = schema.get("type")
+    if isinstance(t, list):
+        t = next((x for x in t if x != "null"), t[0] if t else None)
+    if t == "object" or (t is None and isinstance(schema.get("properties"), dict)):
+        props = schema.get("properties") or {}
+        required = schema.get("required")
+        keys = list(props.keys()) if not isinstance(required, list) else [k for k in props if k in required]
+        return {k: sample_from_schema(props[k], depth + 1) for k in keys}
+    if t == "array":
+        n = int(schema.get("minItems") or 0)
+        return [sample_from_schema(schema.get("items") or {}, depth + 1) for _ in range(n)]
+    if t == "string":
+        return "x" * int(schema.get("minLength") or 0) or "mock"
+    if t == "integer":
+        return int(schema.get("minimum") or 0)
+    if t == "number":
+        return float(schema.get("minimum") or 0)
+    if t == "boolean":
+        return False
+    return None
+
+
+def _tool_schema(tool: Any) -> Dict[str, Any]:
+    """Return {name, parameters} for a bound tool in any of the accepted shapes."""
+    if isinstance(tool, dict):
+        if "function" in tool:
+            fn = tool["function"]
+            return {"name": fn.get("name"), "parameters": fn.get("parameters") or {}}
+        if "input_schema" in tool:
+            return {"name": tool.get("name"), "parameters": tool.get("input_schema") or {}}
+        return {"name": tool.get("name"), "parameters": tool.get("parameters") or {}}
+    try:
+        fn = convert_to_openai_tool(tool)["function"]
+        return {"name": fn.get("name"), "parameters": fn.get("parameters") or {}}
+    except Exception:
+        return {"name": getattr(tool, "name", "tool"), "parameters": {}}
+
+
+def _forced_tool_name(tool_choice: Any) -> Optional[str]:
+    if isinstance(tool_choice, dict):
+        if tool_choice.get("type") == "tool":
+            return tool_choice.get("name")
+        fn = tool_choice.get("function")
+        if isinstance(fn, dict):
+            return fn.get("name")
+    if isinstance(tool_choice, str) and tool_choice not in ("auto", "none", "any", "required"):
+        return tool_choice
+    return None
+
+
+if BaseChatModel is not None:
+
+    class MockChatModel(BaseChatModel):  # type: ignore[misc, valid-type]
+        """Offline chat model simulating latency, streaming, tool calls and errors.
+
+        Used by the `mock` provider for benchmarks and local development. It never
+        touches the network; all behavior is driven by `settings`.
+        """
+
+        model: str = "mock-1"
+        settings: Dict[str, Any] = {}
+
+        @property
+        def _llm_type(self) -> str:
+            return "mock"
+
+        def bind_tools(self, tools: Any, *, tool_choice: Any = None, **kwargs: Any):  # type: ignore[override]
+            return self.bind(tools=list(tools), tool_choice=tool_choice, **kwargs)
+
+        def _rng(self) -> random.Random:
+            try:
+                seed = normalize_seed(self.settings.get("seed"))
+            except ValueError:
+                seed = None
+            if seed is None:
+                return _RNG
+            # One generator per seed so repeated calls walk a reproducible sequence
+            rng = _SEEDED_RNGS.get(seed)
+            if rng is None:
+                rng = _SEEDED_RNGS[seed] = random.Random(seed)
+                while len(_SEEDED_RNGS) > _MAX_SEEDED_RNGS:
+                    _SEEDED_RNGS.popitem(last=False)
+            else:
+                _SEEDED_RNGS.move_to_end(seed)
+            return rng
+
+        def _first_token_delay(self, rng: random.Random) -> float:
+            base = float(self.settings.get("latency_ms") or 0)
+            jitter = float(self.settings.get("jitter_ms") or 0)
+            return max(0.0, base + rng.uniform(-jitter, jitter)) / 1000.0
+
+        def _maybe_fail(self, rng: random.Random) -> None:
+            r = rng.random()
+            rate_429 = float(self.settings.get("error_429_rate") or 0)
+            rate_5xx = float(self.settings.get("error_5xx_rate") or 0)
+            if r < rate_429:
+                raise MockUpstreamError(429, "mock: rate limit exceeded")
+            if r < rate_429 + rate_5xx:
+                raise MockUpstreamError(503, "mock: upstream unavailable")
+
+        def _reply(self, messages: List[Any], **kwargs: Any) -> AIMessage:
+            tools = kwargs.get("tools") or []
+            forced = _forced_tool_name(kwargs.get("tool_choice"))
+            n_out = int(self.settings.get("output_tokens") or 0)
+            words = max(1, n_out)
+            n_in = sum(len(str(getattr(m, "content", ""))) for m in messages) // 4 + 1
+            usage = {"prompt_tokens": n_in, "completion_tokens": words, "total_tokens": n_in + words}
+            meta = {"model_name": self.model, "token_usage": usage, "finish_reason": "stop"}
+            call_id = f"mock-{time.monotonic_ns()}"
+
+            specs = [_tool_schema(t) for t in tools]
+            if forced:
+                spec = next((s for s in specs if s["name"] == forced), {"name": forced, "parameters": {}})
+                args = sample_from_schema(spec["parameters"]) or {}
+                return AIMessage(content="", id=call_id, response_metadata=meta,
+                                 tool_calls=[{"name": spec["name"], "args": args, "id": f"{call_id}-0"}])
+
+            rounds_done = 0
+            seen_ai = False
+            for m in messages:
+                if isinstance(m, ToolMessage):
+                    if not seen_ai:
+                        rounds_done += 1
+                        seen_ai = True
+                else:
+                    seen_ai = False
+            wanted = int(self.settings.get("tool_rounds") or 0)
+            if specs and rounds_done < wanted:
+                name = self.settings.get("tool_name")
+                spec = next((s for s in specs if s["name"] == name), specs[0])
+                args = sample_from_schema(spec["parameters"]) or {}
+                return AIMessage(content="", id=call_id, response_metadata=meta,
+                                 tool_calls=[{"name": spec["name"], "args": args, "id": f"{call_id}-0"}])
+
+            content = " ".join(["mock"] * words)
+            return AIMessage(content=content, id=call_id, response_metadata=meta)
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):  # type: ignore[override]
+            rng = self._rng()
+            time.sleep(self._first_token_delay(rng))
+            self._maybe_fail(rng)
+            msg = self._reply(messages, **kwargs)
+            time.sleep(float(self.settings.get("token_ms") or 0) / 1000.0 * len(str(msg.content).split()))
+            return ChatResult(generations=[ChatGeneration(message=msg)])
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):  # type: ignore[override]
+            rng = self._rng()
+            await asyncio.sleep(self._first_token_delay(rng))
+            self._maybe_fail(rng)
+            msg = self._reply(messages, **kwargs)
+            await asyncio.sleep(float(self.settings.get("token_ms") or 0) / 1000.0 * len(str(msg.content).split()))
+            return ChatResult(generations=[ChatGeneration(message=msg)])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[Any]:  # type: ignore[override]
+            rng = self._rng()
+            time.sleep(self._first_token_delay(rng))
+            self._maybe_fail(rng)
+            msg = self._reply(messages, **kwargs)
+            for chunk in _chunks(msg):
+                time.sleep(float(self.settings.get("token_ms") or 0) / 1000.0)
+                yield chunk
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[Any]:  # type: ignore[override]
+            rng = self._rng()
+            await asyncio.sleep(self._first_token_delay(rng))
+            self._maybe_fail(rng)
+            msg = self._reply(messages, **kwargs)
+            for chunk in _chunks(msg):
+                await asyncio.sleep(float(self.settings.get("token_ms") or 0) / 1000.0)
+                yield chunk
+
+    def _chunks(msg: Any) -> Iterator[Any]:
+        if msg.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                id=msg.id,
+                response_metadata=msg.response_metadata,
+                tool_call_chunks=[
+                    {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                    for i, tc in enumerate(msg.tool_calls)
+                ],
+            ))
+            return
+        words = str(msg.content).split(" ")
+        for i, w in enumerate(words):
+            last = i == len(words) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=w if i == 0 else f" {w}",
+                id=msg.id,
+                response_metadata=msg.response_metadata if last else {},
+            ))
+
+else:  # pragma: no cover
+    MockChatModel = None  # type: ignore
+
+
+def create_mock_model(model: str, extra: Optional[Dict[str, Any]] = None) -> Any:
+    if MockChatModel is None:
+        raise RuntimeError("langchain-core is required for the mock provider")
+    overrides = (extra or {}).get("mock") if isinstance(extra, dict) else None
+    # `extra.mock.models.<model>` overrides apply to that model only (e.g. to simulate a slow pool member)
+    if isinstance(overrides, dict) and isinstance(overrides.get("models"), dict):
+        per_model = overrides["models"].get(model)
+        if isinstance(per_model, dict):
+            overrides = {**overrides, **per_model}
+    return MockChatModel(model=model, settings=mock_settings(overrides))
+
+
+def _is_mock_available() -> bool:
+    return MockChatModel is not None
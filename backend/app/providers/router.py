@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .. import latency
+
+# Pools routed so far, least recently used first (bounded by max_pools()):
+# POOLS[name] = {"members": [(provider, model), ...], "chosen": {(provider, model): int}}
+POOLS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = threading.Lock()
+
+Member = Tuple[str, str]
+
+
+def max_pools() -> int:
+    """Pools kept for /llm/pools; pool names come from clients (env LLM_ROUTER_MAX_POOLS)."""
+    try:
+        return max(1, int(os.getenv("LLM_ROUTER_MAX_POOLS", "128")))
+    except ValueError:
+        return 128
+
+
+def pool_name(name: Optional[str], members: Sequence[Member]) -> str:
+    return name or ",".join(f"{p}/{m}" for p, m in members)
+
+
+def score(provider: str, model: str) -> Optional[float]:
+    """Expected cost of routing one more call to this model (lower is better).
+
+    Median latency, inflated by the recent error rate and by calls already in
+    flight (rate-limit headroom shrinks as concurrency grows). None while the
+    model has too few recorded calls to judge; infinite if none succeeded.
+    """
+    h = latency.health(provider, model)
+    if h["calls"] < latency.min_samples():
+        return None
+    if h["p50_ms"] is None:
+        return float("inf")
+    return h["p50_ms"] * (1.0 + 2.0 * h["error_rate"]) * (1.0 + 0.25 * h["in_flight"])
+
+
+def choose(name: str, members: Sequence[Member]) -> Member:
+    """Pick a pool member for the next attempt.
+
+    Members in a 429 cooldown are skipped unless every member is cooling down
+    (then the one that recovers first is used). Members without enough samples
+    are tried first so every model gets measured; otherwise the lowest score wins.
+    """
+    healths = {m: latency.health(*m) for m in members}
+    ready = [m for m in members if healths[m]["cooldown_s"] <= 0]
+    if not ready:
+        ready = [min(members, key=lambda m: healths[m]["cooldown_s"])]
+    cold = [m for m in ready if healths[m]["calls"] < latency.min_samples()]
+    if cold:
+        # Fewest recorded calls first, ties broken by load then pool order
+        pick = min(cold, key=lambda m: (healths[m]["calls"] + healths[m]["in_flight"], cold.index(m)))
+    else:
+        pick = min(ready, key=lambda m: (score(*m), ready.index(m)))
+    # Recorded only now that a member was picked
+    with _lock:
+        pool = POOLS.get(name)
+        if pool is None:
+            pool = POOLS[name] = {"members": list(members), "chosen": {}}
+            while len(POOLS) > max_pools():
+                POOLS.popitem(last=False)
+        else:
+            POOLS.move_to_end(name)
+            if pool["members"] != list(members):
+                # Same name, new membership: keep counts for members still in it
+                pool["members"] = list(members)
+                pool["chosen"] = {m: n for m, n in pool["chosen"].items() if m in members}
+        pool["chosen"][pick] = pool["chosen"].get(pick, 0) + 1
+    return pick
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    with _lock:
+        pools = [(name, list(p["members"]), dict(p["chosen"])) for name, p in POOLS.items()]
+    out: List[Dict[str, Any]] = []
+    for name, members, chosen in pools:
+        rows = []
+        for provider, model in members:
+            s = score(provider, model)
+            rows.append({
+                "provider": provider,
+                "model": model,
+                "chosen": chosen.get((provider, model), 0),
+                **latency.health(provider, model),
+                # None while cold, or when no call has succeeded (JSON has no infinity)
+                "score": None if s is None or math.isinf(s) else round(s, 1),
+            })
+        out.append({"name": name, "members": rows})
+    return out
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional, Tuple
+
+from ..ws_registry import get_state
+from .. import metrics
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+class TTLCache:
+    """Small LRU cache with optional per-entry TTL (seconds)."""
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        expires, value = item
+        if expires is not None and expires < time.monotonic():
+            self._data.pop(key, None)
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: Any, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def discard(self, keys: Iterable[Any]) -> None:
+        for k in keys:
+            self._data.pop(k, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Tavily results are shared process-wide; queries are not user-specific
+TAVILY_CACHE = TTLCache(max_entries=512, ttl=_env_float("LLM_TAVILY_CACHE_TTL_S", 300.0))
+
+
+def normalize_path(p: Any) -> str:
+    """Mirror of the frontend VFS path normalization."""
+    s = str(p or "/").replace("\\", "/")
+    if not s.startswith("/"):
+        s = "/" + s
+    while "//" in s:
+        s = s.replace("//", "/")
+    if len(s) > 1 and s.endswith("/"):
+        s = s[:-1]
+    return s
+
+
+def _ancestors(path: str) -> Iterable[str]:
+    parts = [p for p in path.split("/") if p]
+    yield "/"
+    acc = ""
+    for part in parts[:-1]:
+        acc += "/" + part
+        yield acc
+
+
+def fs_cache(conn_id: Optional[str]) -> Optional[TTLCache]:
+    """FS read/list cache scoped to one frontend connection (dropped when it closes)."""
+    if not conn_id:
+        return None
+    st = get_state(conn_id)
+    if st is None:
+        return None
+    cache = st.get("tool_cache")
+    if cache is None:
+        cache = st["tool_cache"] = TTLCache(max_entries=512, ttl=_env_float("LLM_FS_CACHE_TTL_S", 60.0))
+    return cache
+
+
+def invalidate_fs_path(conn_id: Optional[str], path: Any) -> None:
+    """Forget the read of `path` and the listings of it and every ancestor directory."""
+    cache = fs_cache(conn_id)
+    if cache is None:
+        return
+    p = normalize_path(path)
+    cache.discard([("read", p), ("list", p)] + [("list", a) for a in _ancestors(p)])
+
+
+def _fs_op(name: str) -> Optional[str]:
+    if name.startswith("fs_read_file_"):
+        return "read"
+    if name.startswith("fs_list_directory_"):
+        return "list"
+    if name.startswith("fs_write_file_"):
+        return "write"
+    return None
+
+
+class ToolMemo:
+    """Memoization policy for one invocation.
+
+    - FS reads/lists: cached per WebSocket connection; an `fs_write_file_*`
+      (or a frontend `fs_changed` notice) invalidates the path and its parents.
+    - Tavily: process-wide TTL cache keyed by canonical args.
+    - MCP tools listed in `mcp.options.idempotent_tools`: cached for this run.
+    """
+
+    def __init__(self, conn_id: Optional[str], idempotent_tools: Optional[Iterable[str]] = None):
+        self.conn_id = conn_id
+        self.idempotent = set(idempotent_tools or [])
+        self._run = TTLCache(max_entries=256)
+        self.hits = 0
+
+    def _slot(self, tool_obj: Any, args: Any) -> Tuple[Optional[TTLCache], Any, str]:
+        name = str(getattr(tool_obj, "name", ""))
+        op = _fs_op(name)
+        if op in ("read", "list"):
+            path = normalize_path((args or {}).get("path") if isinstance(args, dict) else "/")
+            return fs_cache(self.conn_id), (op, path), "fs"
+        if getattr(tool_obj, "_mcp_server", None) == "tavily":
+            return TAVILY_CACHE, json.dumps(args, sort_keys=True, default=str), "tavily"
+        if name in self.idempotent:
+            return self._run, (name, json.dumps(args, sort_keys=True, default=str)), "mcp"
+        return None, None, ""
+
+    async def call(self, tool_obj: Any, args: Any, invoke: Callable[[], Awaitable[Any]]) -> Any:
+        name = str(getattr(tool_obj, "name", ""))
+        if _fs_op(name) == "write":
+            result = await invoke()
+            path = args.get("path") if isinstance(args, dict) else None
+            invalidate_fs_path(self.conn_id, path)
+            return result
+        cache, key, kind = self._slot(tool_obj, args)
+        if cache is None:
+            return await invoke()
+        found, value = cache.get(key)
+        if found:
+            self.hits += 1
+            metrics.inc("tool_cache_total", kind=kind, result="hit")
+            return value
+        metrics.inc("tool_cache_total", kind=kind, result="miss")
+        value = await invoke()
+        cache.set(key, value)
+        return value
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+try:
+    from langchain_core.tools import StructuredTool  # type: ignore
+except Exception:  # pragma: no cover
+    StructuredTool = None  # type: ignore
+
+PAGE_TOOL_NAME = "tool_result_page"
+
+# Rough chars-per-token ratio; good enough to budget context without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def default_budget_tokens() -> int:
+    try:
+        return int(os.getenv("LLM_TOOL_RESULT_MAX_TOKENS", "4000"))
+    except ValueError:
+        return 4000
+
+
+class _PageArgs(BaseModel):
+    handle: str = Field(..., description="Continuation handle from a truncated tool result")
+    page: int = Field(..., description="Zero-based page number to fetch")
+
+
+class ToolResultPager:
+    """Per-invocation budgets for tool results with paged continuation.
+
+    Budgets are token estimates keyed by tool-name glob, from
+    `extra.tool_result_budgets` (e.g. `{"fs_read_file_*": 2000, "*": 4000}`)
+    falling back to LLM_TOOL_RESULT_MAX_TOKENS. A budget of 0 disables it.
+    Over-budget results are split into pages; the first page is returned with
+    a note telling the model how to fetch the rest via `tool_result_page`.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, Any]] = None):
+        self.budgets: List[Tuple[str, int]] = []
+        if isinstance(budgets, dict):
+            for pattern, value in budgets.items():
+                try:
+                    self.budgets.append((str(pattern), int(value)))
+                except (TypeError, ValueError):
+                    continue
+        # Most specific (longest) pattern wins
+        self.budgets.sort(key=lambda x: -len(x[0]))
+        self.default = default_budget_tokens()
+        self._pages: Dict[str, List[str]] = {}
+
+    def budget_for(self, name: str) -> int:
+        for pattern, value in self.budgets:
+            if fnmatch.fnmatchcase(name, pattern):
+                return value
+        return self.default
+
+    def shape(self, name: str, content: str) -> Tuple[str, Dict[str, Any]]:
+        """Return the content to hand to the model plus accounting info for logs."""
+        tokens = estimate_tokens(content)
+        info: Dict[str, Any] = {"tokens": tokens, "chars": len(content), "truncated": False}
+        budget = self.budget_for(name)
+        if name == PAGE_TOOL_NAME or budget <= 0 or tokens <= budget:
+            return content, info
+        size = budget * CHARS_PER_TOKEN
+        pages = [content[i:i + size] for i in range(0, len(content), size)]
+        handle = uuid.uuid4().hex[:10]
+        self._pages[handle] = pages
+        info.update({"truncated": True, "handle": handle, "pages": len(pages), "tokens_returned": estimate_tokens(pages[0])})
+        note = (
+            f"\n\n[truncated: page 1 of {len(pages)} (~{tokens} tokens total). "
+            f"Call `{PAGE_TOOL_NAME}` with {{\"handle\": \"{handle}\", \"page\": 1}} for the next page.]"
+        )
+        return pages[0] + note, info
+
+    async def page(self, handle: str, page: int) -> str:
+        pages = self._pages.get(handle)
+        if not pages:
+            return f"Unknown continuation handle '{handle}'"
+        if page < 0 or page >= len(pages):
+            return f"Page {page} out of range; handle '{handle}' has pages 0-{len(pages) - 1}"
+        text = pages[page]
+        if page + 1 < len(pages):
+            text += (
+                f"\n\n[page {page + 1} of {len(pages)}. Call `{PAGE_TOOL_NAME}` with "
+                f"{{\"handle\": \"{handle}\", \"page\": {page + 1}}} for the next page.]"
+            )
+        else:
+            text += f"\n\n[page {page + 1} of {len(pages)}; end of result.]"
+        return text
+
+    def tool(self) -> Any:
+        """LangChain tool the model calls to fetch further pages."""
+        if StructuredTool is None:
+            return None
+
+        async def _page(handle: str, page: int) -> str:
+            return await self.page(handle, page)
+
+        t = StructuredTool.from_function(
+            name=PAGE_TOOL_NAME,
+            description="Fetch another page of a truncated tool result using its continuation handle.",
+            coroutine=_page,
+            args_schema=_PageArgs,
+        )
+        try:
+            setattr(t, "_mcp_server", "backend")
+        except Exception:
+            pass
+        return t
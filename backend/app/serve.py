@@ -0,0 +1,116 @@
+"""Production entry point: `python -m app.serve [--workers N] ...`.
+
+`python -m app.main` stays the single-process auto-reload dev server. This
+launcher picks uvloop/httptools when installed (both ship with
+`uvicorn[standard]`), runs N worker processes sharing one listening socket,
+tunes keep-alive and the accept backlog, and drains gracefully on SIGTERM /
+SIGINT:
+
+1. stop accepting connections; refuse new invocations (503 `server_draining`),
+   WebSockets (close 1013) and report `/health` as draining;
+2. wait up to LLM_DRAIN_TIMEOUT_S for in-flight requests, pending WebSocket
+   RPCs, running jobs and batches;
+3. close remaining connections, then provider SDK clients and the log writer
+   (lifespan shutdown).
+
+Every option also reads an environment variable so container configs need no
+command-line changes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Any, List, Optional
+
+import uvicorn
+
+from . import drain, logs
+
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except Exception:
+        return False
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn.Server that drains in-flight work before closing connections."""
+
+    async def shutdown(self, sockets: Optional[List[Any]] = None) -> None:
+        drain.start()
+        # Stop accepting first; open keep-alive connections now get 503s
+        for server in self.servers:
+            server.close()
+        idle = await drain.wait_idle(drain.drain_timeout())
+        logs.log("server", "drained" if idle else "drain_incomplete", level="info" if idle else "warning", **drain.inflight())
+        await super().shutdown(sockets=sockets)
+
+
+def build_config(args: argparse.Namespace) -> uvicorn.Config:
+    return uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        backlog=args.backlog,
+        # Longer than common load-balancer idle timeouts (60 s) so the proxy closes first
+        timeout_keep_alive=args.keepalive,
+        # Work is already drained; this only bounds closing what is left
+        timeout_graceful_shutdown=5,
+        limit_concurrency=args.limit_concurrency or None,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        log_level=args.log_level,
+        access_log=False,  # app.logs writes the access log
+        lifespan="on",
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__.splitlines()[0])
+    p.add_argument("--host", default=os.getenv("LLM_HOST", "127.0.0.1"))
+    p.add_argument("--port", type=int, default=_env_int("LLM_PORT", 8000))
+    p.add_argument("--workers", type=int, default=_env_int("LLM_WORKERS", 1),
+                   help="worker processes (env LLM_WORKERS)")
+    p.add_argument("--keepalive", type=int, default=_env_int("LLM_KEEPALIVE_S", 75),
+                   help="idle keep-alive seconds (env LLM_KEEPALIVE_S)")
+    p.add_argument("--backlog", type=int, default=_env_int("LLM_BACKLOG", 2048),
+                   help="listen backlog (env LLM_BACKLOG)")
+    p.add_argument("--limit-concurrency", type=int, default=_env_int("LLM_LIMIT_CONCURRENCY", 0),
+                   help="max concurrent connections+tasks before 503 (0 = unlimited)")
+    p.add_argument("--drain-timeout", type=float, default=None,
+                   help="seconds to wait for in-flight work on shutdown (env LLM_DRAIN_TIMEOUT_S, 30)")
+    p.add_argument("--log-level", default=os.getenv("LLM_UVICORN_LOG_LEVEL", "warning"))
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.drain_timeout is not None:
+        # Workers are separate processes: pass it through the environment
+        os.environ["LLM_DRAIN_TIMEOUT_S"] = str(args.drain_timeout)
+    config = build_config(args)
+    server = DrainingServer(config)
+    if config.workers > 1:
+        from uvicorn.supervisors import Multiprocess
+
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from . import metrics
+
+# Server-side conversation history for multi-turn nodes.
+#
+# SESSIONS[session_id] = { "id", "messages": [{role, content}], "lc": [LangChain messages],
+#                          "bytes", "turns", "created_at", "last_used", "lock" }
+# A request with `session_id` sends only the new messages; they are appended to
+# the stored history, and the assistant's reply is appended once the call
+# succeeds. History is append-only, so the prompt prefix the provider sees is
+# byte-identical turn after turn and provider-side prompt caching keeps
+# hitting. LangChain message objects are built once per message and reused.
+#
+# Sessions expire LLM_SESSION_TTL_S after last use; beyond LLM_SESSION_MAX
+# sessions or LLM_SESSION_MAX_BYTES of message text the least recently used
+# are evicted.
+SESSIONS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_total_bytes = 0
+
+PUBLIC_KEYS = ("id", "turns", "bytes", "created_at", "last_used", "expires_at")
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def ttl_seconds() -> int:
+    return _env_int("LLM_SESSION_TTL_S", 1800)
+
+
+def max_sessions() -> int:
+    return max(1, _env_int("LLM_SESSION_MAX", 1000))
+
+
+def max_bytes() -> int:
+    return max(1, _env_int("LLM_SESSION_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def _size(messages: List[Dict[str, str]]) -> int:
+    return sum(len(m.get("content") or "") for m in messages)
+
+
+def public(rec: Dict[str, Any]) -> Dict[str, Any]:
+    out = {k: rec.get(k) for k in PUBLIC_KEYS if k != "expires_at"}
+    out["messages"] = len(rec["messages"])
+    out["expires_at"] = rec["last_used"] + ttl_seconds()
+    return out
+
+
+def _drop(session_id: str, reason: str) -> None:
+    global _total_bytes
+    rec = SESSIONS.pop(session_id, None)
+    if rec is not None:
+        _total_bytes -= rec["bytes"]
+        metrics.inc("session_evicted_total", reason=reason)
+
+
+def _sweep() -> None:
+    cutoff = time.time() - ttl_seconds()
+    # Ordered by last use: expired sessions are at the front
+    while SESSIONS:
+        session_id, rec = next(iter(SESSIONS.items()))
+        if rec["last_used"] >= cutoff:
+            break
+        _drop(session_id, "ttl")
+    while SESSIONS and (len(SESSIONS) > max_sessions() or _total_bytes > max_bytes()):
+        _drop(next(iter(SESSIONS)), "memory")
+
+
+def create(messages: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    """New session, optionally seeded with a history (e.g. the fixed system prompt)."""
+    global _total_bytes
+    now = time.time()
+    seed = [dict(m) for m in (messages or [])]
+    rec: Dict[str, Any] = {
+        "id": f"sess-{uuid.uuid4().hex}",
+        "messages": seed,
+        "lc": None,
+        "bytes": _size(seed),
+        "turns": 0,
+        "created_at": now,
+        "last_used": now,
+        "lock": asyncio.Lock(),
+    }
+    SESSIONS[rec["id"]] = rec
+    _total_bytes += rec["bytes"]
+    metrics.inc("session_created_total")
+    _sweep()
+    return rec
+
+
+def get(session_id: str) -> Optional[Dict[str, Any]]:
+    _sweep()
+    rec = SESSIONS.get(session_id)
+    if rec is not None:
+        rec["last_used"] = time.time()
+        SESSIONS.move_to_end(session_id)
+    return rec
+
+
+def delete(session_id: str) -> bool:
+    if session_id not in SESSIONS:
+        return False
+    _drop(session_id, "deleted")
+    return True
+
+
+def history(rec: Dict[str, Any], new: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Stored history followed by this turn's messages (what the model sees)."""
+    return rec["messages"] + [dict(m) for m in new]
+
+
+def lc_history(rec: Dict[str, Any], new: List[Dict[str, str]], convert: Any) -> Optional[List[Any]]:
+    """LangChain messages for history + new, converting only what is not cached yet.
+
+    `convert` is the adapter's dict -> LangChain converter; None when LangChain
+    is unavailable (the adapter then converts the dicts itself).
+    """
+    cached = rec["lc"]
+    if cached is None or len(cached) != len(rec["messages"]):
+        cached = convert(rec["messages"])
+        if not isinstance(cached, list) or (cached and isinstance(cached[0], dict)):
+            return None
+        rec["lc"] = cached
+    fresh = convert(new)
+    if fresh and isinstance(fresh[0], dict):
+        return None
+    return cached + fresh
+
+
+def reply_text(output: Any) -> str:
+    if isinstance(output, str):
+        return output
+    # Structured output is stored compactly and deterministically so the prefix stays stable
+    return json.dumps(output, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str)
+
+
+def commit(rec: Dict[str, Any], new: List[Dict[str, str]], output: Any, convert: Any) -> None:
+    """Append this turn's messages and the assistant reply after a successful call."""
+    global _total_bytes
+    if SESSIONS.get(rec["id"]) is not rec:
+        # Evicted or deleted while the call ran
+        return
+    added = [dict(m) for m in new] + [{"role": "assistant", "content": reply_text(output)}]
+    rec["messages"].extend(added)
+    if rec["lc"] is not None:
+        lc = convert(added)
+        if isinstance(lc, list) and (not lc or not isinstance(lc[0], dict)):
+            rec["lc"].extend(lc)
+        else:
+            rec["lc"] = None
+    size = _size(added)
+    rec["bytes"] += size
+    _total_bytes += size
+    rec["turns"] += 1
+    rec["last_used"] = time.time()
+    SESSIONS.move_to_end(rec["id"])
+    _sweep()
+
+
+def stats() -> Dict[str, Any]:
+    return {"sessions": len(SESSIONS), "bytes": _total_bytes, "max_sessions": max_sessions(), "max_bytes": max_bytes()}
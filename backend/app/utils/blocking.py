@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from .. import metrics
+
+# One bounded pool for blocking work reached from async code: sync-only tool
+# invocations, catalog/cassette/profile file I/O. Keeping it separate from the
+# loop's default executor means a slow sync tool can only tie up these threads;
+# extra calls queue here instead of stalling the event loop.
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def max_workers() -> int:
+    """Thread count for the blocking pool (env LLM_BLOCKING_WORKERS)."""
+    try:
+        return max(1, int(os.getenv("LLM_BLOCKING_WORKERS", "8")))
+    except ValueError:
+        return 8
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers(), thread_name_prefix="llm-blocking")
+    return _executor
+
+
+async def run_blocking(kind: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run `fn(*args, **kwargs)` on the blocking pool; `kind` labels the metrics.
+
+    Context variables (e.g. the request deadline) are carried into the thread.
+    """
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    metrics.inc("blocking_calls_total", kind=kind)
+    return await asyncio.get_running_loop().run_in_executor(executor(), call)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
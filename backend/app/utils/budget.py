@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import contextvars
+from typing import Any, Dict, Optional
+
+# Upstream model calls one /llm/invoke may make, by phase:
+#   forced_tool  - Anthropic forced `output` tool attempt
+#   model        - the main call
+#   tool_loop    - one call per tool round (up to 3)
+#   finalize     - structured finalization through the `output` tool
+#   json_convert - conversion prompt when no valid JSON could be recovered locally
+# Every retry and hedge repeats some of them. A Budget spans the whole request.
+PHASES = ("forced_tool", "model", "tool_loop", "finalize", "json_convert")
+
+
+class BudgetExceeded(RuntimeError):
+    """The request's call/token budget ran out before a call in `phase`; mapped to 422 by `to_http`."""
+
+    status_code = 422
+
+    def __init__(self, phase: str, accounting: Dict[str, Any]):
+        super().__init__(f"call budget exhausted before {phase}")
+        self.phase = phase
+        self.accounting = accounting
+
+
+class Budget:
+    """Upstream call and token accounting for one request, optionally capped.
+
+    Limits are checked before each call: a call is refused once `max_model_calls`
+    calls were made or `max_total_tokens` were consumed, so the last permitted
+    call may overshoot the token limit.
+    """
+
+    def __init__(self, max_model_calls: Optional[int] = None, max_total_tokens: Optional[int] = None):
+        self.max_model_calls = max_model_calls
+        self.max_total_tokens = max_total_tokens
+        self.attempts = 0
+        self.model_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self.phases: Dict[str, Dict[str, int]] = {}
+        # Phase whose call was refused first
+        self.exhausted: Optional[str] = None
+
+    def exceeded(self) -> bool:
+        if self.max_model_calls is not None and self.model_calls >= self.max_model_calls:
+            return True
+        return self.max_total_tokens is not None and self.total_tokens >= self.max_total_tokens
+
+    def reserve(self, phase: str) -> None:
+        """Count a call about to be made in `phase`; raises BudgetExceeded if none is left."""
+        if self.exceeded():
+            if self.exhausted is None:
+                self.exhausted = phase
+            raise BudgetExceeded(phase, self.snapshot())
+        self.model_calls += 1
+        self._phase(phase)["calls"] += 1
+
+    def record(self, phase: str, usage: Optional[Dict[str, Any]]) -> None:
+        """Add a finished call's token usage (`input_tokens`/`output_tokens`/`total_tokens`)."""
+        if not usage:
+            return
+        inp = int(usage.get("input_tokens") or 0)
+        out = int(usage.get("output_tokens") or 0)
+        total = int(usage.get("total_tokens") or (inp + out))
+        p = self._phase(phase)
+        p["input_tokens"] += inp
+        p["output_tokens"] += out
+        p["total_tokens"] += total
+        self.input_tokens += inp
+        self.output_tokens += out
+        self.total_tokens += total
+
+    def _phase(self, phase: str) -> Dict[str, int]:
+        p = self.phases.get(phase)
+        if p is None:
+            p = self.phases[phase] = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        return p
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "model_calls": self.model_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "phases": {k: dict(self.phases[k]) for k in PHASES if k in self.phases},
+            "exhausted": self.exhausted,
+            "limits": {"max_model_calls": self.max_model_calls, "max_total_tokens": self.max_total_tokens},
+        }
+
+
+current_budget: contextvars.ContextVar[Optional[Budget]] = contextvars.ContextVar("current_budget", default=None)
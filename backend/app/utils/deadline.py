@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+# Maximum share of the original budget a single call in each phase may use.
+# `finalize` has no cap beyond what remains; the other phases additionally
+# leave FINALIZE_RESERVE of the budget untouched so a partial result can still
+# be finalized.
+PHASE_SHARES: Dict[str, float] = {
+    "discovery": 0.2,
+    "model": 0.8,
+    "tool": 0.3,
+    "finalize": 1.0,
+}
+FINALIZE_RESERVE = 0.2
+
+
+class DeadlineExceeded(RuntimeError):
+    """The request's time budget ran out in `phase`; mapped to 504 by `to_http`."""
+
+    status_code = 504
+
+    def __init__(self, phase: str, budget_ms: int):
+        super().__init__(f"deadline exceeded during {phase} (budget {budget_ms} ms)")
+        self.phase = phase
+        self.budget_ms = budget_ms
+
+
+class Deadline:
+    """Absolute deadline for one request, split into per-phase timeouts."""
+
+    def __init__(self, budget_ms: int):
+        self.budget_ms = int(budget_ms)
+        self.total = self.budget_ms / 1000.0
+        self.expires = time.monotonic() + self.total
+        # Phase that ran out while a partial result could still be returned
+        self.partial: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout_for(self, phase: str) -> float:
+        share = PHASE_SHARES.get(phase, 1.0)
+        reserve = 0.0 if phase == "finalize" else FINALIZE_RESERVE * self.total
+        return max(0.0, min(self.remaining() - reserve, share * self.total))
+
+    def cap(self, seconds: float, phase: str = "tool") -> float:
+        """Clamp a component's own fixed timeout to this deadline."""
+        return min(seconds, self.timeout_for(phase))
+
+    async def run(self, phase: str, aw: Awaitable[Any]) -> Any:
+        timeout = self.timeout_for(phase)
+        if timeout <= 0:
+            # Close the coroutine we will never await
+            close = getattr(aw, "close", None)
+            if callable(close):
+                close()
+            raise DeadlineExceeded(phase, self.budget_ms)
+        try:
+            return await asyncio.wait_for(aw, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(phase, self.budget_ms) from None
+
+
+current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("current_deadline", default=None)
+
+
+def parse_deadline_ms(header: Optional[str]) -> Optional[int]:
+    """Budget from the `X-Deadline-Ms` header, else LLM_DEFAULT_DEADLINE_MS; None if unset/invalid."""
+    raw = header if header is not None else os.getenv("LLM_DEFAULT_DEADLINE_MS")
+    if raw is None or not str(raw).strip():
+        return None
+    try:
+        value = int(float(raw))
+    except ValueError:
+        raise ValueError(f"invalid deadline: {raw!r}")
+    if value <= 0:
+        raise ValueError(f"deadline must be positive, got {value}")
+    return value
+
+
+def mark_partial(phase: str) -> None:
+    dl = current_deadline.get()
+    if dl is not None and dl.partial is None:
+        dl.partial = phase
+
+
+async def within(phase: str, aw: Awaitable[Any]) -> Any:
+    """Await `aw` under the current request's deadline for `phase` (no-op without one)."""
+    dl = current_deadline.get()
+    if dl is None:
+        return await aw
+    return await dl.run(phase, aw)
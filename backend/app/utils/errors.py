@@ -4,6 +4,22 @@ from typing import Any, Dict, Tuple
 
 from fastapi import HTTPException
 
+from .budget import BudgetExceeded
+from .deadline import DeadlineExceeded
+
+
+class RecordedError(RuntimeError):
+    """Replays a failure captured earlier (cassettes): `str()` is the original
+    exception text and `to_http` returns the original status, code, message and details."""
+
+    def __init__(self, text: str, status_code: int = 500, code: str = "upstream_error",
+                 message: str | None = None, details: Dict[str, Any] | None = None):
+        super().__init__(text)
+        self.status_code = status_code
+        self.code = code
+        self.message = text if message is None else message
+        self.details = details
+
 
 def to_http(exc: Exception | None) -> Tuple[int, str, str, Dict[str, Any] | None]:
     """Map arbitrary exceptions to (status, code, message, details).
@@ -11,10 +27,22 @@ def to_http(exc: Exception | None) -> Tuple[int, str, str, Dict[str, Any] | None
     - Preserves `HTTPException.status_code` when present.
     - Falls back to upstream `.response.status_code` if available.
     - Classifies 4xx as `provider_bad_request`, otherwise `upstream_error`.
+    - `DeadlineExceeded` becomes 504 `deadline_exceeded` with the phase that ran out.
+    - `BudgetExceeded` becomes 422 `budget_exceeded` with the refused phase and the accounting.
+    - `RecordedError` maps back to the response of the failure it was recorded from.
     """
     if exc is None:
         return 500, "upstream_error", "Provider invocation failed", None
 
+    if isinstance(exc, DeadlineExceeded):
+        return 504, "deadline_exceeded", str(exc), {"phase": exc.phase, "budget_ms": exc.budget_ms}
+
+    if isinstance(exc, BudgetExceeded):
+        return 422, "budget_exceeded", str(exc), {"phase": exc.phase, "accounting": exc.accounting}
+
+    if isinstance(exc, RecordedError):
+        return exc.status_code, exc.code, exc.message, exc.details
+
     # Honor direct FastAPI HTTPExceptions
     if isinstance(exc, HTTPException):
         status = exc.status_code
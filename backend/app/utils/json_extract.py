@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+# Linear-time recovery of a JSON value from a model reply.
+#
+# Handles, without regexes or backtracking:
+#   - clean JSON (fast path: one json.loads)
+#   - ```json fenced blocks
+#   - leading / trailing prose around a top-level object or array
+#   - trailing commas before `}` / `]`
+#   - output truncated mid-value (open strings and containers are closed,
+#     a dangling partial member is dropped)
+#
+# Each top-level `{...}` / `[...]` span is found in one scan of the text and
+# repaired in one further pass, so total work is O(len(text)).
+
+_OPEN = {"{": "}", "[": "]"}
+_CLOSE = {"}", "]"}
+# A stray brace in prose can swallow the real value into a span that fails to
+# parse; rescanning just past such a span's opener is allowed this many times,
+# which keeps the worst case linear.
+_MAX_RESCANS = 8
+_TOKEN = re.compile(r'["\\\[\]{},]')
+_OPENER = re.compile(r"[\[{]")
+_DECODER = json.JSONDecoder()
+
+
+class NotFound(ValueError):
+    pass
+
+
+def _loads(s: str) -> Tuple[bool, Any]:
+    try:
+        return True, json.loads(s)
+    except ValueError:
+        return False, None
+
+
+def _fenced(text: str) -> Optional[str]:
+    start = text.find("```")
+    if start < 0:
+        return None
+    # Skip the info string (```json) up to the end of the fence line
+    nl = text.find("\n", start + 3)
+    if nl < 0:
+        return None
+    end = text.find("```", nl + 1)
+    return text[nl + 1:end if end >= 0 else len(text)]
+
+
+def _spans(text: str, pos: int = 0) -> Iterator[Tuple[int, int, bool]]:
+    """Yield (start, end, complete) for each top-level object/array from `pos`, in one pass.
+
+    Only structural characters are visited (via a single-character regex, so
+    nothing can backtrack). An unterminated span runs to the end of the text.
+    """
+    depth = 0
+    start = -1
+    in_str = False
+    skip = -1
+    for m in _TOKEN.finditer(text, pos):
+        i = m.start()
+        if i < skip:
+            continue
+        ch = text[i]
+        if in_str:
+            if ch == "\\":
+                skip = i + 2
+            elif ch == '"':
+                in_str = False
+            continue
+        if depth == 0:
+            if ch in _OPEN:
+                depth = 1
+                start = i
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in _OPEN:
+            depth += 1
+        elif ch in _CLOSE:
+            depth -= 1
+            if depth == 0:
+                yield start, i + 1, True
+    if depth > 0:
+        yield start, len(text), False
+
+
+def _assemble(segment: str, drops: List[int], end: int) -> str:
+    parts: List[str] = []
+    last = 0
+    for d in drops:
+        if d >= end:
+            break
+        parts.append(segment[last:d])
+        last = d + 1
+    parts.append(segment[last:end])
+    return "".join(parts)
+
+
+def repair(segment: str) -> str:
+    """Drop trailing commas and close whatever a truncated value left open."""
+    stack: List[str] = []
+    # Per open container: index just after its opener, and of its last comma
+    opened: List[int] = []
+    last_comma: List[int] = []
+    drops: List[int] = []
+    prev_comma = -1
+    in_str = False
+    skip = -1
+    for m in _TOKEN.finditer(segment):
+        i = m.start()
+        if i < skip:
+            continue
+        ch = segment[i]
+        if in_str:
+            if ch == "\\":
+                skip = i + 2
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in _OPEN:
+            stack.append(_OPEN[ch])
+            opened.append(i + 1)
+            last_comma.append(-1)
+        elif ch in _CLOSE:
+            # `[1, 2,]` / `{"a": 1,}`: drop the comma before the closer
+            if prev_comma >= 0 and (prev_comma + 1 == i or segment[prev_comma + 1:i].isspace()):
+                drops.append(prev_comma)
+            if stack:
+                stack.pop()
+                opened.pop()
+                last_comma.pop()
+        elif ch == "," and last_comma:
+            last_comma[-1] = i
+        prev_comma = i if ch == "," else -1
+    if not stack and not in_str:
+        return _assemble(segment, drops, len(segment))
+    # Truncated: the last member may be partial (`"ke`, `"key":`, `tru`, `1.`).
+    # Close an open string, then keep it only if the result parses; otherwise cut
+    # back to the last comma of the innermost container.
+    closers = "".join(reversed(stack))
+    tail = _assemble(segment, drops, len(segment)) + ('"' if in_str else "")
+    candidate = tail.rstrip().rstrip(",") + closers
+    ok, _ = _loads(candidate)
+    if ok:
+        return candidate
+    if last_comma[-1] >= 0:
+        return _assemble(segment, drops, last_comma[-1]) + closers
+    # Nothing complete inside the innermost container: keep it empty
+    return _assemble(segment, drops, opened[-1]) + closers
+
+
+def extract_json(content: Any) -> Any:
+    """Return the JSON value contained in a model reply; raises NotFound if none.
+
+    The first top-level object/array that parses (after repair) wins, except
+    that a repair which kept nothing of its span loses to any later one.
+    """
+    if not isinstance(content, str):
+        raise NotFound("content is not text")
+    text = content.strip()
+    ok, value = _loads(text)
+    if ok:
+        return value
+    fenced = _fenced(text)
+    if fenced is not None:
+        ok, value = _loads(fenced.strip())
+        if ok:
+            return value
+        text = fenced
+    # Prose around a valid value: decode in place from the first opener
+    # (raw_decode stops at the end of the value, so trailing prose is fine).
+    # Later openers may be nested inside a broken value, so they go through
+    # the span scan below instead.
+    m = _OPENER.search(text)
+    if m is not None:
+        try:
+            return _DECODER.raw_decode(text, m.start())[0]
+        except ValueError:
+            pass
+    pos = 0
+    rescans = 0
+    # A repair that had to discard everything (`{}` from `{ prose ...`) is only
+    # used if no later span does better
+    fallback: Tuple[bool, Any] = (False, None)
+    while pos < len(text):
+        resume = len(text)
+        for start, end, complete in _spans(text, pos):
+            segment = text[start:end]
+            if complete:
+                ok, value = _loads(segment)
+                if ok:
+                    return value
+            ok, value = _loads(repair(segment))
+            if ok and (value or len(segment.strip()) <= 2):
+                return value
+            if ok and not fallback[0]:
+                fallback = (True, value)
+            if rescans < _MAX_RESCANS:
+                # Maybe a stray opener in prose: retry just past it
+                resume = start + 1
+                break
+        else:
+            break
+        rescans += 1
+        pos = resume
+    if fallback[0]:
+        return fallback[1]
+    raise NotFound("no JSON value found")
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+from .. import logs, metrics
+
+# Event-loop lag monitor.
+#
+# A coroutine wakes every LLM_LOOP_LAG_INTERVAL_MS and records how late it was
+# (`event_loop_lag_ms`). A watchdog thread checks the coroutine's last tick; when
+# the loop has been stuck for LLM_LOOP_LAG_WARN_MS it grabs the loop thread's
+# stack once and logs the code that is blocking it (`event_loop_stalls_total`).
+# LLM_LOOP_MONITOR=0 turns both off.
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_task: Optional[asyncio.Task] = None
+_watchdog: Optional[threading.Thread] = None
+_stop = threading.Event()
+_last_tick = 0.0
+
+
+def _env_ms(key: str, default: float) -> float:
+    try:
+        return max(1.0, float(os.getenv(key, str(default))))
+    except ValueError:
+        return default
+
+
+def monitor_enabled() -> bool:
+    return os.getenv("LLM_LOOP_MONITOR", "1").strip().lower() not in ("0", "false", "no")
+
+
+def interval_ms() -> float:
+    return _env_ms("LLM_LOOP_LAG_INTERVAL_MS", 100.0)
+
+
+def warn_ms() -> float:
+    return _env_ms("LLM_LOOP_LAG_WARN_MS", 250.0)
+
+
+def describe_stack(thread_id: int) -> str:
+    """Innermost frame of `thread_id`, preferring backend code over libraries."""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return "unknown"
+    innermost = frame
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(_APP_DIR):
+            where = f"{os.path.relpath(code.co_filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {code.co_name}"
+            if frame is not innermost:
+                where += f" (blocked in {innermost.f_code.co_name} at {os.path.basename(innermost.f_code.co_filename)}:{innermost.f_lineno})"
+            return where
+        frame = frame.f_back
+    return f"{innermost.f_code.co_filename}:{innermost.f_lineno} in {innermost.f_code.co_name}"
+
+
+async def _ticker(interval: float) -> None:
+    global _last_tick
+    while True:
+        start = time.perf_counter()
+        _last_tick = start
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (time.perf_counter() - start - interval) * 1000.0)
+        metrics.observe("event_loop_lag_ms", lag_ms)
+
+
+def _watch(loop_thread: int, interval: float, threshold: float) -> None:
+    reported = 0.0
+    while not _stop.wait(interval):
+        tick = _last_tick
+        stalled_ms = (time.perf_counter() - tick) * 1000.0 - interval * 1000.0
+        if stalled_ms < threshold or tick == reported:
+            continue
+        # One warning per stall: the tick only moves once the loop is free again
+        reported = tick
+        metrics.inc("event_loop_stalls_total")
+        logs.log("loop", "event_loop_blocked", level="warning", blocked_ms=round(stalled_ms), at=describe_stack(loop_thread))
+
+
+def start() -> None:
+    """Start the monitor on the running loop (idempotent)."""
+    global _task, _watchdog, _last_tick
+    if not monitor_enabled() or (_task is not None and not _task.done()):
+        return
+    interval = interval_ms() / 1000.0
+    _stop.clear()
+    _last_tick = time.perf_counter()
+    _task = asyncio.ensure_future(_ticker(interval))
+    _watchdog = threading.Thread(
+        target=_watch, args=(threading.get_ident(), interval, warn_ms()), name="llm-loop-watchdog", daemon=True,
+    )
+    _watchdog.start()
+
+
+def stop() -> None:
+    global _task, _watchdog
+    _stop.set()
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    _watchdog = None
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from .blocking import run_blocking
+
+# Opt-in per-request profiling for /llm/invoke (header `X-Profile`).
+#
+# Disabled unless LLM_PROFILE=1; with LLM_PROFILE_TOKEN set the request must
+# also carry a matching `X-Profile-Token`. Modes:
+#   - "cprofile": deterministic; saved as <id>.pstats (load with pstats / snakeviz)
+#   - "sample":   a thread samples the event-loop thread's stack every
+#                 LLM_PROFILE_INTERVAL_MS; saved as <id>.collapsed
+#                 ("frame;frame;frame count" lines, flamegraph.pl / speedscope)
+# Both observe the whole event-loop thread, so concurrent requests show up in
+# the profile too. Only one profile runs at a time.
+MODES = ("cprofile", "sample")
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+_active = threading.Lock()
+
+
+class ProfileRejected(PermissionError):
+    pass
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("LLM_PROFILE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def profile_dir() -> Path:
+    return Path(os.getenv("LLM_PROFILE_DIR") or Path(tempfile.gettempdir()) / "llm-profiles")
+
+
+def _keep() -> int:
+    try:
+        return max(1, int(os.getenv("LLM_PROFILE_KEEP", "50")))
+    except ValueError:
+        return 50
+
+
+def _interval_s() -> float:
+    try:
+        return max(0.001, float(os.getenv("LLM_PROFILE_INTERVAL_MS", "5")) / 1000.0)
+    except ValueError:
+        return 0.005
+
+
+def check_request(mode: str, token: Optional[str]) -> str:
+    """Validate an `X-Profile` request; returns the normalized mode.
+
+    Raises ProfileRejected when the server does not allow it, ValueError for an unknown mode.
+    """
+    if not profiling_enabled():
+        raise ProfileRejected("Profiling is disabled on this server (LLM_PROFILE)")
+    expected = os.getenv("LLM_PROFILE_TOKEN")
+    if expected and token != expected:
+        raise ProfileRejected("X-Profile-Token is missing or wrong")
+    mode = (mode or "").strip().lower()
+    if mode in ("1", "true"):
+        mode = "sample"
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode '{mode}' (use one of: {', '.join(MODES)})")
+    return mode
+
+
+def profile_id(request_id: Optional[str]) -> str:
+    """The X-Request-Id when it is safe as a file name, else a fresh id."""
+    if request_id and _SAFE_ID.match(request_id):
+        return request_id
+    return f"prof-{uuid.uuid4().hex}"
+
+
+class _Sampler:
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="llm-profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if parts:
+                self.stacks[";".join(reversed(parts))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """Profiles the current thread's event loop between start() and stop()."""
+
+    def __init__(self, mode: str, pid: str) -> None:
+        self.mode = mode
+        self.id = pid
+        self._prof: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        self.started = 0.0
+
+    def start(self) -> bool:
+        """False when another profile is already running (the request proceeds unprofiled)."""
+        if not _active.acquire(blocking=False):
+            return False
+        self.started = time.perf_counter()
+        try:
+            if self.mode == "cprofile":
+                self._prof = cProfile.Profile()
+                self._prof.enable()
+            else:
+                self._sampler = _Sampler(threading.get_ident(), _interval_s())
+                self._sampler.start()
+        except Exception:
+            _active.release()
+            raise
+        return True
+
+    def stop(self) -> None:
+        try:
+            if self._prof is not None:
+                self._prof.disable()
+            if self._sampler is not None:
+                self._sampler.stop()
+        finally:
+            _active.release()
+
+    async def save(self) -> Path:
+        return await run_blocking("profile", self._save)
+
+    def _save(self) -> Path:
+        base = profile_dir()
+        base.mkdir(parents=True, exist_ok=True)
+        if self._prof is not None:
+            path = base / f"{self.id}.pstats"
+            self._prof.dump_stats(str(path))
+        else:
+            path = base / f"{self.id}.collapsed"
+            path.write_text(self._sampler.collapsed() if self._sampler else "", encoding="utf-8")
+        _prune(base)
+        return path
+
+
+def _prune(base: Path) -> None:
+    files = sorted(
+        (p for p in base.iterdir() if p.suffix in (".pstats", ".collapsed")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for p in files[:-_keep()]:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+def find_profile(pid: str) -> Optional[Path]:
+    if not _SAFE_ID.match(pid):
+        return None
+    for suffix in (".pstats", ".collapsed"):
+        path = profile_dir() / f"{pid}{suffix}"
+        if path.is_file():
+            return path
+    return None
+
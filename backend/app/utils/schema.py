@@ -184,6 +184,177 @@ def enforce_required_all_properties_deep(schema_obj: Dict[str, Any]) -> Dict[str
     return _walk(schema_obj)
 
 
+# OpenAI strict function schemas (2025-10): every object closed and fully required,
+# a restricted keyword set, at most 10 levels of nesting and 5000 properties.
+STRICT_MAX_DEPTH = 10
+STRICT_MAX_PROPERTIES = 5000
+# Accepted by strict mode as-is
+_STRICT_KEYWORDS = {
+    "type", "description", "title", "properties", "required", "additionalProperties",
+    "items", "anyOf", "enum", "const", "$ref", "$defs", "definitions",
+    "pattern", "format", "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum",
+    "multipleOf", "minItems", "maxItems",
+}
+# Annotations and narrowing constraints strict mode rejects; dropping them only
+# loosens what the model may send, and the tool still validates its input
+_STRICT_DROPPED = {
+    "default", "examples", "minLength", "maxLength", "minProperties", "maxProperties",
+    "uniqueItems", "contentEncoding", "contentMediaType", "readOnly", "writeOnly",
+    "deprecated", "$schema", "$id", "$comment",
+}
+_STRICT_FORMATS = {"date-time", "time", "date", "duration", "email", "hostname", "ipv4", "ipv6", "uuid"}
+
+
+class StrictSchemaUnsupported(ValueError):
+    """The schema uses constructs OpenAI strict mode cannot express."""
+
+
+def to_openai_strict(schema_obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a tool's JSON Schema into an OpenAI strict function schema.
+
+    - Objects get `additionalProperties: false` and list every property in
+      `required`; properties that were optional become nullable, so the model
+      sends `null` for them (see `drop_null_optionals`).
+    - `oneOf` becomes `anyOf`; annotations and length/uniqueness constraints
+      strict mode rejects are dropped; unknown `format`s are removed.
+    - Raises StrictSchemaUnsupported for free-form objects or maps, untyped
+      values, `allOf`/`not`/conditionals, pattern properties and schemas over
+      the nesting/property limits; callers fall back to non-strict mode.
+    Returns a new object; does not mutate the input.
+    """
+    if not isinstance(schema_obj, dict) or schema_obj.get("type") != "object" or "anyOf" in schema_obj:
+        raise StrictSchemaUnsupported("root must be an object schema")
+    count = [0]
+
+    def _nullable(node: Dict[str, Any]) -> Dict[str, Any]:
+        if _accepts_null(node):
+            return node
+        t = node.get("type")
+        if "const" not in node and isinstance(t, (str, list)):
+            types = [t] if isinstance(t, str) else list(t)
+            out = {**node, "type": types if "null" in types else types + ["null"]}
+            if "enum" in out:
+                out["enum"] = list(out["enum"]) + [None]
+            return out
+        if "anyOf" in node:
+            return {**node, "anyOf": node["anyOf"] + [{"type": "null"}]}
+        # $ref / enum / const: wrap (a const can't be widened in place)
+        desc = node.get("description")
+        inner = {k: v for k, v in node.items() if k != "description"}
+        out = {"anyOf": [inner, {"type": "null"}]}
+        if desc is not None:
+            out["description"] = desc
+        return out
+
+    def _walk(node: Any, depth: int, root: bool = False) -> Dict[str, Any]:
+        if not isinstance(node, dict):
+            raise StrictSchemaUnsupported("schema nodes must be objects")
+        if depth > STRICT_MAX_DEPTH:
+            raise StrictSchemaUnsupported(f"nested deeper than {STRICT_MAX_DEPTH} levels")
+        out: Dict[str, Any] = {}
+        for k, v in node.items():
+            if k in _STRICT_DROPPED:
+                continue
+            if k == "oneOf":
+                k = "anyOf"
+            elif k not in _STRICT_KEYWORDS:
+                raise StrictSchemaUnsupported(f"keyword '{k}' is not supported in strict mode")
+            out[k] = v
+        if "format" in out and out["format"] not in _STRICT_FORMATS:
+            del out["format"]
+        if not any(k in out for k in ("type", "$ref", "anyOf", "enum", "const")):
+            raise StrictSchemaUnsupported("values without a type are not supported")
+
+        for key in ("$defs", "definitions"):
+            if key in out:
+                out[key] = {name: _walk(d, depth) for name, d in (out[key] or {}).items()}
+        if "anyOf" in out:
+            out["anyOf"] = [_walk(b, depth) for b in out["anyOf"]]
+        if "items" in out:
+            if not isinstance(out["items"], dict):
+                raise StrictSchemaUnsupported("tuple-style items are not supported")
+            out["items"] = _walk(out["items"], depth + 1)
+
+        t = out.get("type")
+        if t == "object" or (isinstance(t, list) and "object" in t):
+            extra = out.get("additionalProperties")
+            if extra not in (None, False):
+                raise StrictSchemaUnsupported("objects with additionalProperties are not supported")
+            if "properties" not in out and not root:
+                raise StrictSchemaUnsupported("free-form objects are not supported")
+            props = out.get("properties") or {}
+            count[0] += len(props)
+            if count[0] > STRICT_MAX_PROPERTIES:
+                raise StrictSchemaUnsupported(f"more than {STRICT_MAX_PROPERTIES} properties")
+            required = set(out.get("required") or [])
+            new_props: Dict[str, Any] = {}
+            for name, prop in props.items():
+                conv = _walk(prop, depth + 1)
+                new_props[name] = conv if name in required else _nullable(conv)
+            out["properties"] = new_props
+            out["required"] = list(new_props.keys())
+            out["additionalProperties"] = False
+        return out
+
+    return _walk(schema_obj, 1, root=True)
+
+
+def _accepts_null(node: Any) -> bool:
+    """Whether `null` is already a valid value for `node` (no `$ref` resolution)."""
+    if not isinstance(node, dict):
+        return False
+    t = node.get("type")
+    if t == "null" or (isinstance(t, list) and "null" in t):
+        return "enum" not in node or None in node["enum"]
+    if "const" in node:
+        return node["const"] is None
+    if isinstance(node.get("enum"), list) and "type" not in node:
+        return None in node["enum"]
+    branches = node.get("anyOf") or node.get("oneOf") or []
+    return any(isinstance(b, dict) and (b.get("type") == "null" or b.get("const", 0) is None) for b in branches)
+
+
+def drop_null_optionals(args: Any, schema_obj: Dict[str, Any]) -> Any:
+    """Remove `null` values the model sent for properties `schema_obj` lists as optional.
+
+    Counterpart of `to_openai_strict`: `schema_obj` is the tool's original
+    schema, so the tool sees the arguments it would have without strict mode.
+    Optional properties that already accepted `null` keep it.
+    """
+    defs = {**(schema_obj.get("definitions") or {}), **(schema_obj.get("$defs") or {})} if isinstance(schema_obj, dict) else {}
+
+    def _resolve(node: Any) -> Any:
+        seen = 0
+        while isinstance(node, dict) and isinstance(node.get("$ref"), str) and seen < 32:
+            node = defs.get(node["$ref"].rsplit("/", 1)[-1], {})
+            seen += 1
+        return node
+
+    def _walk(value: Any, node: Any) -> Any:
+        node = _resolve(node)
+        if not isinstance(node, dict):
+            return value
+        if isinstance(value, dict) and isinstance(node.get("properties"), dict):
+            props = node["properties"]
+            required = set(node.get("required") or [])
+            return {
+                k: _walk(v, props.get(k))
+                for k, v in value.items()
+                if not (v is None and k in props and k not in required and not _accepts_null(_resolve(props[k])))
+            }
+        if isinstance(value, list) and isinstance(node.get("items"), dict):
+            return [_walk(v, node["items"]) for v in value]
+        for branch in node.get("anyOf") or node.get("oneOf") or []:
+            b = _resolve(branch)
+            if isinstance(b, dict) and b.get("type") != "null" and (
+                (isinstance(value, dict) and "properties" in b) or (isinstance(value, list) and "items" in b)
+            ):
+                return _walk(value, b)
+        return value
+
+    return _walk(args, schema_obj)
+
+
 def validate_output_against_schema(output: Any, schema_like: Dict[str, Any]) -> None:
     """Validate output against a JSON Schema.
 
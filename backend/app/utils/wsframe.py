@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional
+
+from .responses import dumps
+
+# Binary frame layout (negotiated per connection via the `hello` exchange):
+#
+#   u8  version (FRAME_VERSION)
+#   u8  flags   (FLAG_GZIP: payload is gzip-compressed)
+#   u32 header length, big-endian
+#   header: compact UTF-8 JSON object (the message minus its bulky field)
+#   payload: raw bytes of that field, named by header["body"]
+#
+# header["enc"] says how to turn the payload back into a value: "text"
+# (UTF-8 string, e.g. file contents) or "json" (e.g. snapshot entries).
+# Peers that never negotiated keep using plain JSON text frames.
+FRAME_VERSION = 1
+FLAG_GZIP = 0x01
+_PREFIX = struct.Struct(">BBI")
+
+# Message fields that are carried as the frame payload when present, in the
+# order both codecs check them (frontend/src/engine/wsframe.ts)
+BODY_FIELDS = ("content", "entries")
+
+
+class FrameError(ValueError):
+    pass
+
+
+class FrameTooLarge(FrameError):
+    """A compressed payload inflates past `max_inflated_bytes()`; the socket should be closed."""
+
+
+def binary_enabled() -> bool:
+    """Server-side switch (LLM_WS_BINARY, on by default); announced in the `hello` frame."""
+    return os.getenv("LLM_WS_BINARY", "1").strip().lower() not in ("0", "false", "no")
+
+
+def compress_min_bytes() -> int:
+    """Payloads at least this large are gzip-compressed (env LLM_WS_COMPRESS_MIN_BYTES; 0 disables)."""
+    try:
+        return int(os.getenv("LLM_WS_COMPRESS_MIN_BYTES", "16384"))
+    except ValueError:
+        return 16384
+
+
+def max_inflated_bytes() -> int:
+    """Cap on a decompressed payload (env LLM_WS_MAX_INFLATED_BYTES, 64 MB, the FS mirror's default size)."""
+    try:
+        return int(os.getenv("LLM_WS_MAX_INFLATED_BYTES", str(64 * 1024 * 1024)))
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+def _gunzip(payload: bytes) -> bytes:
+    # Bounded inflate: a small gzip bomb must not allocate without limit
+    limit = max_inflated_bytes()
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        out = d.decompress(payload, limit)
+    except zlib.error as e:
+        raise FrameError(f"bad gzip payload: {e}") from e
+    if d.unconsumed_tail:
+        raise FrameTooLarge(f"payload inflates past {limit} bytes")
+    if not d.eof:
+        raise FrameError("truncated gzip payload")
+    return out
+
+
+def body_field(msg: Dict[str, Any]) -> Optional[str]:
+    for name in BODY_FIELDS:
+        value = msg.get(name)
+        if isinstance(value, str) or (name == "entries" and isinstance(value, list)):
+            return name
+    return None
+
+
+def encode_frame(msg: Dict[str, Any], *, compress: bool = True) -> bytes:
+    header = dict(msg)
+    payload = b""
+    flags = 0
+    field = body_field(msg)
+    if field is not None:
+        value = header.pop(field)
+        if isinstance(value, str):
+            payload = value.encode("utf-8")
+            header["enc"] = "text"
+        else:
+            payload = dumps(value)
+            header["enc"] = "json"
+        header["body"] = field
+        threshold = compress_min_bytes()
+        if compress and threshold > 0 and len(payload) >= threshold:
+            payload = gzip.compress(payload, compresslevel=5)
+            flags |= FLAG_GZIP
+    head = dumps(header)
+    return _PREFIX.pack(FRAME_VERSION, flags, len(head)) + head + payload
+
+
+def decode_frame(data: bytes) -> Dict[str, Any]:
+    if len(data) < _PREFIX.size:
+        raise FrameError("frame too short")
+    version, flags, head_len = _PREFIX.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise FrameError(f"unsupported frame version {version}")
+    start = _PREFIX.size
+    if start + head_len > len(data):
+        raise FrameError("truncated frame header")
+    msg = json.loads(data[start:start + head_len])
+    if not isinstance(msg, dict):
+        raise FrameError("frame header must be an object")
+    field = msg.pop("body", None)
+    enc = msg.pop("enc", "text")
+    if field:
+        payload = data[start + head_len:]
+        if flags & FLAG_GZIP:
+            payload = _gunzip(payload)
+        msg[str(field)] = json.loads(payload) if enc == "json" else payload.decode("utf-8")
+    return msg
+
+
+def decode_message(message: Dict[str, Any]) -> Any:
+    """Decode a raw ASGI `websocket.receive` message (text or binary frame)."""
+    raw = message.get("bytes")
+    if raw is not None:
+        return decode_frame(raw)
+    return json.loads(message.get("text") or "")
+
+
+async def send_message(ws: Any, msg: Dict[str, Any], *, binary: bool = False, compress: bool = True) -> None:
+    """Send `msg` as a binary frame when the peer negotiated it, else as JSON text."""
+    if binary and body_field(msg) is not None:
+        await ws.send_bytes(encode_frame(msg, compress=compress))
+    else:
+        await ws.send_text(json.dumps(msg))
@@ -1,28 +1,106 @@
 from typing import Dict, Any, List
 from fastapi import WebSocket
 import asyncio
+import json
+import os
+import time
+
+from . import logs, metrics
+from .utils.wsframe import send_message
 
 # Global websocket registry with pending call coordination
-# WS_STATE[conn_id] = { "ws": WebSocket, "pending": Dict[str, asyncio.Future] }
+# WS_STATE[conn_id] = { "ws": WebSocket, "pending": Dict[str, asyncio.Future], "tasks": set[asyncio.Task],
+#                      "peer": features the browser announced (e.g. {"binary": True, "gzip": True}),
+#                      "opened"/"last_seen": time.monotonic() stamps, "slots": asyncio.Semaphore
+#                      bounding in-flight RPCs, "waiting": RPCs queued for a slot,
+#                      "rpc": {"count", "errors", "total_ms", "max_ms"} }
 WS_STATE: Dict[str, Dict[str, Any]] = {}
 
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.getenv(key, str(default)))
+    except ValueError:
+        return default
+
+
+def heartbeat_interval() -> float:
+    """Seconds between server pings / idle checks (env LLM_WS_HEARTBEAT_S)."""
+    return _env_float("LLM_WS_HEARTBEAT_S", 15.0)
+
+
+def idle_timeout() -> float:
+    """Connections silent for longer than this are evicted (env LLM_WS_IDLE_TIMEOUT_S)."""
+    return _env_float("LLM_WS_IDLE_TIMEOUT_S", 45.0)
+
+
+def max_inflight() -> int:
+    """Concurrent FS RPCs allowed per connection; further calls queue (env LLM_WS_MAX_INFLIGHT)."""
+    return max(1, int(_env_float("LLM_WS_MAX_INFLIGHT", 16)))
+
+
 def set_ws(conn_id: str, ws: WebSocket):
-    WS_STATE[conn_id] = {"ws": ws, "pending": {}}
+    now = time.monotonic()
+    WS_STATE[conn_id] = {
+        "ws": ws, "pending": {}, "tasks": set(), "peer": {},
+        "opened": now, "last_seen": now,
+        "slots": asyncio.Semaphore(max_inflight()), "waiting": 0,
+        "rpc": {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0},
+    }
+
+def touch(conn_id: str):
+    """Record activity (any frame from the browser, pings included)."""
+    st = WS_STATE.get(conn_id)
+    if st:
+        st["last_seen"] = time.monotonic()
 
 def get_ws(conn_id: str) -> WebSocket | None:
     st = WS_STATE.get(conn_id)
     return st.get("ws") if st else None
 
-def pop_ws(conn_id: str):
-    st = WS_STATE.pop(conn_id, None)
+def get_state(conn_id: str) -> Dict[str, Any] | None:
+    """Per-connection state dict; components may attach their own keys (e.g. caches)."""
+    return WS_STATE.get(conn_id)
+
+def set_peer_features(conn_id: str, features: Any):
+    st = WS_STATE.get(conn_id)
+    if st and isinstance(features, dict):
+        st["peer"] = dict(features)
+
+async def send_to(conn_id: str, msg: Dict[str, Any]):
+    """Send to the browser using the framing it negotiated (binary frames or JSON text)."""
+    st = WS_STATE.get(conn_id)
+    if not st:
+        raise RuntimeError("websocket not connected")
+    peer = st.get("peer") or {}
+    await send_message(st["ws"], msg, binary=bool(peer.get("binary")), compress=bool(peer.get("gzip")))
+
+def pop_ws(conn_id: str, ws: WebSocket | None = None) -> int:
+    """Drop a connection, cancelling its pending RPCs and bound invocations.
+
+    With `ws`, only drops the entry if it still belongs to that socket (a
+    reconnect under the same id must not be torn down by the old handler).
+    Returns the number of invocation tasks that were cancelled.
+    """
+    st = WS_STATE.get(conn_id)
+    if st is None or (ws is not None and st.get("ws") is not ws):
+        return 0
+    WS_STATE.pop(conn_id, None)
+    cancelled = 0
     if st:
         # cancel all pending listeners
         for fut in list(st.get("pending", {}).values()):
             try:
                 if not fut.done():
-                    fut.set_exception(asyncio.CancelledError())
+                    fut.cancel()
             except Exception:
                 pass
+        # the browser that would serve these invocations' FS calls is gone
+        for task in list(st.get("tasks", ())):
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+    return cancelled
 
 def register_pending(conn_id: str, call_id: str) -> asyncio.Future:
     st = WS_STATE.get(conn_id)
@@ -32,6 +110,15 @@ def register_pending(conn_id: str, call_id: str) -> asyncio.Future:
     st["pending"][call_id] = fut
     return fut
 
+def discard_pending(conn_id: str, call_id: str):
+    """Forget a pending call whose caller gave up (timeout or cancellation)."""
+    st = WS_STATE.get(conn_id)
+    if not st:
+        return
+    fut = st["pending"].pop(call_id, None)
+    if fut and not fut.done():
+        fut.cancel()
+
 def resolve_pending(conn_id: str, call_id: str, payload: Any):
     st = WS_STATE.get(conn_id)
     if not st:
@@ -40,5 +127,112 @@ def resolve_pending(conn_id: str, call_id: str, payload: Any):
     if fut and not fut.done():
         fut.set_result(payload)
 
+def bind_task(conn_id: str, task: asyncio.Task):
+    """Tie an invocation task to a connection so it is cancelled when the socket closes."""
+    st = WS_STATE.get(conn_id)
+    if st:
+        st["tasks"].add(task)
+
+def unbind_task(conn_id: str, task: asyncio.Task):
+    st = WS_STATE.get(conn_id)
+    if st:
+        st["tasks"].discard(task)
+
+async def acquire_rpc_slot(conn_id: str, timeout: float) -> asyncio.Semaphore:
+    """Wait up to `timeout` for one of the connection's in-flight RPC slots.
+
+    Returns the semaphore to hand back to `release_rpc_slot`.
+    """
+    st = WS_STATE.get(conn_id)
+    if not st:
+        raise RuntimeError("websocket not connected")
+    slots: asyncio.Semaphore = st["slots"]
+    if not slots.locked():
+        # Free slot: acquire() returns without suspending
+        await slots.acquire()
+        return slots
+    metrics.inc("ws_rpc_queued_total")
+    st["waiting"] += 1
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"too many in-flight filesystem calls on {conn_id} (limit {max_inflight()})")
+    finally:
+        st["waiting"] -= 1
+    return slots
+
+def release_rpc_slot(slots: asyncio.Semaphore):
+    # Released on the semaphore that was acquired, even if the connection was replaced meanwhile
+    slots.release()
+
+def record_rpc(conn_id: str, ms: float, ok: bool):
+    metrics.observe("ws_rpc_ms", ms)
+    st = WS_STATE.get(conn_id)
+    if not st:
+        return
+    rpc = st["rpc"]
+    rpc["count"] += 1
+    rpc["total_ms"] += ms
+    rpc["max_ms"] = max(rpc["max_ms"], ms)
+    if not ok:
+        rpc["errors"] += 1
+
+async def evict(conn_id: str, ws: WebSocket, reason: str):
+    """Forget a connection the browser stopped talking on and close it best-effort."""
+    cancelled = pop_ws(conn_id, ws)
+    metrics.inc("ws_evicted_total", reason=reason)
+    if cancelled:
+        metrics.inc("invoke_cancelled_total", cancelled, reason="ws_disconnect")
+    logs.log("fs-ws", "evict", level="warning", conn_id=conn_id, reason=reason, cancelled=cancelled)
+    try:
+        # A half-open socket may never complete the close handshake
+        await asyncio.wait_for(ws.close(code=4408), timeout=2.0)
+    except Exception:
+        pass
+
+async def heartbeat(conn_id: str, ws: WebSocket):
+    """Per-connection loop: ping the browser and evict it once idle past the timeout."""
+    interval = heartbeat_interval()
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        st = WS_STATE.get(conn_id)
+        if st is None or st.get("ws") is not ws:
+            return
+        if time.monotonic() - st["last_seen"] > idle_timeout():
+            await evict(conn_id, ws, "idle")
+            return
+        try:
+            await asyncio.wait_for(ws.send_text(json.dumps({"type": "ping", "ts": int(time.time() * 1000)})), timeout=5.0)
+        except Exception:
+            await evict(conn_id, ws, "send_failed")
+            return
+
+def pending_rpcs() -> int:
+    """FS RPCs awaiting a browser reply, across all connections."""
+    return sum(len(st["pending"]) for st in WS_STATE.values())
+
 def list_connections() -> List[str]:
     return list(WS_STATE.keys())
+
+def connection_stats() -> List[Dict[str, Any]]:
+    now = time.monotonic()
+    out: List[Dict[str, Any]] = []
+    for conn_id, st in list(WS_STATE.items()):
+        rpc = st.get("rpc") or {}
+        count = rpc.get("count", 0)
+        out.append({
+            "id": conn_id,
+            "age_s": round(now - st.get("opened", now), 1),
+            "idle_s": round(now - st.get("last_seen", now), 1),
+            "in_flight": len(st.get("pending", {})),
+            "queued": st.get("waiting", 0),
+            "invocations": len(st.get("tasks", ())),
+            "rpc_count": count,
+            "rpc_errors": rpc.get("errors", 0),
+            "rpc_avg_ms": round(rpc.get("total_ms", 0.0) / count, 1) if count else None,
+            "rpc_max_ms": round(rpc.get("max_ms", 0.0), 1),
+            "peer": st.get("peer") or {},
+        })
+    return out
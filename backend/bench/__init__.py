@@ -0,0 +1 @@
+"""Offline benchmark harnesses for the backend (run with `python -m bench.<name>`)."""
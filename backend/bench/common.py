@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile; returns None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize(latencies_ms: List[float], wall_s: float, *, errors: int = 0, statuses: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    n = len(latencies_ms)
+
+    def _r(v: Optional[float]) -> Optional[float]:
+        return round(v, 3) if v is not None else None
+
+    return {
+        "requests": n + errors if statuses is None else sum(statuses.values()),
+        "ok": n,
+        "errors": errors,
+        "statuses": statuses or {},
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(n / wall_s, 3) if wall_s > 0 else None,
+        "latency_ms": {
+            "min": _r(min(latencies_ms) if latencies_ms else None),
+            "mean": _r(sum(latencies_ms) / n if n else None),
+            "p50": _r(percentile(latencies_ms, 50)),
+            "p95": _r(percentile(latencies_ms, 95)),
+            "p99": _r(percentile(latencies_ms, 99)),
+            "max": _r(max(latencies_ms) if latencies_ms else None),
+        },
+    }
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                             cwd=Path(__file__).parent)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(name: str, payload: Dict[str, Any], out: Optional[str] = None) -> Path:
+    """Write a results document (stable key order so files diff cleanly)."""
+    path = Path(out) if out else RESULTS_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = {"benchmark": name, "environment": environment(), **payload}
+    path.write_text(json.dumps(doc, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> List[str]:
+    """Return human-readable deltas of throughput and latency percentiles per scenario."""
+    base = json.loads(Path(baseline_path).read_text())
+    lines: List[str] = []
+    for scen, cur in (current.get("scenarios") or {}).items():
+        old = (base.get("scenarios") or {}).get(scen)
+        if not old:
+            continue
+        for key in ("p50", "p95", "p99"):
+            a = (old.get("latency_ms") or {}).get(key)
+            b = (cur.get("latency_ms") or {}).get(key)
+            if a and b:
+                lines.append(f"{scen} {key}: {a:.1f} -> {b:.1f} ms ({(b - a) / a * 100:+.1f}%)")
+        a, b = old.get("throughput_rps"), cur.get("throughput_rps")
+        if a and b:
+            lines.append(f"{scen} throughput: {a:.1f} -> {b:.1f} rps ({(b - a) / a * 100:+.1f}%)")
+    return lines
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(app: Any = "app.main:app", *, port: Optional[int] = None) -> Iterator[str]:
+    """Run a uvicorn server (import string or ASGI app) in a background thread and yield its base URL."""
+    import uvicorn
+
+    port = port or free_port()
+    # Access lines for every benchmark request would drown the report (and cost CPU)
+    os.environ.setdefault("LLM_LOG_LEVEL", "warning")
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 15
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError(f"bench: server {app} did not start")
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from app.utils.wsframe import body_field, decode_frame, encode_frame
+
+
+class FakeBrowser:
+    """Scripted stand-in for the frontend `engine/ws.ts` FS handler.
+
+    Connects to `/ws/{conn_id}` and answers `fs_list`/`fs_read`/`fs_write`
+    requests from an in-memory file map, optionally after `latency_ms`.
+    With `binary=True` it accepts the server's binary framing offer like the
+    browser does; `binary=False` keeps the JSON text protocol.
+    """
+
+    def __init__(self, base_url: str, conn_id: str, files: Optional[Dict[str, str]] = None, *, latency_ms: float = 0.0,
+                 mirror: bool = True, binary: bool = True):
+        self.url = base_url.replace("http", "ws", 1) + f"/ws/{conn_id}"
+        self.conn_id = conn_id
+        self.files: Dict[str, str] = dict(files or {})
+        self.latency_ms = latency_ms
+        self.mirror = mirror
+        self.binary = binary
+        self._peer_binary = False
+        self.handled = 0
+        self._ws: Any = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "FakeBrowser":
+        import websockets
+
+        self._ws = await websockets.connect(self.url, max_size=None)
+        await self._ws.send(json.dumps({"type": "connected"}))
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._task:
+            self._task.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+
+    def _list(self, path: str) -> Any:
+        base = path.rstrip("/") or ""
+        children: Dict[str, Dict[str, Any]] = {}
+        for p, content in self.files.items():
+            if not p.startswith(base + "/"):
+                continue
+            rest = p[len(base) + 1:]
+            first = rest.split("/")[0]
+            child = f"{base}/{first}"
+            if child not in children:
+                is_dir = "/" in rest
+                children[child] = {"path": child, "type": "dir" if is_dir else "file"}
+                if not is_dir:
+                    children[child]["size"] = len(content)
+        return sorted(children.values(), key=lambda e: e["path"])
+
+    async def handle(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        action = msg.get("action")
+        path = str(msg.get("path") or "/")
+        out: Dict[str, Any] = {"type": "res", "id": msg.get("id"), "ok": True}
+        if action == "fs_list":
+            out["entries"] = self._list(path)
+        elif action == "fs_read":
+            if path not in self.files:
+                return {"type": "res", "id": msg.get("id"), "ok": False, "error": "File not found"}
+            out["content"] = self.files[path]
+        elif action == "fs_write":
+            self.files[path] = str(msg.get("content") or "")
+            await self._send({"type": "fs_changed", "op": "write", "path": path, "content": self.files[path]})
+        else:
+            return {"type": "res", "id": msg.get("id"), "ok": False, "error": f"unknown action {action}"}
+        return out
+
+    async def _respond(self, msg: Dict[str, Any]) -> None:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        res = await self.handle(msg)
+        self.handled += 1
+        await self._send(res)
+
+    async def _send(self, msg: Dict[str, Any]) -> None:
+        if self._peer_binary and body_field(msg) is not None:
+            await self._ws.send(encode_frame(msg))
+        else:
+            await self._ws.send(json.dumps(msg))
+
+    async def _loop(self) -> None:
+        async for raw in self._ws:
+            try:
+                msg = decode_frame(raw) if isinstance(raw, bytes) else json.loads(raw)
+            except Exception:
+                continue
+            if isinstance(msg, dict) and msg.get("type") == "ping":
+                await self._ws.send(json.dumps({"type": "pong", "ts": msg.get("ts")}))
+                continue
+            if isinstance(msg, dict) and msg.get("type") == "hello":
+                if self.binary and (msg.get("features") or {}).get("binary"):
+                    self._peer_binary = True
+                    await self._ws.send(json.dumps({"type": "hello", "features": {"binary": True, "gzip": True}}))
+                # Seed the backend mirror like ws.ts does when the server offers it
+                if self.mirror and (msg.get("features") or {}).get("fs_mirror"):
+                    entries = [{"path": p, "type": "file", "content": c} for p, c in self.files.items()]
+                    await self._send({"type": "fs_snapshot", "entries": entries})
+                continue
+            if isinstance(msg, dict) and msg.get("type") == "req" and msg.get("id"):
+                # Answer concurrently like the browser's async handler does
+                asyncio.create_task(self._respond(msg))
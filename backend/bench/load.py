@@ -0,0 +1,182 @@
+"""End-to-end load benchmark for `/llm/invoke` and the WebSocket FS RPC.
+
+Uses the built-in `mock` provider so no real upstream is contacted. By default
+an in-process uvicorn server is started; pass `--base-url` to target a running
+deployment instead.
+
+    python -m bench.load --concurrency 32 --requests 500
+    python -m bench.load --scenario invoke_fs --tool-rounds 2 --compare bench/results/prev.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .common import compare, serve, summarize, write_results
+from .fake_browser import FakeBrowser
+
+SCENARIOS = ("invoke", "invoke_schema", "invoke_fs", "fs_rpc")
+
+BENCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "score": {"type": "number"},
+    },
+    "required": ["title", "tags", "score"],
+}
+
+
+def _mock_cfg(args: argparse.Namespace, **over: Any) -> Dict[str, Any]:
+    cfg = {
+        "latency_ms": args.mock_latency_ms,
+        "jitter_ms": args.mock_jitter_ms,
+        "token_ms": args.mock_token_ms,
+        "output_tokens": args.mock_output_tokens,
+        "error_429_rate": args.error_429_rate,
+        "error_5xx_rate": args.error_5xx_rate,
+    }
+    cfg.update(over)
+    return cfg
+
+
+def _invoke_body(args: argparse.Namespace, scenario: str, conn_id: Optional[str]) -> Dict[str, Any]:
+    body: Dict[str, Any] = {
+        "provider": "mock",
+        "model": "mock-fast",
+        "messages": [
+            {"role": "system", "content": "You are a benchmark."},
+            {"role": "user", "content": "Summarize the document."},
+        ],
+        "retries": args.retries,
+        "extra": {"mock": _mock_cfg(args)},
+    }
+    if scenario == "invoke_schema":
+        body["response_schema"] = BENCH_SCHEMA
+    if scenario == "invoke_fs":
+        body["fs"] = {"nodes": [{"id": "bench"}]}
+        body["ws_conn_id"] = conn_id
+        body["extra"]["mock"] = _mock_cfg(args, tool_rounds=args.tool_rounds, tool_name="fs_read_file_bench")
+    return body
+
+
+async def _drive(n: int, concurrency: int, call: Callable[[], Awaitable[int]]) -> Dict[str, Any]:
+    """Closed-loop driver: `concurrency` workers issue `n` calls in total."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = [n]
+
+    async def worker() -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                status = await call()
+            except Exception as e:
+                status = -1
+                statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+            elapsed = (time.perf_counter() - start) * 1000
+            if status != -1:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return summarize(latencies, wall, errors=n - len(latencies), statuses=statuses)
+
+
+async def run_scenario(base_url: str, scenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    conn_id = f"bench-{uuid.uuid4().hex[:8]}"
+    files = {"/bench/doc.txt": "lorem ipsum " * (args.file_kb * 1024 // 12), "/bench/notes.md": "# notes\n"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        browser: Optional[FakeBrowser] = None
+        if scenario in ("invoke_fs", "fs_rpc"):
+            browser = FakeBrowser(base_url, conn_id, files, latency_ms=args.browser_latency_ms)
+            await browser.__aenter__()
+            await asyncio.sleep(0.05)
+        try:
+            if scenario == "fs_rpc":
+                async def call() -> int:
+                    r = await client.get("/ws/test", params={"conn_id": conn_id, "path": "/bench"})
+                    return r.status_code
+            else:
+                body = _invoke_body(args, scenario, conn_id)
+
+                async def call() -> int:
+                    r = await client.post("/llm/invoke", json=body)
+                    return r.status_code
+
+            # Warm up connections and lazy imports before measuring
+            for _ in range(min(args.warmup, args.requests)):
+                await call()
+            result = await _drive(args.requests, args.concurrency, call)
+            if browser is not None:
+                result["browser_rpcs"] = browser.handled
+            return result
+        finally:
+            if browser is not None:
+                await browser.__aexit__(None, None, None)
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    out: Dict[str, Any] = {}
+    for scen in scenarios:
+        out[scen] = await run_scenario(args.base_url, scen, args)
+        lat = out[scen]["latency_ms"]
+        print(f"{scen:14s} ok={out[scen]['ok']:5d} err={out[scen]['errors']:4d} "
+              f"rps={out[scen]['throughput_rps']} p50={lat['p50']} p95={lat['p95']} p99={lat['p99']}")
+    return out
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default=None, help="Target server; default starts one in-process")
+    ap.add_argument("--scenario", default="all", choices=("all",) + SCENARIOS)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--retries", type=int, default=0)
+    ap.add_argument("--mock-latency-ms", type=float, default=50)
+    ap.add_argument("--mock-jitter-ms", type=float, default=10)
+    ap.add_argument("--mock-token-ms", type=float, default=0)
+    ap.add_argument("--mock-output-tokens", type=int, default=32)
+    ap.add_argument("--error-429-rate", type=float, default=0.0)
+    ap.add_argument("--error-5xx-rate", type=float, default=0.0)
+    ap.add_argument("--tool-rounds", type=int, default=1)
+    ap.add_argument("--browser-latency-ms", type=float, default=0.0)
+    ap.add_argument("--file-kb", type=int, default=4, help="Size of the fake browser's bench file")
+    ap.add_argument("--out", default=None, help="Results JSON path (default: bench/results/load-<ts>.json)")
+    ap.add_argument("--compare", default=None, help="Previous results JSON to diff against")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    if args.base_url:
+        scenarios = asyncio.run(main_async(args))
+    else:
+        with serve() as url:
+            args.base_url = url
+            scenarios = asyncio.run(main_async(args))
+    payload = {"config": config, "scenarios": scenarios}
+    path = write_results("load", payload, args.out)
+    print(f"results: {path}")
+    if args.compare:
+        for line in compare(payload, args.compare):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""MCP path benchmark: discovery, bind, per-tool-call overhead and tool-loop latency.
+
+Starts the local stand-in server from `bench.mcp_server` and measures the
+backend pieces that talk to it, entirely offline (the model is the `mock`
+provider):
+
+- discovery: `abuild_mcp_tools` for the configured server
+- bind: binding the discovered tools to a chat model (incl. schema conversion)
+- tool_call: one `tool.ainvoke`, minus the server's configured latency
+- tool_loop: a full `lc_invoke_generic` with `--rounds` tool rounds
+
+    python -m bench.mcp_loop --tools 50 --payload-bytes 8192 --rounds 3
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from .common import compare, serve, summarize, write_results
+from .mcp_server import build_mcp_app
+
+
+async def _timed(n: int, fn) -> Dict[str, Any]:
+    lat: List[float] = []
+    t0 = time.perf_counter()
+    for _ in range(n):
+        s = time.perf_counter()
+        await fn()
+        lat.append((time.perf_counter() - s) * 1000)
+    return summarize(lat, time.perf_counter() - t0)
+
+
+async def run(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from app.providers.mcp import abuild_mcp_tools
+    from app.providers.adapter import lc_invoke_generic
+    from app.providers.mock import create_mock_model
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    mcp_cfg = {"servers": [{"name": "bench", "transport": "http", "url": f"{url}/mcp"}]}
+    out: Dict[str, Any] = {}
+
+    out["discovery"] = await _timed(args.iterations, lambda: abuild_mcp_tools(mcp_cfg))
+
+    tools = await abuild_mcp_tools(mcp_cfg)
+    model = create_mock_model("mock-fast", {"mock": {"latency_ms": 0, "jitter_ms": 0}})
+
+    async def bind() -> None:
+        model.bind_tools(tools)
+        for t in tools:
+            convert_to_openai_tool(t)
+
+    out["bind"] = await _timed(args.iterations, bind)
+
+    tool = tools[0]
+    lat: List[float] = []
+    t0 = time.perf_counter()
+    for _ in range(args.iterations):
+        s = time.perf_counter()
+        await tool.ainvoke({"query": "bench", "limit": 1})
+        lat.append((time.perf_counter() - s) * 1000 - args.latency_ms)
+    out["tool_call_overhead"] = summarize(lat, time.perf_counter() - t0)
+
+    payload = {
+        "provider": "mock",
+        "model": "mock-fast",
+        "messages": [{"role": "user", "content": "Use the tools."}],
+        "mcp": mcp_cfg,
+        "extra": {"mock": {"latency_ms": 0, "jitter_ms": 0, "token_ms": 0, "tool_rounds": args.rounds, "tool_name": "tool_0"}},
+    }
+    out["tool_loop"] = await _timed(args.iterations, lambda: lc_invoke_generic(dict(payload)))
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tools", type=int, default=8)
+    ap.add_argument("--payload-bytes", type=int, default=1024)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Server-side latency per tool call")
+    ap.add_argument("--rounds", type=int, default=3, help="Tool rounds requested by the mock model")
+    ap.add_argument("--iterations", type=int, default=20)
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--compare", default=None)
+    args = ap.parse_args(argv)
+
+    app = build_mcp_app(args.tools, args.payload_bytes, args.latency_ms)
+    with serve(app) as url:
+        scenarios = asyncio.run(run(url, args))
+    for name, res in scenarios.items():
+        lat = res["latency_ms"]
+        print(f"{name:20s} p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} ms")
+    payload = {"config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}, "scenarios": scenarios}
+    path = write_results("mcp", payload, args.out)
+    print(f"results: {path}")
+    if args.compare:
+        for line in compare(payload, args.compare):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Local stand-in MCP server (streamable HTTP) for offline tool-loop benchmarks.
+
+Exposes `tools` synthetic tools named `tool_<i>`; each sleeps `latency_ms`
+and returns `payload_bytes` of text. Serve standalone with:
+
+    python -m bench.mcp_server --tools 20 --payload-bytes 4096 --latency-ms 25 --port 8765
+
+then point an `mcp.servers` entry at `http://127.0.0.1:8765/mcp`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from typing import Any, Optional
+
+
+def build_mcp_app(tools: int = 8, payload_bytes: int = 1024, latency_ms: float = 0.0, *, name: str = "bench") -> Any:
+    """Return a Starlette ASGI app hosting the synthetic MCP tools at `/mcp`."""
+    from mcp.server.fastmcp import FastMCP  # type: ignore
+
+    server = FastMCP(name, stateless_http=True, log_level="WARNING")
+    body = ("x" * 63 + "\n") * (payload_bytes // 64) + "x" * (payload_bytes % 64)
+
+    def _make(i: int):
+        async def tool(query: str, limit: int = 10) -> str:
+            if latency_ms:
+                await asyncio.sleep(latency_ms / 1000.0)
+            return body
+
+        tool.__name__ = f"tool_{i}"
+        return tool
+
+    for i in range(tools):
+        server.add_tool(_make(i), name=f"tool_{i}",
+                        description=f"Synthetic benchmark tool #{i}. Returns {payload_bytes} bytes for a query.")
+    return server.streamable_http_app()
+
+
+def main(argv: Optional[list] = None) -> None:
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tools", type=int, default=8)
+    ap.add_argument("--payload-bytes", type=int, default=1024)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args(argv)
+    app = build_mcp_app(args.tools, args.payload_bytes, args.latency_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Micro-benchmarks for CPU-side hot paths of `/llm/invoke`.
+
+Covers the strict-schema transforms, output validation, JSON extraction from
+model replies, usage extraction and response normalization, using large
+synthetic schemas (deep nesting, many `anyOf`) and large model outputs.
+
+    python -m bench.micro                      # run and print
+    python -m bench.micro --check              # fail (exit 1) on regressions vs baseline
+    python -m bench.micro --update-baseline    # re-record bench/baselines/micro.json
+
+Timings are stored and compared relative to a calibration workload (pure-Python
+dict walking and JSON round trips, independent of app code) measured in the
+same process, so the baseline carries across machines of different speed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .common import write_results
+
+BASELINE = Path(__file__).parent / "baselines" / "micro.json"
+
+
+def make_schema(depth: int = 4, fanout: int = 6) -> Dict[str, Any]:
+    """Nested object schema; every level mixes scalars, arrays and an `anyOf`."""
+    def node(d: int) -> Dict[str, Any]:
+        props: Dict[str, Any] = {
+            "id": {"type": "string"},
+            "score": {"type": "number"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "kind": {"anyOf": [{"type": "string", "enum": ["a", "b", "c"]}, {"type": "integer"}, {"type": "null"}]},
+        }
+        if d > 0:
+            for i in range(fanout):
+                child = node(d - 1)
+                props[f"child_{i}"] = child if i % 2 else {"anyOf": [child, {"type": "null"}]}
+            props["items"] = {"type": "array", "items": node(d - 1)}
+        return {"type": "object", "properties": props}
+
+    return node(depth)
+
+
+def make_instance(schema: Dict[str, Any], items: int = 2) -> Any:
+    """Build a value conforming to `make_schema` output."""
+    if "anyOf" in schema:
+        return make_instance(schema["anyOf"][0], items)
+    t = schema.get("type")
+    if t == "object":
+        return {k: make_instance(v, items) for k, v in schema.get("properties", {}).items()}
+    if t == "array":
+        return [make_instance(schema["items"], items) for _ in range(items)]
+    if t == "string":
+        return schema.get("enum", ["value"])[0]
+    if t == "number":
+        return 1.5
+    if t == "integer":
+        return 1
+    return None
+
+
+def _calibration() -> Callable[[], Any]:
+    """Fixed workload the cases are expressed relative to; never change it without re-recording."""
+    doc = {"rows": [{"id": f"r{i}", "score": i * 0.5, "tags": ["a", "b", "c"], "nested": {"k": i, "v": [i, i + 1]}}
+                    for i in range(200)]}
+
+    def walk(node: Any) -> Any:
+        if isinstance(node, dict):
+            return {k: walk(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [walk(v) for v in node]
+        return node
+
+    return lambda: json.loads(json.dumps(walk(doc)))
+
+
+def _cases() -> Dict[str, Callable[[], Any]]:
+    from app.providers.adapter import _extract_json, _extract_usage, _normalize_response
+    from app.utils.wsframe import decode_frame, encode_frame
+    from app.utils.schema import (
+        enforce_no_additional_properties_deep,
+        enforce_required_all_properties_deep,
+        validate_output_against_schema,
+    )
+
+    schema = make_schema(depth=3, fanout=4)
+    strict = enforce_required_all_properties_deep(enforce_no_additional_properties_deep(schema))
+    instance = make_instance(schema, items=1)
+    big_json = json.dumps({"rows": [make_instance(make_schema(1, 2)) for _ in range(400)]})
+    fenced = f"```json\n{big_json}\n```"
+    prose = "Here is the result you asked for:\n\n" + big_json
+    # Output cut off mid-value, with a trailing comma earlier on
+    truncated = big_json.replace("}]", "},]", 1)[: len(big_json) * 2 // 3]
+    # Worst case for the `\{[\s\S]*\}\s*\Z` fallback: braces but trailing prose
+    no_json = ("{ note: " + "lorem ipsum dolor " * 4000 + "} and some closing remarks. ") * 4
+    meta = {
+        "token_usage": {"prompt_tokens": 1200, "completion_tokens": 800, "total_tokens": 2000},
+        "model_name": "bench",
+        "system_fingerprint": "fp_bench",
+        "finish_reason": "stop",
+        "logprobs": None,
+    }
+
+    class _Res:
+        id = "bench"
+        content = big_json
+        response_metadata = meta
+
+    # FS read response carrying a ~256 KB file, as text frame vs binary frame
+    ws_res = {"type": "res", "id": "bench", "ok": True, "content": (big_json + "\n") * 8}
+    ws_text = json.dumps(ws_res)
+    ws_frame = encode_frame(ws_res, compress=False)
+
+    logs = [{"event": "model_response_received", "response": "x" * 2000} for _ in range(20)]
+    return {
+        "schema_no_additional_deep": lambda: enforce_no_additional_properties_deep(schema),
+        "schema_required_all_deep": lambda: enforce_required_all_properties_deep(schema),
+        "schema_strict_idempotent": lambda: enforce_required_all_properties_deep(enforce_no_additional_properties_deep(strict)),
+        "validate_output": lambda: validate_output_against_schema(instance, schema),
+        "extract_json_clean": lambda: _extract_json(big_json),
+        "extract_json_fenced": lambda: _extract_json(fenced),
+        "extract_json_prose": lambda: _extract_json(prose),
+        "extract_json_no_json": lambda: _extract_json(no_json),
+        "extract_json_truncated": lambda: _extract_json(truncated),
+        "extract_usage": lambda: _extract_usage(meta),
+        "ws_frame_json_roundtrip": lambda: json.loads(json.dumps(json.loads(ws_text))),
+        "ws_frame_binary_roundtrip": lambda: decode_frame(encode_frame(decode_frame(ws_frame), compress=False)),
+        "normalize_response": lambda: _normalize_response(_Res(), "bench", "bench", {"ok": True}, logs=logs),
+    }
+
+
+def measure(fn: Callable[[], Any], *, repeat: int = 5, target_s: float = 0.2) -> float:
+    """Return the best per-call time in microseconds over `repeat` timed batches."""
+    fn()
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= target_s / 4 or n >= 1_000_000:
+            break
+        n *= 4
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / n)
+    return best * 1e6
+
+
+def measure_relative(fn: Callable[[], Any], calibration: Callable[[], Any], *, repeat: int = 5) -> Tuple[float, float]:
+    """(us per call, time relative to calibration); calibration is timed right before and after `fn`.
+
+    Interleaving keeps the ratio stable when the machine's speed drifts during a run.
+    """
+    cal_before = measure(calibration, repeat=repeat)
+    us = measure(fn, repeat=repeat)
+    cal = min(cal_before, measure(calibration, repeat=repeat))
+    return us, us / cal
+
+
+def check(current: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Return one message per case slower, relative to calibration, than baseline by more than `threshold`."""
+    failures = []
+    for name, rel in current.items():
+        base = baseline.get(name)
+        if base and rel > base * (1 + threshold):
+            failures.append(f"{name}: {rel:.3f}x calibration vs baseline {base:.3f}x (+{(rel / base - 1) * 100:.0f}%)")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--filter", default=None, help="Only run cases containing this substring")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--check", action="store_true", help="Compare against the stored baseline")
+    ap.add_argument("--threshold", type=float, default=0.5,
+                    help="Allowed slowdown (relative to calibration) for --check")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--out", default=None, help="Also write a results JSON")
+    args = ap.parse_args(argv)
+
+    stored = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    # {"calibration_us": ..., "cases": {name: time / calibration time}}
+    baseline: Dict[str, float] = stored.get("cases", {})
+    calibration = _calibration()
+    cal = measure(calibration, repeat=args.repeat)
+    print(f"{'calibration':28s} {cal:12.1f} us/op")
+    results: Dict[str, float] = {}
+    relative: Dict[str, float] = {}
+    for name, fn in _cases().items():
+        if args.filter and args.filter not in name:
+            continue
+        us, rel = measure_relative(fn, calibration, repeat=args.repeat)
+        results[name] = us
+        relative[name] = float(f"{rel:.6g}")
+        base = baseline.get(name)
+        delta = f"  ({(relative[name] / base - 1) * 100:+.0f}% vs baseline)" if base else ""
+        print(f"{name:28s} {us:12.1f} us/op {relative[name]:10.3f}x{delta}")
+
+    if args.out:
+        write_results("micro", {"calibration_us": round(cal, 3), "cases_us": {k: round(v, 3) for k, v in results.items()},
+                                "cases_relative": relative}, args.out)
+    if args.update_baseline:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps({"calibration_us": round(cal, 3), "cases": {**baseline, **relative}},
+                                       indent=2, sort_keys=True) + "\n")
+        print(f"baseline: {BASELINE}")
+    if args.check:
+        failures = check(relative, baseline, args.threshold)
+        for f in failures:
+            print(f"REGRESSION {f}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -90,6 +90,8 @@ export async function evalLLM(
       body,
       headers: {
         "x-provider-api-key": getApiKey(String(data.provider)) || "",
+        // Only output and usage are consumed here; skip raw metadata and logs
+        "x-response-fields": "output,usage",
         ...(Boolean((data as LLMData).webSearch)
           ? { "x-tavily-api-key": useSettingsStore.getState().travilyApiKey || "" }
           : {}),
@@ -103,11 +105,9 @@ export async function evalLLM(
     }
     const payload: unknown = res.data as unknown;
     try {
+      // The backend normalizes provider token counts into `usage` (raw is projected away)
       const usage =
-        payload && typeof payload === "object"
-          ? ((payload as { usage?: unknown }).usage ??
-            (payload as { raw?: { token_usage?: unknown } }).raw?.token_usage)
-          : undefined;
+        payload && typeof payload === "object" ? (payload as { usage?: unknown }).usage : undefined;
       if (usage && typeof usage === "object") useEngineStore.getState().addUsage(usage);
     } catch {}
     if (
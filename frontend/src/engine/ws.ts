@@ -1,8 +1,19 @@
+import { bodyField, decodeFrame, encodeFrame, gzipSupported } from "./wsframe";
+
 let ws: WebSocket | null = null;
 let wsId: string | null = null;
 let connecting: Promise<string> | null = null;
 let wantClose = false;
 
+export type JobEvent = { id: string; status: string; result?: unknown; error?: unknown };
+const jobListeners = new Set<(ev: JobEvent) => void>();
+
+/** Completion pushes for background jobs (`POST /llm/jobs`) submitted with this socket's id. */
+export function onJobEvent(listener: (ev: JobEvent) => void): () => void {
+  jobListeners.add(listener);
+  return () => jobListeners.delete(listener);
+}
+
 export function getWsId(): string | null { return wsId; }
 export function isConnected(): boolean { return ws != null && ws.readyState === WebSocket.OPEN; }
 
@@ -14,7 +25,26 @@ export function connect(baseUrl: string) {
   wsId = `fe-${Date.now()}-${Math.random().toString(36).slice(2, 6)}`;
   const url = baseUrl.replace(/^http/, "ws") + `/ws/${wsId}`;
   ws = new WebSocket(url);
+  ws.binaryType = "arraybuffer";
   wantClose = false;
+  const sock = ws;
+  // Framing negotiated with the backend's hello; JSON text until then (and with older backends)
+  const peer = { binary: false, gzip: false };
+  let outq: Promise<void> = Promise.resolve();
+  // Non-null while an fs_snapshot is being taken
+  let heldChanges: Record<string, unknown>[] | null = null;
+  // Backend keeps a VFS mirror: only then do fs_changed events need file contents
+  let mirrored = false;
+  const send = (msg: Record<string, unknown>) => {
+    // Serialize sends: compressing a frame is async and must not reorder messages
+    outq = outq
+      .then(async () => {
+        if (peer.binary && bodyField(msg)) sock.send(await encodeFrame(msg, peer.gzip));
+        else sock.send(JSON.stringify(msg));
+      })
+      .catch(() => {});
+    return outq;
+  };
   ws.onopen = () => {
     try { console.debug("[fs-ws] open", { wsId, url }); } catch {}
     try { ws?.send(JSON.stringify({ type: "connected" })); } catch {}
@@ -26,8 +56,45 @@ export function connect(baseUrl: string) {
   ws.onclose = () => { try { console.debug("[fs-ws] close", { wsId }); } catch {} ws = null; connecting = null; };
   ws.onmessage = async (ev) => {
     try {
-      const msg = JSON.parse(String(ev.data || "{}"));
+      const msg = typeof ev.data === "string" ? JSON.parse(ev.data || "{}") : await decodeFrame(ev.data as ArrayBuffer);
       if (!msg || typeof msg !== "object") return;
+      if ((msg as { type?: string }).type === "hello") {
+        const features = (msg as { features?: { fs_mirror?: boolean; binary?: boolean; gzip?: boolean } }).features;
+        const gzip = gzipSupported();
+        if (features?.binary) {
+          peer.binary = true;
+          peer.gzip = !!features.gzip && gzip;
+          await send({ type: "hello", features: { binary: true, gzip } });
+        }
+        // Backend mirrors the VFS: seed it; later edits follow as fs_changed events
+        if (features?.fs_mirror) {
+          mirrored = true;
+          // Hold back edits made while the snapshot is read: sent first, they would be
+          // overwritten by the older snapshot. Replaying them afterwards is idempotent.
+          heldChanges = [];
+          try {
+            const entries = await import("../fs/vfs").then((m) => m.VFS.snapshot());
+            void send({ type: "fs_snapshot", entries });
+          } finally {
+            const held = heldChanges;
+            heldChanges = null;
+            for (const change of held) void send({ type: "fs_changed", ...change });
+          }
+          await outq;
+        }
+        return;
+      }
+      if ((msg as { type?: string }).type === "ping") {
+        // Server heartbeat: answering keeps this connection from being evicted as idle
+        await send({ type: "pong", ts: (msg as { ts?: number }).ts });
+        return;
+      }
+      if ((msg as { type?: string }).type === "job") {
+        for (const l of jobListeners) {
+          try { l(msg as JobEvent); } catch {}
+        }
+        return;
+      }
       const { id, type, action, path, content } = msg as { id?: string; type?: string; action?: string; path?: string; content?: string };
       if (!id) return;
       if (type && type !== "req") return;
@@ -36,22 +103,33 @@ export function connect(baseUrl: string) {
         const res = await import("../fs/vfs").then((m) => m.VFS.listDirectory(path || "/"));
         const out = { type: "res", id, ok: true, entries: res };
         try { console.debug("[fs-ws] send", out); } catch {}
-        (ws as WebSocket)?.send(JSON.stringify(out));
+        await send(out);
       } else if (action === "fs_read") {
         const res = await import("../fs/vfs").then((m) => m.VFS.readFile(path || "/"));
         const out = { type: "res", id, ok: true, content: res };
         try { console.debug("[fs-ws] send", out); } catch {}
-        (ws as WebSocket)?.send(JSON.stringify(out));
+        await send(out);
       } else if (action === "fs_write") {
         await import("../fs/vfs").then((m) => m.VFS.writeFile(path || "/", content || ""));
         const out = { type: "res", id, ok: true };
         try { console.debug("[fs-ws] send", out); } catch {}
-        (ws as WebSocket)?.send(JSON.stringify(out));
+        await send(out);
       }
     } catch {
       // ignore malformed
     }
   };
+  // Tell the backend about VFS edits so its memoized reads/lists stay fresh
+  import("../fs/vfs").then((m) => {
+    const off = m.onVfsChange((change) => {
+      // Without the mirror the backend only invalidates by path: skip the file body
+      const event: Record<string, unknown> = { ...change };
+      if (!mirrored) delete event.content;
+      if (heldChanges) heldChanges.push(event);
+      else void send({ type: "fs_changed", ...event });
+    });
+    sock.addEventListener("close", () => off(), { once: true });
+  }).catch(() => {});
   // lightweight keepalive
   const ping = () => { try { ws?.send(JSON.stringify({ type: "ping", ts: Date.now() })); } catch {} };
   const pingTimer = window.setInterval(ping, 10000);
@@ -0,0 +1,78 @@
+// Binary frame codec for /ws/{conn_id}; mirrors backend/app/utils/wsframe.py.
+//
+//   u8 version | u8 flags (bit0 = gzip payload) | u32 BE header length
+//   header: UTF-8 JSON (message minus its bulky field) | payload: that field's bytes
+//
+// header.body names the field, header.enc is "text" (UTF-8 string) or "json".
+
+const FRAME_VERSION = 1;
+const FLAG_GZIP = 0x01;
+const COMPRESS_MIN_BYTES = 16384;
+const BODY_FIELDS = ["content", "entries"] as const;
+
+const enc = new TextEncoder();
+const dec = new TextDecoder();
+
+export function gzipSupported(): boolean {
+  return typeof CompressionStream !== "undefined" && typeof DecompressionStream !== "undefined";
+}
+
+async function pipe(data: BlobPart, stream: CompressionStream | DecompressionStream): Promise<Uint8Array> {
+  const out = new Blob([data]).stream().pipeThrough(stream);
+  return new Uint8Array(await new Response(out).arrayBuffer());
+}
+
+export function bodyField(msg: Record<string, unknown>): string | null {
+  for (const name of BODY_FIELDS) {
+    const v = msg[name];
+    if (typeof v === "string" || (name === "entries" && Array.isArray(v))) return name;
+  }
+  return null;
+}
+
+export async function encodeFrame(msg: Record<string, unknown>, compress: boolean): Promise<ArrayBuffer> {
+  const header: Record<string, unknown> = { ...msg };
+  let payload = new Uint8Array(0);
+  let flags = 0;
+  const field = bodyField(msg);
+  if (field) {
+    const value = header[field];
+    delete header[field];
+    const isText = typeof value === "string";
+    payload = enc.encode(isText ? (value as string) : JSON.stringify(value));
+    header.body = field;
+    header.enc = isText ? "text" : "json";
+    if (compress && gzipSupported() && payload.length >= COMPRESS_MIN_BYTES) {
+      payload = await pipe(payload, new CompressionStream("gzip"));
+      flags |= FLAG_GZIP;
+    }
+  }
+  const head = enc.encode(JSON.stringify(header));
+  const buf = new Uint8Array(6 + head.length + payload.length);
+  const view = new DataView(buf.buffer);
+  view.setUint8(0, FRAME_VERSION);
+  view.setUint8(1, flags);
+  view.setUint32(2, head.length);
+  buf.set(head, 6);
+  buf.set(payload, 6 + head.length);
+  return buf.buffer;
+}
+
+export async function decodeFrame(data: ArrayBuffer): Promise<Record<string, unknown>> {
+  const view = new DataView(data);
+  if (data.byteLength < 6 || view.getUint8(0) !== FRAME_VERSION) throw new Error("bad frame");
+  const flags = view.getUint8(1);
+  const headLen = view.getUint32(2);
+  const msg = JSON.parse(dec.decode(new Uint8Array(data, 6, headLen))) as Record<string, unknown>;
+  const field = msg.body as string | undefined;
+  const kind = msg.enc;
+  delete msg.body;
+  delete msg.enc;
+  if (field) {
+    let payload = new Uint8Array(data, 6 + headLen);
+    if (flags & FLAG_GZIP) payload = await pipe(payload, new DecompressionStream("gzip"));
+    const text = dec.decode(payload);
+    msg[field] = kind === "json" ? JSON.parse(text) : text;
+  }
+  return msg;
+}
@@ -4,6 +4,27 @@ type EntryType = "file" | "dir";
 
 export type VfsEntry = { path: string; type: EntryType; size?: number };
 
+export type VfsChange =
+  | { op: "write"; path: string; content: string }
+  | { op: "delete"; path: string }
+  | { op: "rename"; path: string; to: string };
+type VfsChangeListener = (change: VfsChange) => void;
+const changeListeners = new Set<VfsChangeListener>();
+
+/** Subscribe to VFS mutations (write/delete/rename). Returns an unsubscribe function. */
+export function onVfsChange(listener: VfsChangeListener): () => void {
+  changeListeners.add(listener);
+  return () => changeListeners.delete(listener);
+}
+
+function emitChange(change: VfsChange) {
+  for (const l of changeListeners) {
+    try {
+      l(change);
+    } catch {}
+  }
+}
+
 /**
  * Simple virtual filesystem stored in sqlite-wasm under table `fs_entries`.
  * Paths are POSIX-like and rooted (e.g., "/", "/docs/readme.txt").
@@ -55,6 +76,18 @@ export class VFS {
     return Object.values(children).sort((a, b) => a.path.localeCompare(b.path));
   }
 
+  /** Every entry with its content; used to seed the backend's mirror of this VFS. */
+  static async snapshot(): Promise<Array<{ path: string; type: EntryType; content: string | null }>> {
+    await VFS.ensureSchema();
+    const db = await initDB();
+    const res = db.exec("SELECT path, type, content FROM fs_entries").flatMap((r) => r.values);
+    return res.map(([p, t, c]) => ({
+      path: String(p),
+      type: String(t) as EntryType,
+      content: typeof c === "string" ? c : null,
+    }));
+  }
+
   static async readFile(path: string): Promise<string> {
     await VFS.ensureSchema();
     const db = await initDB();
@@ -84,6 +117,7 @@ export class VFS {
     );
     stmt.run([p, content]);
     stmt.free();
+    emitChange({ op: "write", path: p, content });
   }
 
   static async deleteFile(path: string): Promise<void> {
@@ -92,6 +126,7 @@ export class VFS {
     const p = VFS.normalize(path);
     const safe = p.replaceAll("'", "''");
     db.exec(`DELETE FROM fs_entries WHERE path='${safe}' AND type='file'`);
+    emitChange({ op: "delete", path: p });
   }
 
   static async renameFile(oldPath: string, newPath: string): Promise<void> {
@@ -114,6 +149,7 @@ export class VFS {
     // Overwrite if exists at destination
     db.exec(`DELETE FROM fs_entries WHERE path='${d}' AND type='file'`);
     db.exec(`UPDATE fs_entries SET path='${d}' WHERE path='${s}' AND type='file'`);
+    emitChange({ op: "rename", path: src, to: dst });
   }
 
   private static normalize(p: string): string {